@@ -1,4 +1,6 @@
 class Role:
+    __slots__ = ("name", "role_type", "alignment")
+
     def __init__(self, name: str, role_type: str):
         """
         :param name: 角色名称 (e.g., "小恶魔", "洗衣妇")
@@ -0,0 +1,156 @@
+try:
+    import numpy as np
+except ImportError:  # 可选依赖：只有批量分析需要
+    np = None
+
+from engine.game_state import ROLE_IDS, ROLE_NAMES, ROLE_TYPE_OF, NO_ROLE, FLAG_MASKS
+
+# 信息结果里可能出现的身份：真实身份之外多一个泛指的 "村民" (间谍被看成好人时显示)
+SHOWN_NAMES = ROLE_NAMES + ("村民",)
+VILLAGER = len(ROLE_NAMES)
+
+IMP = ROLE_IDS["小恶魔"]
+SPY = ROLE_IDS["间谍"]
+RECLUSE = ROLE_IDS["隐士"]
+SAINT = ROLE_IDS["圣徒"]
+SCARLET_WOMAN = ROLE_IDS["红唇女郎"]
+POISONER = ROLE_IDS["投毒者"]
+
+# 胜方编码，与 GameState.WINNERS 的下标一致
+NO_WINNER, GOOD_WINS, EVIL_WINS = 0, 1, 2
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("批量规则引擎需要 numpy (pip install numpy)")
+
+
+def _tables():
+    """按身份编号查表：是否邪恶、是否恶魔、看起来是否邪恶 (间谍 / 隐士误判)、送葬者和守鸦人看到的身份。"""
+    n = len(ROLE_NAMES)
+    evil = np.array([ROLE_TYPE_OF[r] >= 2 for r in range(n)] + [False])
+    demon = np.array([ROLE_TYPE_OF[r] == 3 for r in range(n)] + [False])
+    apparent_evil = evil.copy()
+    apparent_evil[SPY], apparent_evil[RECLUSE] = False, True
+    undertaker = np.arange(n + 1)
+    undertaker[SPY] = VILLAGER
+    ravenkeeper = undertaker.copy()
+    ravenkeeper[RECLUSE] = POISONER
+    return evil, demon, apparent_evil, undertaker, ravenkeeper
+
+
+class BatchRules:
+    """
+    一批对局的规则结算，全部以 NumPy 数组表示：role[b, s] 为第 b 局 s 号座位 (下标) 的真实身份编号，
+    alive / poisoned 为布尔掩码，座位环即第二维的顺序。
+    各信息角色的结果与胜负判定对整批同时计算，结果与 GameManager 的逐局逻辑一致。
+    """
+
+    def __init__(self, role, alive=None, poisoned=None, last_executed=None):
+        _require_numpy()
+        self.role = np.asarray(role, dtype=np.int16)
+        self.batch, self.seats = self.role.shape
+        self.alive = np.ones(self.role.shape, dtype=bool) if alive is None else np.asarray(alive, dtype=bool)
+        self.poisoned = np.zeros(self.role.shape, dtype=bool) if poisoned is None else np.asarray(poisoned, dtype=bool)
+        self.last_executed = np.full(self.batch, -1, dtype=np.int16) if last_executed is None else \
+            np.asarray(last_executed, dtype=np.int16)
+        self._evil, self._demon, self._apparent_evil, self._undertaker, self._ravenkeeper = _tables()
+        self._rows = np.arange(self.batch)
+
+    @classmethod
+    def from_states(cls, states):
+        """把一组 GameState 叠成一批。"""
+        _require_numpy()
+        role = np.array([np.frombuffer(s.role, dtype=np.uint8) for s in states], dtype=np.int16)
+        flags = np.array([np.frombuffer(s.flags, dtype=np.uint16) for s in states])
+        if (role == NO_ROLE).any():
+            raise ValueError("还没发完牌的对局不能参与批量结算")
+        return cls(role, alive=(flags & FLAG_MASKS["is_alive"]) != 0,
+                   poisoned=(flags & FLAG_MASKS["is_poisoned"]) != 0,
+                   last_executed=[s.last_executed for s in states])
+
+    def _at(self, seats):
+        """每局取一个座位的身份。"""
+        return self.role[self._rows, np.asarray(seats)]
+
+    # ---------------- 信息角色 ----------------
+    def chef(self):
+        """厨师：相邻的 (看起来) 邪恶玩家对数，死人也算，首尾相连。"""
+        app = self._apparent_evil[self.role]
+        return (app & np.roll(app, -1, axis=1)).sum(axis=1)
+
+    def alive_neighbors(self, seats):
+        """每局 seats[b] 左右两侧最近的存活座位 (只剩自己时都是自己)；本人已死返回 -1。"""
+        seats = np.asarray(seats)
+        k = np.arange(1, self.seats + 1)
+        left_idx = (seats[:, None] - k) % self.seats
+        right_idx = (seats[:, None] + k) % self.seats
+        rows = self._rows[:, None]
+        left = left_idx[self._rows, self.alive[rows, left_idx].argmax(axis=1)]
+        right = right_idx[self._rows, self.alive[rows, right_idx].argmax(axis=1)]
+        dead = ~self.alive[self._rows, seats]
+        left[dead], right[dead] = -1, -1
+        return left, right
+
+    def empath(self, seats):
+        """共情者：两侧存活邻居中 (看起来) 邪恶的人数；共情者已死为 -1。"""
+        left, right = self.alive_neighbors(seats)
+        app = self._apparent_evil[self.role]
+        count = app[self._rows, left].astype(np.int8) + app[self._rows, right]
+        count[left < 0] = -1
+        return count
+
+    def fortune_teller(self, first, second):
+        """占卜师：两个目标中有没有小恶魔 (隐士也会被查成恶魔)。"""
+        a, b = self._at(first), self._at(second)
+        return (a == IMP) | (b == IMP) | (a == RECLUSE) | (b == RECLUSE)
+
+    def undertaker(self):
+        """送葬者：昨天被处决者显示的身份编号 (SHOWN_NAMES 下标，间谍显示为村民)；没人被处决为 -1。"""
+        executed = self.last_executed >= 0
+        shown = self._undertaker[self._at(np.where(executed, self.last_executed, 0))]
+        return np.where(executed, shown, -1)
+
+    def ravenkeeper(self, targets):
+        """守鸦人：目标显示的身份编号 (间谍显示为村民，隐士显示为投毒者)。"""
+        return self._ravenkeeper[self._at(targets)]
+
+    # ---------------- 处决与胜负 ----------------
+    def execute(self, seats, mask=None):
+        """
+        处决 (mask 为 False 的局不处决)，返回胜方编码。
+        与 GameManager.execute_player 相同：圣徒 (未中毒) 被处决邪恶直接获胜，否则按 check_game_over 判定。
+        """
+        seats = np.asarray(seats)
+        mask = np.ones(self.batch, dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        self.alive[self._rows[mask], seats[mask]] = False
+        self.last_executed[mask] = seats[mask]
+        saint = mask & (self._at(seats) == SAINT) & ~self.poisoned[self._rows, seats]
+        winner = self.check_game_over(seats, mask & ~saint)
+        winner[saint] = EVIL_WINS
+        return winner
+
+    def check_game_over(self, dead, mask=None):
+        """
+        dead[b] 刚死之后的胜负判定 (mask 为 False 的局跳过)，返回胜方编码。
+        恶魔死亡时若红唇女郎存活、未中毒且存活人数不少于 4，她原地继承为小恶魔 (直接修改 role)。
+        """
+        dead = np.asarray(dead)
+        mask = np.ones(self.batch, dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        winner = np.zeros(self.batch, dtype=np.int8)
+        alive_count = self.alive.sum(axis=1)
+
+        demon_died = mask & self._demon[self._at(dead)]
+        # 存活的红唇女郎 (按座位顺序第一个)
+        sw_alive = (self.role == SCARLET_WOMAN) & self.alive
+        sw_seat = sw_alive.argmax(axis=1)
+        inherit = demon_died & sw_alive.any(axis=1) & (alive_count >= 4) & ~self.poisoned[self._rows, sw_seat]
+        self.role[self._rows[inherit], sw_seat[inherit]] = IMP
+        winner[demon_died & ~inherit] = GOOD_WINS
+
+        rest = mask & ~demon_died
+        evil_alive = (self._evil[self.role] & self.alive).sum(axis=1)
+        has_demon = (self._demon[self.role] & self.alive).any(axis=1)
+        evil_wins = rest & has_demon & ((alive_count <= 2) | ((alive_count == 3) & (evil_alive >= 2)))
+        winner[evil_wins] = EVIL_WINS
+        return winner
@@ -0,0 +1,262 @@
+import itertools
+import math
+import random
+import re
+
+import config
+from engine.role_setup import baron_shift, setup_distribution
+
+DEMON = config.ROLES_DATA["Demon"][0]
+MINION_ROLES = tuple(config.ROLES_DATA["Minion"])
+OUTSIDER_ROLES = tuple(config.ROLES_DATA["Outsider"])
+GOOD_ROLES = tuple(config.ROLES_DATA["Townsfolk"]) + OUTSIDER_ROLES
+SPY, RECLUSE, BARON, SCARLET_WOMAN = "间谍", "隐士", "男爵", "红唇女郎"
+
+# 世界数超过这个值时改为随机抽取这么多个世界 (座位多时精确枚举太慢)
+WORLD_LIMIT = 5000
+# 两人宣称同一个好人身份而两人都是好人 (酒鬼 / 口误) 的似然
+CLAIM_CONFLICT_LIKELIHOOD = 0.1
+
+# 同一天里事实的先后：白天的公开事件 -> 夜里的信息 -> 夜里的死亡
+FACT_ORDER = {"claim": 0, "execution": 0, "demon_killed": 0, "night_death": 2}
+
+_CLAIM_RE = re.compile(r"我(?:就|真的)?(?:是|的身份是)\s*【?(" + "|".join(GOOD_ROLES) + ")")
+
+
+def parse_claim(text):
+    """从公开发言里找 "我是XX" 形式的身份宣称，没有则返回 None。"""
+    m = _CLAIM_RE.search(text or "")
+    return m.group(1) if m else None
+
+
+def fact_key(fact):
+    return fact[1], FACT_ORDER.get(fact[0], 1)
+
+
+def _bit(seat):
+    return 1 << (seat - 1)
+
+
+def _seats_of(mask):
+    seat = 1
+    while mask:
+        if mask & 1: yield seat
+        mask >>= 1
+        seat += 1
+
+
+class World:
+    """
+    一个可能的世界：恶魔座位、各爪牙的座位和身份、隐士座位 (0 为不在场)、先验权重。
+    evil / apparent 是座位位集 (seat 号对应 bit seat-1)：真实邪恶 / 信息角色眼中的邪恶 (间谍算好人，隐士算邪恶)。
+    """
+    __slots__ = ("demon", "minions", "recluse", "weight", "evil", "apparent", "heir", "inherit_day")
+
+    def __init__(self, demon, minions, recluse, weight):
+        self.demon = demon
+        self.minions = minions  # {座位: 爪牙身份}
+        self.recluse = recluse
+        self.weight = weight
+        self.evil = _bit(demon)
+        for seat in minions: self.evil |= _bit(seat)
+        self.apparent = self.evil | (_bit(recluse) if recluse else 0)
+        for seat, role in minions.items():
+            if role == SPY: self.apparent &= ~_bit(seat)
+        self.heir = None  # 红唇女郎继承后的恶魔座位
+        self.inherit_day = None
+
+    def demon_on(self, day):
+        """第 day 天 (及当晚) 的恶魔座位，红唇女郎继承之后是她。"""
+        return self.heir if self.inherit_day is not None and day >= self.inherit_day else self.demon
+
+    def role_at(self, seat, day):
+        """第 day 天时 seat 的真实身份；普通好人 (不区分具体身份) 返回 None。"""
+        if seat == self.demon or seat == self.demon_on(day): return DEMON
+        if seat in self.minions: return self.minions[seat]
+        if seat == self.recluse: return RECLUSE
+        return None
+
+    def shown(self, seat, day, shown, recluse_as=RECLUSE):
+        """送葬者 / 守鸦人看到 seat 显示为 shown 是否与这个世界相符 (间谍显示为村民)。"""
+        actual = self.role_at(seat, day)
+        if actual is None: return shown in GOOD_ROLES and shown != RECLUSE
+        if actual == SPY: actual = "村民"
+        if actual == RECLUSE: actual = recluse_as
+        return actual == shown
+
+
+class BeliefState:
+    """
+    一个好人玩家眼中所有可能的世界 (先验来自发牌规则)，按他知道的事实逐条过滤 / 重新加权。
+    只记录信息正常时的夜间结果 (受干扰的信息玩家自己知道)，所以信息类事实是硬约束；
+    observe 只处理新来的事实，后验 (每个座位是恶魔 / 邪恶的概率) 给 prompt 用。
+    """
+
+    def __init__(self, observer, player_count, perceived_role, distribution=None):
+        distribution = distribution or setup_distribution(player_count)
+        self.observer = observer
+        self.player_count = player_count
+        self.dead = set()
+        self.claims = {}  # 身份 -> [宣称过的座位...]
+        if perceived_role in GOOD_ROLES: self.claims[perceived_role] = [observer]
+        self.ignored = 0  # 与所有世界都矛盾、被忽略的事实数
+        self.sampled = False
+        self._rendered = None  # (day, 存活座位, 文本)：事实没变时重复渲染直接复用
+        self.baron_shift = baron_shift(player_count)
+        self.worlds = self._prior(perceived_role, distribution["Minion"], distribution["Outsider"])
+
+    # ---------------- 先验 ----------------
+    def _recluse_chance(self, perceived_role, roles, outsider_count):
+        """别人是隐士的概率：外来者名额 (男爵多加) 里抽到隐士，再均匀落在剩下的好人座位上。"""
+        own = perceived_role in OUTSIDER_ROLES
+        outsiders = outsider_count + (self.baron_shift if BARON in roles else 0) - (1 if own else 0)
+        pool = len(OUTSIDER_ROLES) - (1 if own else 0)
+        return min(1.0, max(0, outsiders) / pool) if pool else 0.0
+
+    def _recluse_options(self, perceived_role, roles, others, outsider_count):
+        """这个世界里隐士的位置和概率 (0 为不在场)。"""
+        if perceived_role == RECLUSE: return [(self.observer, 1.0)]
+        p = self._recluse_chance(perceived_role, roles, outsider_count)
+        if not p or not others: return [(0, 1.0)]
+        return [(0, 1.0 - p)] + [(s, p / len(others)) for s in others]
+
+    def _prior(self, perceived_role, minion_count, outsider_count):
+        seats = [s for s in range(1, self.player_count + 1) if s != self.observer]
+        # 世界数上界：恶魔 x 爪牙座位 x 爪牙身份 x 隐士位置 (含不在场)
+        size = len(seats) * math.comb(len(seats) - 1, minion_count) * math.perm(len(MINION_ROLES), minion_count) \
+            * (len(seats) - minion_count)
+        if size > WORLD_LIMIT:
+            return self._sample(seats, perceived_role, minion_count, outsider_count)
+        worlds = []
+        for demon in seats:
+            others = [s for s in seats if s != demon]
+            for minion_seats in itertools.combinations(others, minion_count):
+                good = [s for s in others if s not in minion_seats]
+                for roles in itertools.permutations(MINION_ROLES, minion_count):
+                    for recluse, w in self._recluse_options(perceived_role, roles, good, outsider_count):
+                        if w > 0: worlds.append(World(demon, dict(zip(minion_seats, roles)), recluse, w))
+        return worlds
+
+    def _sample(self, seats, perceived_role, minion_count, outsider_count):
+        """按先验随机抽 WORLD_LIMIT 个世界 (权重都为 1)，种子固定，同一局结果可复现。"""
+        self.sampled = True
+        rng = random.Random(self.observer * 7919 + self.player_count)
+        worlds = []
+        for _ in range(WORLD_LIMIT):
+            evil = rng.sample(seats, minion_count + 1)
+            roles = rng.sample(MINION_ROLES, minion_count)
+            recluse = self.observer if perceived_role == RECLUSE else 0
+            if not recluse and rng.random() < self._recluse_chance(perceived_role, roles, outsider_count):
+                recluse = rng.choice([s for s in seats if s not in evil])
+            worlds.append(World(evil[0], dict(zip(evil[1:], roles)), recluse, 1.0))
+        return worlds
+
+    # ---------------- 事实 ----------------
+    def observe_all(self, facts):
+        for fact in sorted(facts, key=fact_key): self.observe(fact)
+
+    def observe(self, fact):
+        """
+        加入一条事实 (kind, day, ...)，对仍然可能的世界各算一次。
+        与所有世界都矛盾的事实 (规则之外的情况) 直接忽略，不会把信念清空。
+        """
+        kind = fact[0]
+        check = getattr(self, f"_check_{kind}", None)
+        if kind == "claim":
+            seats = self.claims.setdefault(fact[3], [])
+            if fact[2] in seats: return
+            seats.append(fact[2])
+        if check is not None:
+            factors = [check(w, *fact[1:]) for w in self.worlds]
+            if not any(factors):
+                self.ignored += 1
+            else:
+                kept = []
+                for w, factor in zip(self.worlds, factors):
+                    if not factor: continue
+                    if factor is not True: w.weight *= factor
+                    kept.append(w)
+                self.worlds = kept
+                self._rendered = None
+        if kind in ("night_death", "execution", "demon_killed"): self.dead.add(fact[2])
+
+    def _check_chef(self, w, day, pairs):
+        app = w.apparent
+        rotated = (app >> 1) | ((app & 1) << (self.player_count - 1))  # bit i 为座位 i+2 (首尾相连)
+        return bin(app & rotated).count("1") == pairs
+
+    def _check_empath(self, w, day, count, left, right):
+        return (w.apparent >> (left - 1) & 1) + (w.apparent >> (right - 1) & 1) == count
+
+    def _check_fortune(self, w, day, first, second, yes):
+        return (w.demon_on(day) in (first, second) or w.recluse in (first, second)) == yes
+
+    def _check_pair(self, w, day, first, second, role):
+        """洗衣妇 / 图书管理员 / 调查员：first、second 之中有一个是 role。"""
+        if role in MINION_ROLES: return any(w.minions.get(s) == role for s in (first, second))
+        if role == RECLUSE: return w.recluse in (first, second)
+        return any(w.role_at(s, day) is None for s in (first, second))
+
+    def _check_no_minion(self, w, day):
+        """调查员：眼中没有爪牙 —— 爪牙都是间谍，也没有隐士。"""
+        return not w.recluse and all(r == SPY for r in w.minions.values())
+
+    def _check_undertaker(self, w, day, seat, shown):
+        return w.shown(seat, day, shown)
+
+    def _check_ravenkeeper(self, w, day, seat, shown):
+        return w.shown(seat, day, shown, recluse_as="投毒者")
+
+    def _check_night_death(self, w, day, seat):
+        return w.demon_on(day) != seat
+
+    def _inherit(self, w, day):
+        """当时的恶魔死了而游戏还在继续：必须有存活的红唇女郎继承，否则这个世界不成立。"""
+        if w.inherit_day is not None: return False
+        heir = next((s for s, r in w.minions.items() if r == SCARLET_WOMAN and s not in self.dead), None)
+        if heir is None: return False
+        w.heir, w.inherit_day = heir, day
+        return True
+
+    def _check_execution(self, w, day, seat, continued):
+        if continued and w.demon_on(day) == seat: return self._inherit(w, day)
+        return True
+
+    def _check_demon_killed(self, w, day, seat):
+        """杀手当众打死了恶魔。"""
+        return w.demon_on(day) == seat and self._inherit(w, day)
+
+    def _check_claim(self, w, day, seat, role):
+        """两人宣称同一个好人身份：至少一个是邪恶 (否则只能是酒鬼之类的小概率情况)。"""
+        for other in self.claims[role]:
+            if other != seat and not w.evil & (_bit(seat) | _bit(other)): return CLAIM_CONFLICT_LIKELIHOOD
+        return True
+
+    # ---------------- 后验 ----------------
+    def posterior(self, day):
+        """({座位: 是当前恶魔的概率}, {座位: 是邪恶的概率})。"""
+        total = sum(w.weight for w in self.worlds) or 1.0
+        demon, by_mask, evil = {}, {}, {}
+        for w in self.worlds:
+            d = w.demon_on(day)
+            demon[d] = demon.get(d, 0.0) + w.weight / total
+            # 邪恶位集相同的世界先合并，不同的位集远少于世界数
+            by_mask[w.evil] = by_mask.get(w.evil, 0.0) + w.weight
+        for mask, weight in by_mask.items():
+            for s in _seats_of(mask): evil[s] = evil.get(s, 0.0) + weight / total
+        return demon, evil
+
+    def render(self, day, alive_seats, top=3):
+        """给 prompt 用的一行局势 (只列存活的其他玩家)。"""
+        alive = [s for s in alive_seats if s != self.observer]
+        if self._rendered and self._rendered[:2] == (day, alive): return self._rendered[2]
+        demon, evil = self.posterior(day)
+
+        def fmt(probs):
+            ranked = sorted(alive, key=lambda s: -probs.get(s, 0.0))[:top]
+            return ", ".join(f"{s}号 {probs.get(s, 0.0):.0%}" for s in ranked)
+
+        count = f"抽样 {len(self.worlds)} 种" if self.sampled else f"共 {len(self.worlds)} 种"
+        text = f"【局势推理 (按你确知的信息推算，{count}可能)】恶魔可能性: {fmt(demon)}；邪恶可能性: {fmt(evil)}"
+        self._rendered = (day, alive, text)
+        return text
@@ -0,0 +1,235 @@
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import time
+
+import config
+
+# 报告里关心的阶段 (投票嵌套在提名阶段内，两者分开统计)
+PHASES = {
+    "run_night_zero_logic": "night_zero",
+    "run_night_skill_phase": "night_skills",
+    "run_chat_phase": "chats",
+    "run_public_speech": "speeches",
+    "run_nomination_phase": "nominations",
+    "run_voting_phase": "votes",
+}
+
+
+class _Collector:
+    """订阅 Tracer，累计各阶段耗时和每次 LLM 调用的 prompt 大小 (按天)。"""
+
+    def __init__(self):
+        self.phases = {}  # 阶段 -> [总耗时, 次数]
+        self.prompt_bytes = {}  # 天 -> [总字节, 调用次数]
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+
+    def __call__(self, span):
+        if span.kind == "phase":
+            name = PHASES.get(span.name)
+            if name:
+                p = self.phases.setdefault(name, [0.0, 0])
+                p[0] += span.duration
+                p[1] += 1
+            return
+        self.llm_calls += 1
+        self.llm_seconds += span.duration
+        if span.attrs.get("cache") == "hit": return
+        d = self.prompt_bytes.setdefault(span.day if span.day is not None else -1, [0, 0])
+        d[0] += span.attrs.get("prompt_bytes") or 0
+        d[1] += 1
+
+
+def measure_state_memory(seed=0, copies=2000):
+    """
+    刚发完牌时每局状态的内存 (字节)：对象模型 (Player + Role) 与 GameState 各复制 copies 份，用 tracemalloc 取平均。
+    """
+    import copy
+    import random
+    import tracemalloc
+    from ai.llm_backends import create_backend
+    from ai.qwen_client import QwenClient
+    from engine.game_manager import GameManager
+    from engine.game_state import GameState
+    from engine.headless import ScriptedIO
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        # 发牌不调用 LLM
+        gm = GameManager(io_handler=ScriptedIO(), ai_client=QwenClient(backend=create_backend("stub")),
+                         rng=random.Random(seed))
+        gm.distribute_roles()
+
+    def per_copy(make):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        kept = [make() for _ in range(copies)]
+        used = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        del kept
+        return used / copies
+
+    state = GameState.from_game(gm)
+    return {"players": len(gm.players),
+            "object_model_bytes": per_copy(lambda: copy.deepcopy(gm.players)),
+            "game_state_bytes": per_copy(state.copy)}
+
+
+def _parse_info(text):
+    """把逐局逻辑给出的信息文本换成与 BatchRules 相同的编码。"""
+    import re
+    from engine.batch_rules import SHOWN_NAMES
+    if text is None: return -1
+    if "查验结果" in text: return text.split("：")[1].startswith("有")
+    m = re.search(r"：(.+)。$", text)
+    if m: return SHOWN_NAMES.index(m.group(1))
+    return int(re.search(r"\d+", text).group())
+
+
+def check_batch_rules(samples=2000, seed=0, batch_size=100000):
+    """
+    随机生成 samples 个对局状态 (随机死亡、中毒、上次处决)，分别用 GameManager 逐局逻辑和 BatchRules 计算
+    厨师 / 共情者 / 占卜师 / 送葬者 / 守鸦人的结果以及处决后的胜负，统计不一致的数量；
+    再把这些状态复制成 batch_size 局测批量吞吐。
+    """
+    import random
+    import numpy as np
+    from ai.llm_backends import create_backend
+    from ai.qwen_client import QwenClient
+    from engine.batch_rules import BatchRules
+    from engine.game_manager import GameManager
+    from engine.game_state import GameState, WINNERS, ROLE_IDS
+    from engine.headless import ScriptedIO
+    from engine.player_manager import Player
+
+    def probe(seat_id, role):
+        p = Player(seat_id)
+        p.perceived_role = role
+        return p
+
+    rng = random.Random(seed)
+    client = QwenClient(backend=create_backend("stub"))
+    states, args, expected = [], [], []
+    for i in range(samples):
+        with contextlib.redirect_stdout(io.StringIO()):
+            gm = GameManager(io_handler=ScriptedIO(), ai_client=client, rng=random.Random(seed * 100003 + i))
+            gm.distribute_roles()
+            n = len(gm.players)
+            for p in gm.players:
+                if rng.random() < 0.35: p.kill()
+                p.is_poisoned = rng.random() < 0.15
+            if rng.random() < 0.7: gm.last_executed_player = gm.players[rng.randrange(n)]
+            empath, ft1, ft2, raven, victim = (rng.randrange(n) for _ in range(5))
+            info = [gm.get_info_role_result(probe(0, "厨师"), []),
+                    gm.get_info_role_result(probe(empath + 1, "共情者"), []),
+                    gm.get_info_role_result(probe(0, "占卜师"), [ft1 + 1, ft2 + 1]),
+                    gm.get_info_role_result(probe(0, "送葬者"), []),
+                    gm.get_info_role_result(probe(0, "守鸦人"), [raven + 1])]
+            states.append(GameState.from_game(gm))
+            gm.execute_player(gm.players[victim])
+        args.append((empath, ft1, ft2, raven, victim))
+        expected.append([_parse_info(t) for t in info] + [WINNERS.index(gm.winner), bytes(GameState.from_game(gm).role)])
+
+    empath, ft1, ft2, raven, victim = (np.array(col) for col in zip(*args))
+    batch = BatchRules.from_states(states)
+    got = list(zip(batch.chef(), batch.empath(empath), batch.fortune_teller(ft1, ft2), batch.undertaker(),
+                   batch.ravenkeeper(raven), batch.execute(victim), batch.role.astype(np.uint8)))
+    mismatches = sum(1 for e, g in zip(expected, got)
+                     if [int(x) for x in g[:6]] != [int(x) for x in e[:6]] or bytes(g[6]) != e[6])
+
+    # 吞吐：把样本复制到 batch_size 局
+    reps = -(-batch_size // samples)
+    big = BatchRules(np.tile(batch.role, (reps, 1))[:batch_size], np.tile(batch.alive, (reps, 1))[:batch_size],
+                     np.tile(batch.poisoned, (reps, 1))[:batch_size], np.tile(batch.last_executed, reps)[:batch_size])
+    seats = np.tile(victim, reps)[:batch_size]
+    started = time.perf_counter()
+    big.chef(); big.empath(seats); big.fortune_teller(seats, seats[::-1]); big.undertaker(); big.ravenkeeper(seats)
+    big.execute(seats)
+    elapsed = time.perf_counter() - started
+    return {"samples": samples, "mismatches": mismatches, "batch_size": batch_size,
+            "batch_seconds": elapsed, "states_per_sec": batch_size / elapsed if elapsed else None}
+
+
+def _peak_rss_bytes():
+    """进程峰值内存 (字节)；resource 模块只在类 Unix 系统上有，Windows 上返回 None。"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024  # Linux 下单位是 KB
+
+
+def run_benchmark(games=20, latency=0.0, seed=0, players=None):
+    """用 stub 后端跑 games 局完整对局 (players 人局，默认 config.PLAYER_COUNT)，返回可序列化的统计结果。"""
+    from ai.tracing import Tracer, set_tracer
+    from engine.headless import run_headless_game
+
+    config.LLM_BACKEND = "stub"
+    config.LLM_STUB_LATENCY = latency
+    config.LLM_CACHE_MODE = "off"
+    config.TURBO = True
+    if players: config.PLAYER_COUNT = players
+
+    collector = _Collector()
+    tracer = Tracer(enabled=True, jsonl_path="")
+    tracer.subscribe(collector)
+    set_tracer(tracer)
+
+    days = []
+    wall_started, cpu_started = time.perf_counter(), time.process_time()
+    for i in range(games):
+        # 对局里的调试输出很多，全部丢掉
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = run_headless_game(seed=seed + i)
+        days.append(result["day_count"])
+    wall = time.perf_counter() - wall_started
+    cpu = time.process_time() - cpu_started
+
+    return {
+        "config": {"games": games, "stub_latency": latency, "seed": seed, "players": config.PLAYER_COUNT,
+                   "python": platform.python_version()},
+        "games_per_sec": games / wall if wall else None,
+        "wall_seconds": wall,
+        "cpu_seconds": cpu,
+        # 引擎自身开销 (进程 CPU 时间，含后台事件循环)，与模拟的模型延迟无关
+        "engine_cpu_seconds_per_game": cpu / games if games else None,
+        "avg_days": sum(days) / len(days) if days else 0,
+        "llm": {"calls": collector.llm_calls, "calls_per_game": collector.llm_calls / games if games else 0,
+                "seconds": collector.llm_seconds},
+        "phases": {name: {"total_seconds": t, "count": n, "mean_seconds": t / n}
+                   for name, (t, n) in sorted(collector.phases.items())},
+        "prompt_bytes_by_day": {str(day): {"calls": n, "mean_bytes": b / n}
+                                for day, (b, n) in sorted(collector.prompt_bytes.items())},
+        "peak_rss_bytes": _peak_rss_bytes(),
+        "state_memory": measure_state_memory(seed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="引擎基准测试：stub LLM 下跑完整对局，统计吞吐、阶段耗时、prompt 增长和内存")
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="stub 后端每次调用的模拟延迟 (秒)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--players", type=int, default=None, help="人数 (5-20)，默认 config.PLAYER_COUNT")
+    parser.add_argument("--out", default=None, help="结果 JSON 写到这里，默认输出到标准输出")
+    parser.add_argument("--rules", type=int, default=0, metavar="N",
+                        help="另外用 N 个随机状态核对批量规则引擎与逐局逻辑是否一致，并测批量吞吐 (需要 numpy)")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.games, args.latency, args.seed, args.players)
+    if args.rules: report["batch_rules"] = check_batch_rules(args.rules, args.seed)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"[*] {report['games_per_sec']:.2f} 局/秒，结果已写入 {args.out}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
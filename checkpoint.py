@@ -0,0 +1,208 @@
+import io
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+
+import config
+from engine.player_manager import Player, Seats
+from engine.roles.base_role import Role
+
+# 文件格式: 头部 (魔数, 版本, 负载 CRC32, 负载长度) + zlib 压缩的 pickle 负载
+# 负载只含内置类型 (dict / list / tuple / str / int ...)，读取时拒绝任何自定义类
+CHECKPOINT_MAGIC = b"BOTC"
+CHECKPOINT_VERSION = 1
+_HEADER = struct.Struct("<4sHII")
+
+# 下一步要执行的阶段
+STEPS = ("setup", "night", "day")
+
+
+class CheckpointError(Exception):
+    """存档损坏、版本不符或内容不合法。"""
+
+
+class _PlainUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        raise CheckpointError(f"存档中出现了不允许的类型: {module}.{name}")
+
+
+def _frame(blob):
+    """把 pickle 出的状态压缩并加上头部。"""
+    payload = zlib.compress(blob, 1)
+    return _HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, zlib.crc32(payload), len(payload)) + payload
+
+
+def decode(data):
+    if len(data) < _HEADER.size:
+        raise CheckpointError("存档不完整")
+    magic, version, crc, length = _HEADER.unpack_from(data)
+    if magic != CHECKPOINT_MAGIC:
+        raise CheckpointError("不是存档文件")
+    if version != CHECKPOINT_VERSION:
+        raise CheckpointError(f"存档版本 {version} 不受支持 (当前 {CHECKPOINT_VERSION})")
+    payload = data[_HEADER.size:]
+    if len(payload) != length or zlib.crc32(payload) != crc:
+        raise CheckpointError("存档校验失败")
+    return _PlainUnpickler(io.BytesIO(zlib.decompress(payload))).load()
+
+
+def _player_state(player):
+    # 布尔状态按名字逐个存，不依赖 Player 内部的比特布局
+    state = {k: getattr(player, k) for k in Player.__slots__ + Player.FLAGS if not k.startswith("_")}
+    role = state.pop("true_role")
+    state["true_role"] = (role.name, role.role_type) if role else None
+    return state
+
+
+def _restore_player(state):
+    state = dict(state)
+    role = state.pop("true_role")
+    player = Player(state["seat_id"], state["is_human"])
+    for k, v in state.items(): setattr(player, k, v)
+    player.true_role = Role(*role) if role else None
+    return player
+
+
+def capture(gm, next_step):
+    """抓取阶段边界上的完整对局状态 (纯内置类型，和 GameManager 不共享可变对象)。"""
+    last = gm.last_executed_player
+    state = {
+        "next_step": next_step,
+        "rng": gm.rng.getstate(),
+        "day_count": gm.day_count,
+        "phase": gm.phase,
+        "winner": gm.winner,
+        "demon_bluffs": list(gm.demon_bluffs),
+        "todays_deaths": list(getattr(gm, "todays_deaths", [])),
+        "last_executed_seat": last.seat_id if last else None,
+        "executions": list(gm.executions),
+        "public_facts": list(gm.public_facts),
+        "players": [_player_state(p) for p in gm.players],
+        "history": [(e.day, e.kind, e.text, e.seat) for e in gm.public_history.entries],
+        "summaries": dict(gm.public_history.summaries),
+    }
+    # pickle 一遍即深拷贝，之后游戏继续修改玩家状态也不影响存档
+    return pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def restore(gm, state):
+    """把存档状态装回 GameManager，返回下一步要执行的阶段。"""
+    if state.get("next_step") not in STEPS:
+        raise CheckpointError(f"未知的阶段: {state.get('next_step')}")
+    gm.rng.setstate(state["rng"])
+    gm.day_count = state["day_count"]
+    gm.phase = state["phase"]
+    gm.winner = state["winner"]
+    gm.demon_bluffs = list(state["demon_bluffs"])
+    gm.todays_deaths = list(state["todays_deaths"])
+    gm.executions = [tuple(e) for e in state["executions"]]
+    gm.public_facts = [tuple(f) for f in state.get("public_facts", [])]
+    gm.players = Seats(_restore_player(p) for p in state["players"])
+    gm.last_executed_player = next((p for p in gm.players if p.seat_id == state["last_executed_seat"]), None)
+    gm._player_prompts = {}
+    history = gm.public_history
+    for day, kind, text, seat in state["history"]:
+        history.append(day, kind, text, seat=seat)
+    for day, summary in state["summaries"].items():
+        history.set_summary(day, summary)
+    # 中断时还没收到的摘要重新提交
+    for day in sorted(history.days):
+        if day < gm.day_count or (day == gm.day_count and state["next_step"] == "night"):
+            history.close_day(day)
+    gm.io.update_ui(gm.players)
+    gm.io.update_history(history)
+    return state["next_step"]
+
+
+def load(path):
+    with open(path, "rb") as f:
+        return decode(f.read())
+
+
+class CheckpointWriter:
+    """
+    后台写存档：save() 只把已序列化的状态交给写线程就返回。写线程压缩后写临时文件、fsync，
+    再 os.replace 到目标路径，任何时刻磁盘上都是一份完整的存档。积压时只写最新的一份。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._cond = threading.Condition()
+        self._pending = None
+        self._busy = False
+        self._closed = False
+        self.stats = {"saved": 0, "skipped": 0, "bytes": 0, "write_seconds": 0.0}
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def save(self, blob):
+        with self._cond:
+            if self._pending is not None: self.stats["skipped"] += 1
+            self._pending = blob
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None: return
+                blob, self._pending = self._pending, None
+                self._busy = True
+            try:
+                self._write(blob)
+            except Exception as e:
+                print(f"[Warning] 写存档失败: {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _write(self, blob):
+        started = time.perf_counter()
+        data = _frame(blob)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self.stats["saved"] += 1
+        self.stats["bytes"] = len(data)
+        self.stats["write_seconds"] += time.perf_counter() - started
+
+    def flush(self):
+        """等待已提交的存档写完。"""
+        with self._cond:
+            while self._pending is not None or self._busy:
+                self._cond.wait()
+
+    def close(self, remove=False):
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        if remove and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def resume_game(path, io_handler=None, ai_client=None):
+    """从存档继续一局：恢复到存档时的阶段边界和随机数状态，接着往下跑。"""
+    from engine.game_manager import GameManager
+    state = load(path)
+    # 人数和真人座位以存档为准，跑完再改回来
+    saved = (config.PLAYER_COUNT, config.HUMAN_SEAT_ID)
+    try:
+        config.PLAYER_COUNT = len(state["players"])
+        config.HUMAN_SEAT_ID = next((p["seat_id"] for p in state["players"] if p["is_human"]), config.HUMAN_SEAT_ID)
+        gm = GameManager(io_handler=io_handler, ai_client=ai_client)
+        next_step = restore(gm, state)
+        gm.io.output(f"\n[*] 已从存档恢复: 第 {gm.day_count} 天，下一阶段 {next_step}")
+        gm.start_game_loop(next_step)
+    finally:
+        config.PLAYER_COUNT, config.HUMAN_SEAT_ID = saved
+    return gm
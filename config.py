@@ -1,24 +1,66 @@
 # 游戏基础配置
-PLAYER_COUNT = 6  # 5 AI + 1 真人
+PLAYER_COUNT = 6  # 5 AI + 1 真人，支持 5-20 人
 HUMAN_SEAT_ID = 4 # 真人固定在 4 号位
+TURBO = False  # 加速模式：跳过所有节奏停顿 (io.sleep)
 
 # LLM 配置
 DASHSCOPE_API_KEY = "key" # 请确保这是有效的 Key
 LLM_MODEL = "qwen-plus-2025-01-25"
 LLM_API_BASE = "https://dashscope.aliyuncs.com/compatible-mode/v1"
+LLM_BACKEND = "openai"  # "openai" 在线 / "record" 在线并录制 / "replay" 按录制回放 / "stub" 离线桩
+LLM_TRANSCRIPT_PATH = "llm_transcript.jsonl"  # record/replay 使用的录制文件
+LLM_STUB_LATENCY = 0.0  # stub 后端模拟的单次调用延迟 (秒)
+LLM_MAX_CONCURRENCY = 4  # query_many 同时在途的最大请求数
+LLM_DEADLINE = 60.0  # 单次调用总时限 (秒)，超时返回空结果
+LLM_USAGE_GRACE = 0.2  # JSON 闭合后继续读流等待用量信息的时间 (秒)
+
+# prompt 布局："prefix_cache" 所有调用共用同一条 system 消息 (规则/攻略/输出要求)，玩家身份放在 user 消息开头，
+# 可命中服务端的 prompt 前缀缓存；"classic" 为原来的每个玩家一条 system 消息
+PROMPT_LAYOUT = "prefix_cache"
+
+# 对冲请求：首 token 迟迟不来时，再发一份相同请求，先完成者胜出 (会多花 token，默认关闭)
+LLM_HEDGE_ENABLED = False
+LLM_HEDGE_PERCENTILE = 0.9  # 以历史首 token 延迟的 P90 作为对冲阈值
+LLM_HEDGE_MIN_SAMPLES = 20  # 样本不足时使用默认阈值
+LLM_HEDGE_DEFAULT_DELAY = 3.0  # 默认对冲阈值 (秒)
+
+# 调用追踪 (每次 LLM 调用的阶段/座位/延迟/token 归属)
+TRACE_ENABLED = False
+TRACE_JSONL_PATH = "traces.jsonl"  # 结束的 span 逐行追加到这里
+TRACE_PROM_PATH = "metrics.prom"  # 游戏结束时写出 Prometheus 文本快照
+
+# LLM 响应缓存 (按 模型+消息+json_mode 的哈希寻址)
+LLM_CACHE_MODE = "off"  # "read_through" 读写 / "write_only" 只写 / "off" 关闭
+LLM_CACHE_DIR = ".llm_cache"  # 磁盘缓存目录，设为 None 则只用内存
+LLM_CACHE_MEMORY_ENTRIES = 512  # 内存 LRU 条数上限
+LLM_CACHE_DISK_MAX_BYTES = 64 * 1024 * 1024  # 磁盘缓存容量上限
 
 # 游戏参数
 PUBLIC_CHAT_ROUNDS = 2  # 公聊轮数
+PERSONALITIES = ["理性", "激进", "伪装大师", "保守", "混乱"]  # AI 性格池，入座时随机抽取
+# 投票时同时询问所有 AI (按预测票数)，票数对不上的再重问：投票更快，但猜错的请求会浪费 token，默认关闭
+VOTE_SPECULATION = False
+PRIVATE_CHAT_MAX_PAIRS = 4  # 每轮私聊最多几对 AI 之间私聊 (真人那一对不算)，座位多时限制每轮的 LLM 调用量
+PREFETCH_ENABLED = True  # 真人输入期间预取输入已确定的 AI 请求 (如提名决定)，对不上的丢弃
+CHECKPOINT_PATH = "checkpoint.botc"  # 阶段边界自动存档 (对局正常结束后删除)，设为 None 关闭
+# 好人 AI 的发言 / 提名 / 投票 prompt 附上按已知事实枚举出的局势概率；开启时发言 prompt 的公开历史
+# 改用 speech_belief 预算 (往日的声明、死亡、处决已经体现在概率里)
+BELIEF_SOLVER = False
 
-# 初始配置 (如果无男爵)
-# 6人局推荐: 3村民, 1外来者, 1爪牙, 1恶魔
-SETUP_DISTRIBUTION = {
-    "Townsfolk": 3,
-    "Outsider": 1,
-    "Minion": 1,
-    "Demon": 1
+# 公开历史压缩：每天结束后在后台把当天记录压成摘要，之后的 prompt 用 摘要 + 当天原文
+HISTORY_SUMMARY_ENABLED = True
+HISTORY_SUMMARY_CHARS = 200  # 每天摘要的字数上限
+# 各类 prompt 中公开历史的 token 预算，超出时从最早的内容开始丢弃
+HISTORY_TOKEN_BUDGET = {
+    "speech": 3000,
+    "speech_belief": 1200,  # 附带局势推理的发言 prompt
+    "chat": 2000,
 }
 
+# 初始配置 (如果无男爵)：None 则按 PLAYER_COUNT 查暗流涌动标准配置表 (role_setup.standard_distribution)，
+# 例如 6 人局 3 村民, 1 外来者, 1 爪牙, 1 恶魔；也可手动指定 {"Townsfolk": 3, "Outsider": 1, "Minion": 1, "Demon": 1}
+SETUP_DISTRIBUTION = None
+
 # 角色数据
 ROLES_DATA = {
     "Townsfolk": [
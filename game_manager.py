@@ -2,14 +2,21 @@ import random
 import time
 import json
 import math
+from concurrent.futures import ThreadPoolExecutor
 import config
-from engine.player_manager import Player
+from engine.player_manager import Player, Seats
+from engine.public_history import PublicHistory
+from engine.prefetch import Prefetcher
+from engine.role_setup import draw_setup, baron_shift, setup_distribution
+from engine import checkpoint
+from engine.belief_solver import BeliefState, parse_claim
 from engine.roles.base_role import Role
 from ai.qwen_client import QwenClient
+from ai.tracing import get_tracer, traced_phase
 from ai.prompt_templates import (
-    SYSTEM_PROMPT, NIGHT_0_DEMON_PLANNING, NIGHT_0_MINION_PLANNING, NIGHT_0_GOOD_PLANNING,
-    PUBLIC_SPEECH_PROMPT, NOMINATION_PROMPT, VOTE_PROMPT, PRIVATE_CHAT_PROMPT,
-    NIGHT_ACTION_PROMPT, MISINFORMATION_PROMPT, TB_RULES_AND_ROLES, STRATEGY_GUIDE, ROLE_SPECIFIC_STRATEGIES
+    SYSTEM_TPL, SYSTEM_PREFIX, PLAYER_CONTEXT_TPL, NIGHT_0_DEMON_TPL, NIGHT_0_MINION_TPL, NIGHT_0_GOOD_TPL,
+    PUBLIC_SPEECH_TPL, NOMINATION_TPL, VOTE_TPL, PRIVATE_CHAT_TPL,
+    NIGHT_ACTION_TPL, MISINFORMATION_TPL, ROLE_SPECIFIC_STRATEGIES
 )
 
 
@@ -18,22 +25,141 @@ class GameIO:
 
     def input(self, prompt: str) -> str: return input(prompt)
 
-    def sleep(self, seconds: float): time.sleep(seconds)
+    def sleep(self, seconds: float):
+        if not config.TURBO: time.sleep(seconds)
 
     def update_ui(self, players: list): pass
 
+    def update_history(self, history): pass
+
+    # 流式输出：AI 发言逐段显示
+    def begin_stream(self, prefix: str): print(prefix, end="", flush=True)
+
+    def stream_text(self, text: str): print(text, end="", flush=True)
+
+    def end_stream(self): print()
+
+
+class StreamDisplay:
+    """把 LLM 返回的某个字段边生成边显示到 GameIO，作为 on_field 回调传给 ai_client.query。"""
+
+    def __init__(self, io, prefix, field):
+        self.io = io
+        self.prefix = prefix
+        self.field = field
+        self.parts = []
+        self.closed = False
+
+    def __call__(self, field, text):
+        if field != self.field or self.closed: return
+        if not self.parts: self.io.begin_stream(self.prefix)
+        self.parts.append(text)
+        self.io.stream_text(text)
+
+    def close(self):
+        if self.parts and not self.closed: self.io.end_stream()
+        self.closed = True
+
+    def finish(self, final_text):
+        """结束显示；最终内容与已显示的不一致（解析失败/兜底）时补一行完整内容。"""
+        self.close()
+        if "".join(self.parts) != final_text:
+            self.io.output(f"{self.prefix}{final_text}")
+
+
+class VoteSpeculator:
+    """
+    投票预测：投票开始时就按猜测的票数把所有 AI 的投票请求同时发出去，
+    按座位顺序回放时，若某人投票前的实际票数与预测时的不同，再用实际票数重问一次，并据此重新预测其后的人。
+    结果只取与实际票数一致的那次请求，因此与逐个询问等价。
+    """
+
+    def __init__(self, gm, ordered, nominee, nominator, reason, thresh):
+        self.gm = gm
+        self.ordered = ordered
+        self.position = {p.seat_id: i for i, p in enumerate(ordered)}
+        self.nominee = nominee
+        self.nominator = nominator
+        self.reason = reason
+        self.thresh = thresh
+        self.known = {}  # seat_id -> 回放得到的实际决定 (含管家强制弃票)
+        self.futures = {}  # (seat_id, 投票前票数) -> Future
+        self.used = set()
+        self.requeried = 0
+        self._speculate(0, 0)
+
+    def _guess(self, v):
+        """还没回放到的人，猜他会不会举手：优先用已返回的预测结果，否则只猜提名者举手。"""
+        if v.seat_id in self.known: return self.known[v.seat_id]
+        for (seat, _), future in self.futures.items():
+            if seat == v.seat_id and future.done() and not future.cancelled():
+                resp = future.result()
+                if isinstance(resp, dict): return bool(resp.get("vote", False))
+        return v is self.nominator
+
+    def _speculate(self, start, tally):
+        """从 ordered[start] 起按猜测推算每人投票前的票数，没问过的 (座位, 票数) 就发出请求。"""
+        for v in self.ordered[start:]:
+            pwr = self.gm._vote_power(v)
+            if pwr == 0: continue
+            if not v.is_human and (v.seat_id, tally) not in self.futures:
+                messages = self.gm._vote_messages(v, self.nominee, self.reason, tally, self.thresh, pwr)
+                self.futures[(v.seat_id, tally)] = self.gm.ai_client.submit(
+                    messages, json_mode=True, call_type="vote", tags={"seat": v.seat_id}, background=True)
+            if self._guess(v): tally += 1
+
+    def result(self, v, tally):
+        """取 v 在实际票数 tally 下的回答；预测的票数不对就补发请求 (连带重新预测后面的人)。"""
+        key = (v.seat_id, tally)
+        if key not in self.futures:
+            self.requeried += 1
+            self._speculate(self.position[v.seat_id], tally)
+        self.used.add(key)
+        return self.futures[key].result()
+
+    def record(self, v, decision, tally_after):
+        """回放完 v：实际决定与之前的猜测不同时，马上按实际票数重新预测后面的人。"""
+        guessed = self._guess(v)
+        self.known[v.seat_id] = decision
+        if decision != guessed:
+            self._speculate(self.position[v.seat_id] + 1, tally_after)
+
+    def prefetch_branches(self, v, tally, pwr):
+        """轮到真人时，他举手与不举手两种情况下后面的人都先问上。"""
+        start = self.position[v.seat_id] + 1
+        self._speculate(start, tally)
+        self._speculate(start, tally + pwr)
+
+    def close(self):
+        for key, future in self.futures.items():
+            if key not in self.used: future.cancel()
+        # 统计记在当前投票阶段的 span 上 (导出到追踪日志和 Prometheus 指标)
+        span = get_tracer().current_span()
+        if span:
+            for k, v in (("speculated", len(self.futures)), ("speculation_used", len(self.used)),
+                         ("speculation_requeried", self.requeried)):
+                span.attrs[k] = span.attrs.get(k, 0) + v
+
 
 class GameManager:
-    def __init__(self, io_handler=None):
-        self.players = []
+    def __init__(self, io_handler=None, ai_client=None, rng=None):
+        # 本局专用的随机数生成器 (座位性格、发牌、信息干扰项、私聊配对都从这里抽)
+        self.rng = rng if rng is not None else random.Random(random.getrandbits(64))
+        self.players = Seats()
         self.day_count = 0
         self.phase = "SETUP"
         self.winner = None
         self.demon_bluffs = []
-        self.public_chat_history = []
-        self.all_public_history = []
-        self.ai_client = QwenClient()
+        self.ai_client = ai_client if ai_client else QwenClient()
+        self.public_history = PublicHistory(self.ai_client)
+        self.prefetcher = Prefetcher(self.ai_client)
         self.last_executed_player = None
+        self.executions = []  # (天数, 座位号, 身份)
+        self.public_facts = []  # 所有人都看得到的结构化事实 (死亡、处决、身份宣称)，给局势推理用
+        self.beliefs = {}  # seat_id -> [BeliefState, 已读公开事实数, 已读夜间事实数]
+        self._player_prompts = {}  # seat_id -> (渲染依据, 玩家相关的 prompt)
+        self.checkpoint_path = config.CHECKPOINT_PATH
+        self.checkpoints = None
         self.io = io_handler if io_handler else GameIO()
         self._init_seats()
 
@@ -41,10 +167,13 @@ class GameManager:
         self.io.output("\n" + "=" * 50)
         self.io.output("          血染钟楼 (AI 单机版 - Pro)")
         self.io.output("=" * 50)
+        setup_distribution(config.PLAYER_COUNT)  # 人数不在支持范围内时直接报错
+        if not 1 <= config.HUMAN_SEAT_ID <= config.PLAYER_COUNT:
+            raise ValueError(f"真人座位 {config.HUMAN_SEAT_ID} 号不在 1-{config.PLAYER_COUNT} 号之间")
         for i in range(1, config.PLAYER_COUNT + 1):
             is_human = (i == config.HUMAN_SEAT_ID)
             player = Player(i, is_human)
-            player.personality = random.choice(["理性", "激进", "伪装大师", "保守", "混乱"])
+            player.personality = self.rng.choice(config.PERSONALITIES)
             self.players.append(player)
         self.io.update_ui(self.players)
         self.io.output(f"[*] 房间初始化完成。{config.PLAYER_COUNT}名玩家已入座。")
@@ -52,74 +181,25 @@ class GameManager:
     def distribute_roles(self):
         self.io.output("\n[*] 正在洗牌与发牌...")
 
-        # 1. 预先构建池子，用于检测男爵
-        in_play_pool = []
-        dist = config.SETUP_DISTRIBUTION.copy()
-
-        # 初始抽取
-        for r_type, count in dist.items():
-            selected_names = random.sample(config.ROLES_DATA[r_type], count)
-            for name in selected_names:
-                in_play_pool.append(Role(name, r_type))
-
-        # 2. 检查男爵并执行【6人局特殊规则】：+1 外来者, -1 村民
-        has_baron = any(r.name == "男爵" for r in in_play_pool)
+        # 抽取身份、男爵调整、洗牌、酒鬼眼中身份、不在场身份 (规则见 role_setup.draw_setup)
+        seats, has_baron, drunk_perceived, self.demon_bluffs = draw_setup(self.rng, len(self.players))
         if has_baron:
-            self.io.output("[系统] 检测到男爵在场！规则调整：减少1个村民，增加1个外来者。")
-            # 移除 1 个村民
-            townsfolk_indices = [i for i, r in enumerate(in_play_pool) if r.role_type == "Townsfolk"]
-            if townsfolk_indices:
-                to_remove = random.choice(townsfolk_indices)
-                removed_role = in_play_pool.pop(to_remove)
-
-                # 增加 1 个外来者
-                current_outsider_names = [r.name for r in in_play_pool if r.role_type == "Outsider"]
-                available_outsiders = [n for n in config.ROLES_DATA["Outsider"] if n not in current_outsider_names]
-                if available_outsiders:
-                    new_outsider = random.choice(available_outsiders)
-                    in_play_pool.append(Role(new_outsider, "Outsider"))
-
-        random.shuffle(in_play_pool)
-
-        # 3. 分配身份
-        for player in self.players:
-            role = in_play_pool.pop()
-            player.assign_role(role)
+            shift = baron_shift(len(self.players))
+            self.io.output(f"[系统] 检测到男爵在场！规则调整：减少{shift}个村民，增加{shift}个外来者。")
 
-        assigned_names = [p.true_role.name for p in self.players]
-        all_townsfolk = config.ROLES_DATA["Townsfolk"]
-
-        # 4. 处理酒鬼 (将某个随机村民身份发给酒鬼)
-        for player in self.players:
-            if player.true_role.name == "酒鬼":
+        # 分配身份
+        for player, (name, r_type) in zip(self.players, seats):
+            player.assign_role(Role(name, r_type))
+            if name == "酒鬼":
                 player.is_drunk = True
-                # 试图给一个没被分配的村民身份
-                unused = [r for r in all_townsfolk if r not in assigned_names]
-                if unused:
-                    player.perceived_role = random.choice(unused)
-                else:
-                    player.perceived_role = "士兵"  # 兜底
+                player.set_perceived_role(drunk_perceived)
                 player.bluff_role = player.perceived_role  # 酒鬼以为自己是这个
 
-        # 5. 生成 Bluffs (给恶魔的伪装，必须是未使用的好人身份)
-        good_roles_pool = config.ROLES_DATA["Townsfolk"] + config.ROLES_DATA["Outsider"]
-        unused_good_roles = [r for r in good_roles_pool if r not in assigned_names and r != "酒鬼"]
-
-        # 剔除掉已经发给酒鬼的那个伪装身份
-        drunk_player = next((p for p in self.players if p.true_role.name == "酒鬼"), None)
-        if drunk_player and drunk_player.perceived_role in unused_good_roles:
-            unused_good_roles.remove(drunk_player.perceived_role)
-
-        if len(unused_good_roles) >= 3:
-            self.demon_bluffs = random.sample(unused_good_roles, 3)
-        else:
-            self.demon_bluffs = unused_good_roles
-
         self.io.update_ui(self.players)
         self.io.output(f"[*] 发牌完成。")
 
         # 告知真人玩家信息
-        human = next(p for p in self.players if p.is_human)
+        human = self.players.human
         self.io.output(f"\n>>> 你的身份是: 【{human.perceived_role}】 <<<")
         self.io.output(f">>> 阵营: {human.alignment}")
 
@@ -136,6 +216,34 @@ class GameManager:
     def _get_role_hint(self, role_name):
         return ROLE_SPECIFIC_STRATEGIES.get(role_name, "灵活行动。")
 
+    def _player_prompt(self, player):
+        """
+        玩家相关的那部分 prompt (classic 布局下是整条 system 消息，prefix_cache 布局下是 user 消息的开头)。
+        座位、眼中身份、阵营、性格都没变时复用上次渲染的结果。
+        """
+        key = (config.PROMPT_LAYOUT, player.seat_id, player.perceived_role, player.alignment, player.personality)
+        cached = self._player_prompts.get(player.seat_id)
+        if cached and cached[0] == key:
+            return cached[1]
+        tpl = PLAYER_CONTEXT_TPL if config.PROMPT_LAYOUT == "prefix_cache" else SYSTEM_TPL
+        text = tpl.render(
+            seat_id=player.seat_id, true_role=player.perceived_role,
+            alignment=player.alignment, personality=player.personality,
+            role_hint=self._get_role_hint(player.perceived_role)
+        )
+        self._player_prompts[player.seat_id] = (key, text)
+        return text
+
+    def _build_messages(self, player, user_msg):
+        """
+        组装一次 AI 决策的消息。prefix_cache 布局下 system 消息对所有玩家、所有阶段逐字节相同，
+        便于命中服务端的 prompt 前缀缓存；玩家与阶段相关的内容都放在 user 消息里。
+        """
+        if config.PROMPT_LAYOUT == "prefix_cache":
+            return [{"role": "system", "content": SYSTEM_PREFIX},
+                    {"role": "user", "content": self._player_prompt(player) + user_msg}]
+        return [{"role": "system", "content": self._player_prompt(player)}, {"role": "user", "content": user_msg}]
+
     def _get_apparent_alignment(self, target):
         if target.true_role.name == "间谍": return "善良"
         if target.true_role.name == "隐士": return "邪恶"
@@ -146,6 +254,7 @@ class GameManager:
         if target.true_role.name == "隐士": return "Minion"
         return target.true_role.role_type
 
+    @traced_phase
     def run_night_phase(self):
         self.io.output(f"\n\n>>> 夜幕降临 (第 {self.day_count} 夜) <<<")
         self.io.output("大家请闭眼...")
@@ -168,21 +277,23 @@ class GameManager:
                 else:
                     p.kill()
                     death_list.append(p.seat_id)
+                    self.public_facts.append(("night_death", self.day_count, p.seat_id))
 
         self.todays_deaths = death_list
         self.io.update_ui(self.players)
         self.io.output("\n天亮了！")
 
+    @traced_phase
     def run_night_skill_phase(self):
         for role_name in config.NIGHT_ACTION_ORDER:
             # 送葬者如果第一天或没人死，跳过
             if role_name == "送葬者" and self.last_executed_player is None: continue
 
             # 找到认为自己是该角色的玩家
-            actors = [p for p in self.players if p.perceived_role == role_name and p.is_alive]
+            actors = [p for p in self.players.perceiving(role_name) if p.is_alive]
             # 守鸦人只有死掉才发动
             if role_name == "守鸦人":
-                actors = [p for p in self.players if p.perceived_role == "守鸦人" and p.pending_death and p.is_alive]
+                actors = [p for p in actors if p.pending_death]
 
             for actor in actors:
                 # 某些角色首夜不行动，或只在首夜行动
@@ -212,18 +323,13 @@ class GameManager:
                     except:
                         pass
             else:
-                hint = self._get_role_hint(role)
-                system_msg = SYSTEM_PROMPT.format(
-                    seat_id=player.seat_id, true_role=player.perceived_role,
-                    alignment=player.alignment, personality=player.personality,
-                    role_hint=hint, TB_RULES_AND_ROLES=TB_RULES_AND_ROLES, STRATEGY_GUIDE=STRATEGY_GUIDE
-                )
-                usr_msg = NIGHT_ACTION_PROMPT.format(
+                usr_msg = NIGHT_ACTION_TPL.render(
                     day=self.day_count, perceived_role=role,
                     status_desc="状态正常", ability_desc=f"你的技能是：{role}"
                 )
                 resp = self.ai_client.query(
-                    [{"role": "system", "content": system_msg}, {"role": "user", "content": usr_msg}], json_mode=True)
+                    self._build_messages(player, usr_msg), json_mode=True,
+                    call_type="night_action", tags={"seat": player.seat_id})
                 print(f"=== AI Night {player.seat_id} ===\n{json.dumps(resp, ensure_ascii=False)}")
                 if isinstance(resp, dict):
                     targets = resp.get("targets", [])
@@ -233,7 +339,7 @@ class GameManager:
 
     def resolve_action_effect(self, actor, targets):
         role = actor.perceived_role
-        valid_targets = [t for t in targets if 1 <= t <= config.PLAYER_COUNT]
+        valid_targets = [t for t in targets if 1 <= t <= len(self.players)]
         # 酒鬼和中毒的判断放在 get_info_role_result 内部处理或这里
         # 注意：主动技能（投毒、保护、杀人）如果是酒鬼/中毒则直接失效
         is_impaired = actor.is_drunk or actor.is_poisoned
@@ -265,6 +371,7 @@ class GameManager:
         role = actor.perceived_role
         is_impaired = actor.is_poisoned or actor.is_drunk
         true_info = ""
+        fact = None  # 同一条信息的结构化形式 (kind, 天数, ...)
 
         # --- 1. 生成真实信息 ---
         # 厨师
@@ -276,17 +383,17 @@ class GameManager:
                 if app[i] == "邪恶" and app[(i + 1) % count] == "邪恶":
                     pairs += 1
             true_info = f"有 {pairs} 对邪恶玩家相邻。"
+            fact = ("chef", self.day_count, pairs)
 
         # 共情者
         elif role == "共情者":
-            alive = [p for p in self.players if p.is_alive]
-            if actor in alive:
-                idx = alive.index(actor)
-                l = alive[idx - 1]
-                r = alive[(idx + 1) % len(alive)]
+            neighbors = self.players.alive_neighbors(actor)
+            if neighbors:
+                l, r = neighbors
                 c = (1 if self._get_apparent_alignment(l) == "邪恶" else 0) + (
                     1 if self._get_apparent_alignment(r) == "邪恶" else 0)
                 true_info = f"邻居中有 {c} 个邪恶阵营。"
+                fact = ("empath", self.day_count, c, l.seat_id, r.seat_id)
 
         # 占卜师
         elif role == "占卜师":
@@ -297,17 +404,19 @@ class GameManager:
                 has = (t1.true_role.name == "小恶魔" or t2.true_role.name == "小恶魔" or
                        t1.true_role.name == "隐士" or t2.true_role.name == "隐士")  # 隐士可能被查成恶魔
                 true_info = f"查验结果：{'有' if has else '没有'} 恶魔。"
+                fact = ("fortune", self.day_count, t1.seat_id, t2.seat_id, has)
 
         # 洗衣妇
         elif role == "洗衣妇":
             ts = [p for p in self.players if self._get_apparent_role(p) == "Townsfolk" and p != actor]
             if ts:
-                t = random.choice(ts)
+                t = self.rng.choice(ts)
                 others = [p for p in self.players if p != t and p != actor]
-                decoy = random.choice(others) if others else t
+                decoy = self.rng.choice(others) if others else t
                 ids = [t.seat_id, decoy.seat_id]
-                random.shuffle(ids)
+                self.rng.shuffle(ids)
                 true_info = f"{ids[0]}号 和 {ids[1]}号 之中有一个是【{t.true_role.name}】。"
+                fact = ("pair", self.day_count, ids[0], ids[1], t.true_role.name)
             else:
                 true_info = "无其他村民。"
 
@@ -315,12 +424,13 @@ class GameManager:
         elif role == "图书管理员":
             outsiders = [p for p in self.players if self._get_apparent_role(p) == "Outsider" and p != actor]
             if outsiders:
-                t = random.choice(outsiders)
+                t = self.rng.choice(outsiders)
                 others = [p for p in self.players if p != t and p != actor]
-                decoy = random.choice(others) if others else t
+                decoy = self.rng.choice(others) if others else t
                 ids = [t.seat_id, decoy.seat_id]
-                random.shuffle(ids)
+                self.rng.shuffle(ids)
                 true_info = f"{ids[0]}号 和 {ids[1]}号 之中有一个是【{t.true_role.name}】。"
+                fact = ("pair", self.day_count, ids[0], ids[1], t.true_role.name)
             else:
                 true_info = "场上无外来者。"
 
@@ -328,14 +438,16 @@ class GameManager:
         elif role == "调查员":
             minions = [p for p in self.players if self._get_apparent_role(p) == "Minion" and p != actor]
             if minions:
-                t = random.choice(minions)
+                t = self.rng.choice(minions)
                 others = [p for p in self.players if p != t and p != actor]
-                decoy = random.choice(others) if others else t
+                decoy = self.rng.choice(others) if others else t
                 ids = [t.seat_id, decoy.seat_id]
-                random.shuffle(ids)
+                self.rng.shuffle(ids)
                 true_info = f"{ids[0]}号 和 {ids[1]}号 之中有一个是【{t.true_role.name}】。"
+                fact = ("pair", self.day_count, ids[0], ids[1], t.true_role.name)
             else:
                 true_info = "场上无爪牙。"
+                fact = ("no_minion", self.day_count)
 
         # 送葬者
         elif role == "送葬者":
@@ -343,6 +455,7 @@ class GameManager:
                 rn = self.last_executed_player.true_role.name
                 if rn == "间谍": rn = "村民"  # 间谍死后也显示为正常人（需根据规则确认，通常间谍能力到死为止，但送葬者看尸体可能被误导）
                 true_info = f"昨天被处决的是：{rn}。"
+                fact = ("undertaker", self.day_count, self.last_executed_player.seat_id, rn)
             else:
                 return None
 
@@ -354,6 +467,7 @@ class GameManager:
                 if t.true_role.name == "间谍": role_show = "村民"  # 间谍可能显示为好人
                 if t.true_role.name == "隐士": role_show = "投毒者"  # 隐士可能被误查
                 true_info = f"{t.seat_id}号的角色是：{role_show}。"
+                fact = ("ravenkeeper", self.day_count, t.seat_id, role_show)
             else:
                 return None
 
@@ -370,10 +484,11 @@ class GameManager:
         # --- 2. AI 生成假信息 (如果中毒/酒鬼) ---
         if is_impaired:
             self.io.output(f"[系统] 玩家 {actor.seat_id} ({role}) 信息受到干扰，正在生成假信息...")
-            prompt = MISINFORMATION_PROMPT.format(
+            prompt = MISINFORMATION_TPL.render(
                 seat_id=actor.seat_id, role=role, true_info=true_info
             )
-            resp = self.ai_client.query([{"role": "user", "content": prompt}], json_mode=True)
+            resp = self.ai_client.query([{"role": "user", "content": prompt}], json_mode=True,
+                                        call_type="misinformation", tags={"seat": actor.seat_id})
             if isinstance(resp, dict) and "fake_info" in resp:
                 fake = resp["fake_info"]
                 print(f"DEBUG: Real: {true_info} -> Fake: {fake}")
@@ -382,8 +497,10 @@ class GameManager:
                 # 兜底
                 return "[干扰] 你感觉有些头晕，无法获取有效信息。"
 
+        if fact: actor.night_facts.append(fact)
         return true_info
 
+    @traced_phase
     def run_night_zero_logic(self):
         self.io.output("\n[*] 正在进行首夜规划 (AI 思考中)...")
         evil_players = [p for p in self.players if p.alignment == "邪恶"]
@@ -392,27 +509,24 @@ class GameManager:
         evil_team_str = ", ".join([f"{p.seat_id}号({p.true_role.name})" for p in evil_players])
         bluffs_str = ", ".join(self.demon_bluffs)
 
-        # 1. AI 思考
+        # 1. AI 思考 (互不依赖，一次并发发出，同时在途的请求数受 LLM_MAX_CONCURRENCY 限制)
+        planners, messages = [], []
         for player in self.players:
             if player.is_human: continue
 
-            hint = self._get_role_hint(player.perceived_role)
-            system_msg = SYSTEM_PROMPT.format(
-                seat_id=player.seat_id, true_role=player.perceived_role,
-                alignment=player.alignment, personality=player.personality,
-                role_hint=hint, TB_RULES_AND_ROLES=TB_RULES_AND_ROLES, STRATEGY_GUIDE=STRATEGY_GUIDE
-            )
-
             user_msg = ""
             if player.true_role.role_type == "Demon":
-                user_msg = NIGHT_0_DEMON_PLANNING.format(teammates=evil_team_str, bluffs=bluffs_str)
+                user_msg = NIGHT_0_DEMON_TPL.render(teammates=evil_team_str, bluffs=bluffs_str)
             elif player.alignment == "邪恶":
-                user_msg = NIGHT_0_MINION_PLANNING.format(teammates=evil_team_str, demon_seat=demon_id)
+                user_msg = NIGHT_0_MINION_TPL.render(teammates=evil_team_str, demon_seat=demon_id)
             else:
-                user_msg = NIGHT_0_GOOD_PLANNING
+                user_msg = NIGHT_0_GOOD_TPL.render()
+            planners.append(player)
+            messages.append(self._build_messages(player, user_msg))
 
-            resp = self.ai_client.query(
-                [{"role": "system", "content": system_msg}, {"role": "user", "content": user_msg}], json_mode=True)
+        responses = self.ai_client.query_many(messages, json_mode=True, call_type="planning",
+                                              tags_list=[{"seat": p.seat_id} for p in planners])
+        for player, resp in zip(planners, responses):
             print(f"=== AI Night 0 {player.seat_id} ===\n{json.dumps(resp, ensure_ascii=False)}")
 
             if isinstance(resp, dict):
@@ -422,17 +536,19 @@ class GameManager:
                 player.initial_strategy["first_chat_target"] = resp.get("first_chat_target", None)
 
         # 2. 邪恶阵营强制私聊
-        human = next(p for p in self.players if p.is_human)
+        human = self.players.human
         if human.alignment == "邪恶":
             teammate = next((p for p in evil_players if p != human), None)
             if teammate:
                 self.io.output(f"\n>>> [第0夜 特殊环节] 你是邪恶阵营，正在与队友 {teammate.seat_id}号 秘密通话...")
                 self.execute_private_chat(human.seat_id, teammate.seat_id, round_num="首夜特殊轮")
 
+    @traced_phase
     def run_day_phase(self):
         self.day_count += 1
-        self.public_chat_history = []
         self.io.output(f"\n\n>>> 第 {self.day_count} 天 白天 <<<")
+        # 前几天的摘要在这里统一生效 (夜里在后台生成)
+        self.public_history.collect(self.day_count)
 
         # 播报
         announcement = ""
@@ -443,9 +559,10 @@ class GameManager:
             announcement = f"【系统】昨晚是个平安夜，无人死亡。"
 
         self.io.output(announcement)
-        self.all_public_history.append(f"Day {self.day_count}: {announcement}")
+        self.public_history.append(self.day_count, "announcement", f"Day {self.day_count}: {announcement}")
+        self.io.update_history(self.public_history)
 
-        human = next(p for p in self.players if p.is_human)
+        human = self.players.human
         if human.night_messages:
             self.io.output(f"\n[你的夜晚信息]: {human.night_messages}")
 
@@ -470,14 +587,16 @@ class GameManager:
         self.io.output("\n--- 黄昏提名环节 ---")
         self.run_nomination_phase()
 
-        self.all_public_history.extend(self.public_chat_history)
+        # 当天结束，夜晚阶段进行时在后台生成摘要
+        if self.phase != "GAME_OVER": self.public_history.close_day(self.day_count)
 
+    @traced_phase
     def run_chat_phase(self, round_num):
         self.io.output(f"[第 {round_num} 轮私聊]")
         available = [p.seat_id for p in self.players]
         pairs = []
         try:
-            human = next(p for p in self.players if p.is_human)
+            human = self.players.human
             if human.seat_id in available:
                 user_input = self.io.input(f"你 ({human.seat_id}号) 想找谁私聊？(可用: {available}, 输入0跳过): ")
                 try:
@@ -495,36 +614,57 @@ class GameManager:
         except StopIteration:
             pass
 
-        random.shuffle(available)
-        while len(available) >= 2:
+        self.rng.shuffle(available)
+        # AI 之间最多 PRIVATE_CHAT_MAX_PAIRS 对 (座位多时每轮的 LLM 调用量不随人数增长)
+        limit = len(pairs) + config.PRIVATE_CHAT_MAX_PAIRS
+        while len(available) >= 2 and len(pairs) < limit:
             pairs.append((available.pop(), available.pop()))
 
-        for p1, p2 in pairs:
-            player1 = self.players[p1 - 1]
-            player2 = self.players[p2 - 1]
-            if not player1.is_human and not player2.is_human:
-                self._execute_ai_only_chat(player1, player2, round_num)
-            else:
-                self.execute_private_chat(p1, p2, round_num)
-
-    def _execute_ai_only_chat(self, p1, p2, round_num):
+        # AI 之间的私聊在后台并发进行，真人的私聊在前台；本轮结束前统一落地聊天记录
+        background = []
+        with ThreadPoolExecutor(max_workers=config.LLM_MAX_CONCURRENCY) as pool:
+            for p1, p2 in pairs:
+                player1 = self.players[p1 - 1]
+                player2 = self.players[p2 - 1]
+                if not player1.is_human and not player2.is_human:
+                    background.append((player1, player2, self._start_ai_only_chat(pool, player1, player2, round_num)))
+            for p1, p2 in pairs:
+                if self.players[p1 - 1].is_human or self.players[p2 - 1].is_human:
+                    self.execute_private_chat(p1, p2, round_num)
+
+        for player1, player2, job in background:
+            self._commit_ai_only_chat(player1, player2, job.result())
+        if background: self.io.sleep(0.5)
+
+    def _start_ai_only_chat(self, pool, p1, p2, round_num):
+        """在线程池里跑一对 AI 之间的私聊，只调用 LLM、不改动游戏状态；结果由 _commit_ai_only_chat 在主线程落地。"""
         self.io.output(f"    ({p1.seat_id}号 和 {p2.seat_id}号 正在窃窃私语...)")
-        # 不使用 Summary，直接传完整历史（可能很长）
-        pub_hist_str = "\n".join(self.all_public_history)
-
-        p1_msg, _ = self.generate_ai_chat_reply(p1, p2, [], "（发起对话）", night_info="",
-                                                is_teammate=(p1.alignment == p2.alignment), public_history=pub_hist_str,
-                                                chat_round=round_num)
+        pub_hist_str = self._public_history("chat")
+        is_teammate = (p1.alignment == p2.alignment)
+        parent_span = get_tracer().current_span()
+
+        def _run():
+            with get_tracer().attach(parent_span):
+                resp1 = self._query_chat(p1, p2, [], "（发起对话）", night_info="", is_teammate=is_teammate,
+                                         public_history=pub_hist_str, chat_round=round_num)
+                p1_msg, _ = self._parse_chat_response(resp1)
+                resp2 = self._query_chat(p2, p1, [f"{p1.seat_id}号: {p1_msg}"], p1_msg, night_info="",
+                                         is_teammate=is_teammate, public_history=pub_hist_str, chat_round=round_num)
+                return resp1, resp2
+
+        return pool.submit(_run)
+
+    def _commit_ai_only_chat(self, p1, p2, responses):
+        resp1, resp2 = responses
+        self._log_chat_response(p1, p2, resp1)
+        p1_msg, _ = self._parse_chat_response(resp1)
         p1.add_chat_record(p2.seat_id, p1_msg, is_me=True)
         p2.add_chat_record(p1.seat_id, p1_msg, is_me=False)
 
-        history = [f"{p1.seat_id}号: {p1_msg}"]
-        p2_msg, _ = self.generate_ai_chat_reply(p2, p1, history, p1_msg, night_info="",
-                                                is_teammate=(p1.alignment == p2.alignment), public_history=pub_hist_str,
-                                                chat_round=round_num)
+        self._log_chat_response(p2, p1, resp2)
+        p2_msg, _ = self._parse_chat_response(resp2)
         p2.add_chat_record(p1.seat_id, p2_msg, is_me=True)
         p1.add_chat_record(p2.seat_id, p2_msg, is_me=False)
-        self.io.sleep(0.5)
 
     def execute_private_chat(self, seat_a, seat_b, round_num):
         player_a = self.players[seat_a - 1]
@@ -537,7 +677,7 @@ class GameManager:
         ai_player = player_b if player_a.is_human else player_a
 
         night_info_str = " | ".join(ai_player.night_messages) if ai_player.night_messages else "无"
-        pub_hist_str = "\n".join(self.all_public_history)
+        pub_hist_str = self._public_history("chat")
 
         self.io.output(f"[提示] 对方宣称身份: {ai_player.known_claims.get(human_player.seat_id, '未知')}")
         self.io.output(f"(输入 '结束' 或 '0' 结束对话)")
@@ -554,12 +694,13 @@ class GameManager:
             is_teammate = (ai_player.alignment == "邪恶" and human_player.alignment == "邪恶")
             self.io.output(f"({ai_player.seat_id}号 输入中...)")
 
+            display = StreamDisplay(self.io, f"{ai_player.seat_id}号: ", "reply")
             reply, terminate = self.generate_ai_chat_reply(
                 ai_player, human_player, chat_history, msg,
-                night_info_str, is_teammate, pub_hist_str, chat_round=round_num
+                night_info_str, is_teammate, pub_hist_str, chat_round=round_num, display=display
             )
 
-            self.io.output(f"{ai_player.seat_id}号: {reply}")
+            display.finish(reply)
             chat_history.append(f"{ai_player.seat_id}号: {reply}")
             ai_player.add_chat_record(human_player.seat_id, reply, is_me=True)
             human_player.add_chat_record(ai_player.seat_id, reply, is_me=False)
@@ -569,17 +710,25 @@ class GameManager:
                 self.io.output("(对方结束了对话)")
                 break
 
+    def _public_history(self, template):
+        """prompt 里的公开历史：往日摘要 + 当天原文，按 config.HISTORY_TOKEN_BUDGET 截断。"""
+        text, saved = self.public_history.render(template, self.day_count)
+        span = get_tracer().current_span()
+        if span: span.attrs["history_tokens_saved"] = span.attrs.get("history_tokens_saved", 0) + saved
+        return text
+
     def generate_ai_chat_reply(self, ai_player, target_player, history, last_msg, night_info="", is_teammate=False,
-                               public_history="", chat_round=1):
-        hint = self._get_role_hint(ai_player.perceived_role)
-        system_msg = SYSTEM_PROMPT.format(
-            seat_id=ai_player.seat_id, true_role=ai_player.perceived_role,
-            alignment=ai_player.alignment, personality=ai_player.personality,
-            role_hint=hint,
-            TB_RULES_AND_ROLES=TB_RULES_AND_ROLES, STRATEGY_GUIDE=STRATEGY_GUIDE
-        )
+                               public_history="", chat_round=1, display=None):
+        response = self._query_chat(ai_player, target_player, history, last_msg, night_info, is_teammate,
+                                    public_history, chat_round, display)
+        if display: display.close()
+        self._log_chat_response(ai_player, target_player, response)
+        return self._parse_chat_response(response)
+
+    def _query_chat(self, ai_player, target_player, history, last_msg, night_info="", is_teammate=False,
+                    public_history="", chat_round=1, display=None):
         target_claim = ai_player.known_claims.get(target_player.seat_id, "未知")
-        user_msg = PRIVATE_CHAT_PROMPT.format(
+        user_msg = PRIVATE_CHAT_TPL.render(
             day=self.day_count, chat_round=chat_round, target_id=target_player.seat_id,
             true_role=ai_player.perceived_role,
             alignment=ai_player.alignment, target_claim=target_claim, my_bluff=ai_player.bluff_role,
@@ -596,36 +745,45 @@ class GameManager:
             else:
                 user_msg += "\n你是爪牙。你必须问恶魔我们要跳什么身份（不在场身份）。"
 
-        messages = [{"role": "system", "content": system_msg}, {"role": "user", "content": user_msg}]
-        response = self.ai_client.query(messages, json_mode=True)
-        print(f"=== AI Chat {ai_player.seat_id} ===\n{json.dumps(response, ensure_ascii=False)}")
+        messages = self._build_messages(ai_player, user_msg)
+        return self.ai_client.query(messages, json_mode=True, on_field=display, call_type="chat",
+                                    tags={"seat": ai_player.seat_id})
 
+    @staticmethod
+    def _log_chat_response(ai_player, target_player, response):
+        print(f"=== AI Chat {ai_player.seat_id} ===\n{json.dumps(response, ensure_ascii=False)}")
         if isinstance(response, dict):
             ai_player.add_thought(f"Chat with {target_player.seat_id}: {response.get('thought')}")
-            reply_text = response.get("reply", "...")
-            should_terminate = response.get("terminate", False)
-            return reply_text, should_terminate
+
+    @staticmethod
+    def _parse_chat_response(response):
+        if isinstance(response, dict):
+            return response.get("reply", "..."), response.get("terminate", False)
         return "...", False
 
+    @traced_phase
     def run_public_speech(self, round_num=1):
         self.io.output(f"\n[公开发言 第 {round_num} 轮]")
         for player in self.players:
             if not player.is_alive: continue
             speech_content = ""
+            display = StreamDisplay(self.io, f"[{player.seat_id}号]: ", "speech")
             if player.is_human:
+                idx = self.players.index(player)
+                if round_num == config.PUBLIC_CHAT_ROUNDS and player.seat_id == self.players.alive_seats[-1]:
+                    # 真人是最后一个发言的：接下来就是提名，先把排在他前面的 AI 的提名决定算上
+                    self._prefetch_nominations(self.players[:idx], [])
                 speech_content = self.io.input(f"\n--> 轮到你 ({player.seat_id}号) 发言: ")
             else:
-                hint = self._get_role_hint(player.perceived_role)
-                system_msg = SYSTEM_PROMPT.format(
-                    seat_id=player.seat_id, true_role=player.perceived_role,
-                    alignment=player.alignment, personality=player.personality,
-                    role_hint=hint, TB_RULES_AND_ROLES=TB_RULES_AND_ROLES, STRATEGY_GUIDE=STRATEGY_GUIDE
-                )
-                full_history = "\n".join(self.all_public_history) + "\n" + "\n".join(self.public_chat_history)
-                user_msg = PUBLIC_SPEECH_PROMPT.format(day=self.day_count, round=round_num, history=full_history,
-                                                       bluff=player.bluff_role)
-                messages = [{"role": "system", "content": system_msg}, {"role": "user", "content": user_msg}]
-                response = self.ai_client.query(messages, json_mode=True)
+                # 有局势推理时它已经概括了往日可推理的事实，公开历史只留较小的预算
+                belief_note = self._belief_note(player)
+                full_history = self._public_history("speech_belief" if belief_note else "speech")
+                user_msg = PUBLIC_SPEECH_TPL.render(day=self.day_count, round=round_num, history=full_history,
+                                                    bluff=player.bluff_role) + belief_note
+                messages = self._build_messages(player, user_msg)
+                response = self.ai_client.query(messages, json_mode=True, on_field=display, call_type="speech",
+                                                tags={"seat": player.seat_id})
+                display.close()
                 print(f"=== AI Public {player.seat_id} ===\n{json.dumps(response, ensure_ascii=False)}")
                 if isinstance(response, dict):
                     player.add_thought(response.get("thought", ""))
@@ -633,11 +791,15 @@ class GameManager:
                 else:
                     speech_content = "..."
 
-            log_entry = f"{player.seat_id}号: {speech_content}"
-            self.public_chat_history.append(log_entry)
-            self.io.output(f"[{player.seat_id}号]: {speech_content}")
+            self.public_history.append(self.day_count, "speech", f"{player.seat_id}号: {speech_content}",
+                                       seat=player.seat_id)
+            claim = parse_claim(speech_content)
+            if claim: self.public_facts.append(("claim", self.day_count, player.seat_id, claim))
+            self.io.update_history(self.public_history)
+            display.finish(speech_content)
             self.io.sleep(1)
 
+    @traced_phase
     def run_nomination_phase(self):
         for p in self.players: p.has_nominated = False; p.has_voted = False; p.has_voted_this_round = False
         nominated_players = []
@@ -647,26 +809,24 @@ class GameManager:
             target_id = 0;
             reason = ""
             if player.is_human:
+                # 假设真人不提名，预取后面的 AI 的提名决定
+                self._prefetch_nominations(self.players[self.players.index(player) + 1:], nominated_players)
                 choice = self.io.input(f"\n你 ({player.seat_id}号) 要提名吗？(输入座号，回车跳过): ")
                 if choice.isdigit(): target_id = int(choice); reason = self.io.input("提名理由: ")
             else:
-                hint = self._get_role_hint(player.perceived_role)
-                system_msg = SYSTEM_PROMPT.format(
-                    seat_id=player.seat_id, true_role=player.perceived_role,
-                    alignment=player.alignment, personality=player.personality,
-                    role_hint=hint, TB_RULES_AND_ROLES=TB_RULES_AND_ROLES, STRATEGY_GUIDE=STRATEGY_GUIDE
-                )
-                user_msg = NOMINATION_PROMPT.format(day=self.day_count, nominated_players=str(nominated_players))
-                messages = [{"role": "system", "content": system_msg}, {"role": "user", "content": user_msg}]
-                response = self.ai_client.query(messages, json_mode=True)
+                response = self._ai_query(self._nomination_messages(player, nominated_players), call_type="nominate",
+                                          tags={"seat": player.seat_id})
                 print(f"=== AI Nominate {player.seat_id} ===\n{json.dumps(response, ensure_ascii=False)}")
                 if isinstance(response, dict): target_id = response.get("nominate_target", 0); reason = response.get(
                     "reason", "")
 
             if target_id > 0:
-                t = next((p for p in self.players if p.seat_id == target_id), None)
+                t = self.players.get(target_id)
                 if t and not t.has_nominated and target_id not in nominated_players:
                     self.io.output(f"\n[提名] {player.seat_id}号 提名了 {target_id}号！\n       理由: {reason}")
+                    self.public_history.append(self.day_count, "nomination",
+                                               f"[提名] {player.seat_id}号 提名了 {target_id}号，理由: {reason}",
+                                               seat=player.seat_id)
                     self.run_defense_phase(player, t, reason)
 
                     if t.true_role.name == "处女" and not t.is_poisoned:
@@ -680,6 +840,47 @@ class GameManager:
                     nominated_players.append(target_id)
                     if self.run_voting_phase(t, player, reason): self.execute_player(t); break
 
+        # 没用上的预取 (输入已经变了) 到此作废
+        self.prefetcher.discard()
+
+    def _nomination_messages(self, player, nominated_players):
+        user_msg = NOMINATION_TPL.render(day=self.day_count, nominated_players=str(nominated_players))
+        return self._build_messages(player, user_msg + self._belief_note(player))
+
+    def _vote_messages(self, player, nominee, reason, current_votes, threshold, vote_power):
+        user_msg = VOTE_TPL.render(nominee=nominee.seat_id, reason=reason, current_votes=current_votes,
+                                   threshold=threshold, vote_power=vote_power)
+        return self._build_messages(player, user_msg + self._belief_note(player))
+
+    def _belief_note(self, player):
+        """
+        好人 AI 的局势推理：按它确知的事实 (自己的夜间信息 + 公开事实) 枚举所有可能的世界，
+        把每个座位是恶魔 / 邪恶的概率附在 prompt 后面。信念按座位缓存，每次只喂新增的事实。
+        """
+        if not config.BELIEF_SOLVER or player.is_human or player.alignment != "善良": return ""
+        entry = self.beliefs.get(player.seat_id)
+        if entry is None:
+            entry = self.beliefs[player.seat_id] = [
+                BeliefState(player.seat_id, len(self.players), player.perceived_role), 0, 0]
+        belief, seen_public, seen_night = entry
+        belief.observe_all(self.public_facts[seen_public:] + player.night_facts[seen_night:])
+        entry[1], entry[2] = len(self.public_facts), len(player.night_facts)
+        return "\n\n" + belief.render(self.day_count, self.players.alive_seats)
+
+    def _prefetch_nominations(self, candidates, nominated_players):
+        """真人输入期间预取这些 AI 的提名决定 (假设轮到他们时已提名名单不变)。"""
+        for p in candidates:
+            if p.is_alive and not p.is_human and not p.has_nominated:
+                self.prefetcher.prefetch(self._nomination_messages(p, nominated_players), "nominate",
+                                         tags={"seat": p.seat_id})
+
+    def _ai_query(self, messages, call_type=None, tags=None):
+        """优先使用输入完全一致的预取结果，否则正常发起请求。"""
+        future = self.prefetcher.take(messages, call_type)
+        if future is not None:
+            return future.result()
+        return self.ai_client.query(messages, json_mode=True, call_type=call_type, tags=tags)
+
     def run_defense_phase(self, nominator, nominee, reason):
         # 简化版：复用之前的逻辑，这里略微精简
         self.io.output(f"\n=== 提名对峙: {nominator.seat_id}号 vs {nominee.seat_id}号 ===")
@@ -691,50 +892,46 @@ class GameManager:
             # 调用 LLM 生成自辩
             pass  # 实际代码请参考原版，为节省篇幅略
 
+    @traced_phase
     def run_voting_phase(self, nominee, nominator, reason):
         self.io.output(f"\n=== 投票处决: {nominee.seat_id}号 ===")
         # 重置本轮投票标记
         for p in self.players: p.has_voted_this_round = False
 
-        alive = sum(1 for p in self.players if p.is_alive)
+        alive = self.players.alive_count
         thresh = math.ceil(alive / 2)
         self.io.output(f"存活: {alive} | 需票: {thresh}")
 
         cur_votes = 0
-        idx = nominator.seat_id % config.PLAYER_COUNT
+        idx = nominator.seat_id % len(self.players)
         ordered = self.players[idx:] + self.players[:idx]
+        position = {p.seat_id: i for i, p in enumerate(ordered)}
+        spec = VoteSpeculator(self, ordered, nominee, nominator, reason, thresh) if config.VOTE_SPECULATION else None
 
         for v in ordered:
-            pwr = 1
-            if not v.is_alive: pwr = 0 if v.dead_vote_used else 1
+            pwr = self._vote_power(v)
 
             vote_decision = False
             if pwr > 0:
                 if v.is_human:
+                    if spec: spec.prefetch_branches(v, cur_votes, pwr)
                     c = self.io.input(f"你 ({v.seat_id}号) 投票给 {nominee.seat_id}号 吗？(y/n) [当前:{cur_votes}]: ")
                     vote_decision = (c.lower() == 'y')
                 else:
                     # AI 投票逻辑
-                    hint = self._get_role_hint(v.perceived_role)
-                    system_msg = SYSTEM_PROMPT.format(
-                        seat_id=v.seat_id, true_role=v.perceived_role,
-                        alignment=v.alignment, personality=v.personality,
-                        role_hint=hint, TB_RULES_AND_ROLES=TB_RULES_AND_ROLES, STRATEGY_GUIDE=STRATEGY_GUIDE
-                    )
-                    user_msg = VOTE_PROMPT.format(
-                        nominee=nominee.seat_id, reason=reason, current_votes=cur_votes,
-                        threshold=thresh, vote_power=pwr
-                    )
-                    resp = self.ai_client.query(
-                        [{"role": "system", "content": system_msg}, {"role": "user", "content": user_msg}],
-                        json_mode=True)
+                    if spec:
+                        resp = spec.result(v, cur_votes)
+                    else:
+                        resp = self.ai_client.query(
+                            self._vote_messages(v, nominee, reason, cur_votes, thresh, pwr),
+                            json_mode=True, call_type="vote", tags={"seat": v.seat_id})
                     print(f"=== AI Vote {v.seat_id} ===\n{json.dumps(resp, ensure_ascii=False)}")
                     if isinstance(resp, dict):
                         vote_decision = resp.get("vote", False)
 
             # === 管家强制判定 ===
             if v.true_role.name == "管家" and not v.is_poisoned and not v.is_drunk:
-                master = next((p for p in self.players if p.seat_id == v.master_seat_id), None)
+                master = self.players.get(v.master_seat_id)
                 if master:
                     # 规则：主人必须举手，管家才能举手。
                     # 如果主人还没轮到，管家可以先举手（赌主人会举），或者主人如果没举手，管家必须放下。
@@ -745,7 +942,7 @@ class GameManager:
                     if master.is_alive:
                         # 检查主人是否已投票
                         # 如果主人比管家先投票（在ordered列表前面）
-                        if master in ordered[:ordered.index(v)]:
+                        if master.seat_id in position and position[master.seat_id] < position[v.seat_id]:
                             if not master.has_voted_this_round and vote_decision:
                                 self.io.output(
                                     f"--> [系统] 管家 {v.seat_id}号 的主人 {master.seat_id}号 未举手，强制弃票！")
@@ -759,42 +956,56 @@ class GameManager:
                 cur_votes += 1
                 v.has_voted_this_round = True
                 if not v.is_alive: v.dead_vote_used = True
+            if spec and pwr > 0: spec.record(v, bool(vote_decision), cur_votes)
 
             self.io.sleep(0.5)
 
+        if spec: spec.close()
         self.io.output(f"投票结束。总票数: {cur_votes}")
-        return cur_votes >= thresh
+        passed = cur_votes >= thresh
+        self.public_history.append(
+            self.day_count, "vote",
+            f"[投票] {nominee.seat_id}号 得 {cur_votes} 票 (需 {thresh} 票)，{'被处决' if passed else '未被处决'}",
+            seat=nominee.seat_id)
+        self.io.update_history(self.public_history)
+        return passed
+
+    def _vote_power(self, v):
+        if not v.is_alive: return 0 if v.dead_vote_used else 1
+        return 1
 
     def execute_player(self, player):
         self.io.output(f"--> {player.seat_id}号 被处决，天黑了。")
         player.kill()
         self.last_executed_player = player
+        self.executions.append((self.day_count, player.seat_id, player.true_role.name))
         if player.true_role.name == "圣徒" and not player.is_poisoned:
             self.io.output("--> 【圣徒被处决！】邪恶阵营直接获胜！")
             self.winner = "邪恶"
             self.phase = "GAME_OVER"
             return
         self._check_game_over(player)
+        self.public_facts.append(("execution", self.day_count, player.seat_id, self.phase != "GAME_OVER"))
         self.io.update_ui(self.players)
 
     def _check_game_over(self, dead_player):
         if dead_player.true_role.role_type == "Demon":
             # 红唇女郎继承
-            sw = next((p for p in self.players if p.true_role.name == "红唇女郎" and p.is_alive), None)
-            alive_count = sum(1 for p in self.players if p.is_alive)
-            if sw and alive_count >= 4 and not sw.is_poisoned:  # 注意：红唇继承通常要求>=5人，但6人局规则可能不同，按>=5算
-                # 6人局开局，第一天死恶魔剩5人，可以继承。
+            sw = self.players.find_role("红唇女郎", alive_only=True)
+            alive_count = self.players.alive_count
+            if sw and alive_count >= 4 and not sw.is_poisoned:  # 恶魔死后还剩至少 4 人 (死前至少 5 人) 才能继承
                 self.io.output("--> 【红唇女郎】继承了恶魔！")
-                sw.true_role = Role("小恶魔", "Demon")
+                # 她从今晚起按小恶魔行动，玩家 prompt 随眼中身份一起重新渲染
+                sw.inherit_role(Role("小恶魔", "Demon"))
                 self.io.update_ui(self.players)
                 return
             self.winner = "善良"
             self.phase = "GAME_OVER"
             return
 
-        alive_count = sum(1 for p in self.players if p.is_alive)
-        evil_count = sum(1 for p in self.players if p.is_alive and p.alignment == "邪恶")
-        has_demon = any(p.is_alive and p.true_role.role_type == "Demon" for p in self.players)
+        alive_count = self.players.alive_count
+        evil_count = self.players.evil_alive_count
+        has_demon = self.players.demon_alive_count > 0
 
         if has_demon:
             if alive_count <= 2:
@@ -805,15 +1016,18 @@ class GameManager:
                 self.winner = "邪恶"
                 self.phase = "GAME_OVER"
 
+    @traced_phase
     def run_day_skill_phase(self):
-        human = next(p for p in self.players if p.is_human)
+        human = self.players.human
         # 杀手技能修复
         if human.perceived_role == "杀手" and human.is_alive:
             # 只有还没用过技能才询问（需加标记，此处简化）
+            # 接下来就是提名，先预取排在真人前面的 AI 的提名决定
+            self._prefetch_nominations(self.players[:self.players.index(human)], [])
             choice = self.io.input(f"\n[技能] 你是杀手。要发动技能吗？(输入目标座号，回车跳过): ")
             if choice.strip() and choice.isdigit():
                 target_id = int(choice)
-                target = next((p for p in self.players if p.seat_id == target_id), None)
+                target = self.players.get(target_id)
                 if target:
                     self.io.output(f"--> 你向 {target_id}号 开枪了！")
                     is_impaired = human.is_drunk or human.is_poisoned
@@ -822,17 +1036,44 @@ class GameManager:
                             self.io.output("--> 砰！他是恶魔！他死了！")
                             target.kill()
                             self._check_game_over(target)
+                            self.public_facts.append(("demon_killed", self.day_count, target.seat_id))
                             self.io.update_ui(self.players)
                         else:
                             self.io.output("--> 什么也没发生。")
                     else:
                         self.io.output("--> 什么也没发生。")
 
-    def start_game_loop(self):
-        self.distribute_roles()
-        self.run_night_phase()
-        while self.phase != "GAME_OVER":
-            self.run_day_phase()
-            if self.phase != "GAME_OVER": self.run_night_phase()
-            if self.day_count > 10: self.io.output("达到最大回合数，平局。"); break
-        self.io.output(f"\n游戏结束！获胜阵营: {self.winner}")
\ No newline at end of file
+    def _checkpoint(self, next_step):
+        """阶段边界存档：这里只做序列化 (毫秒级)，压缩和落盘在后台线程。"""
+        if self.checkpoints: self.checkpoints.save(checkpoint.capture(self, next_step))
+
+    def start_game_loop(self, next_step="setup"):
+        """next_step 为 "night" / "day" 时从存档恢复的阶段边界继续。"""
+        if self.checkpoint_path: self.checkpoints = checkpoint.CheckpointWriter(self.checkpoint_path)
+        try:
+            if next_step == "setup":
+                self.distribute_roles()
+                next_step = "night"
+                self._checkpoint(next_step)
+            while self.phase != "GAME_OVER":
+                if next_step == "night":
+                    self.run_night_phase()
+                    next_step = "day"
+                    if self.day_count > 10: self.io.output("达到最大回合数，平局。"); break
+                else:
+                    self.run_day_phase()
+                    next_step = "night"
+                self._checkpoint(next_step)
+        except BaseException:
+            # 中途退出 (崩溃 / Ctrl+C)：等最后一份存档写完，留给 --resume
+            if self.checkpoints: self.checkpoints.close()
+            raise
+        if self.checkpoints:
+            # 对局正常结束，存档不再需要
+            self.checkpoints.close(remove=True)
+        self.io.output(f"\n游戏结束！获胜阵营: {self.winner}")
+        get_tracer().write_prometheus()
+        if hasattr(self.ai_client, "usage_summary"):
+            print(f"[*] LLM 用量: {self.ai_client.usage_summary()}")
+        print(f"[*] {self.public_history.summary()}")
+        print(f"[*] {self.prefetcher.summary()}")
\ No newline at end of file
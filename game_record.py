@@ -0,0 +1,280 @@
+import json
+import random
+import threading
+from collections import deque
+
+import config
+from ai.llm_backends import RecordBackend, ReplayBackend, create_backend
+from ai.llm_cache import ResponseCache
+from ai.qwen_client import QwenClient
+from engine.game_manager import GameManager, GameIO
+
+RECORD_VERSION = 1
+
+# 影响对局走向的配置，录制时一并保存，回放前恢复
+RECORDED_CONFIG = ("PLAYER_COUNT", "HUMAN_SEAT_ID", "SETUP_DISTRIBUTION", "LLM_MODEL", "PROMPT_LAYOUT",
+                   "PUBLIC_CHAT_ROUNDS", "PRIVATE_CHAT_MAX_PAIRS", "PERSONALITIES", "HISTORY_SUMMARY_ENABLED",
+                   "HISTORY_SUMMARY_CHARS", "HISTORY_TOKEN_BUDGET", "VOTE_SPECULATION", "PREFETCH_ENABLED",
+                   "BELIEF_SOLVER")
+
+
+class Divergence(Exception):
+    """回放与录像不一致 (代码改动后行为变了)。"""
+
+
+def _plain(value):
+    """把抽取结果转成可以写进 JSON 并比较的形式 (Role 之类的对象用 str)。"""
+    if isinstance(value, (list, tuple)): return [_plain(v) for v in value]
+    if value is None or isinstance(value, (int, float, str, bool)): return value
+    return str(value)
+
+
+class TracedRandom(random.Random):
+    """每次 choice / sample / shuffle 的结果都交给 on_draw(op, value)。"""
+
+    def __init__(self, seed=None, on_draw=None):
+        super().__init__(seed)
+        self.on_draw = on_draw
+
+    def _draw(self, op, value):
+        if self.on_draw: self.on_draw(op, value)
+
+    def choice(self, seq):
+        value = super().choice(seq)
+        self._draw("choice", value)
+        return value
+
+    def sample(self, population, k, **kwargs):
+        value = super().sample(population, k, **kwargs)
+        self._draw("sample", value)
+        return value
+
+    def shuffle(self, x):
+        super().shuffle(x)
+        self._draw("shuffle", x)
+
+
+class GameRecorder:
+    """
+    整局录像：随机种子、每次随机抽取、每次真人输入、每次 LLM 输出，按发生顺序逐行写入 JSONL。
+    LLM 记录与 replay 后端的 transcript 格式相同，同一个文件可以直接交给 ReplayBackend。
+    """
+
+    def __init__(self, path, seed):
+        self.path = path
+        self.seed = seed
+        self._lock = threading.Lock()  # LLM 记录在后台事件循环线程里写入
+        self._f = open(path, "w", encoding="utf-8")
+        self.closed = False
+        self.write({"t": "start", "version": RECORD_VERSION, "seed": seed,
+                    "config": {k: getattr(config, k) for k in RECORDED_CONFIG}})
+
+    def write(self, event):
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self.closed: return
+            self._f.write(line)
+
+    def on_draw(self, op, value):
+        self.write({"t": "rng", "op": op, "v": _plain(value)})
+
+    def on_input(self, prompt, value):
+        self.write({"t": "input", "prompt": prompt, "v": value})
+
+    def llm_sink(self, record):
+        self.write(dict(record, t="llm"))
+
+    def finish(self, gm):
+        self.write({"t": "end", "winner": gm.winner, "day_count": gm.day_count,
+                    "executions": _plain(list(gm.executions))})
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            self._f.close()
+
+
+class GameReplayer:
+    """
+    读取录像，按顺序核对随机抽取与真人输入；第一次对不上就抛出 Divergence。
+    LLM 请求找不到录制结果时：前台请求直接判为不一致；预取 / 投票预测这类后台请求是否发出取决于时序，
+    录制时还没开始就被取消的请求回放时可能会真的发出，只计数。后台结果被用上了则会在随机抽取或结局上对不上。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._rng = deque()
+        self._inputs = deque()
+        self.divergence = None
+        self.end = None
+        self.llm_misses = []
+        with open(path, "r", encoding="utf-8") as f:
+            events = [json.loads(line) for line in f if line.strip()]
+        if not events or events[0].get("t") != "start":
+            raise ValueError(f"{path} 不是对局录像")
+        start = events[0]
+        if start.get("version") != RECORD_VERSION:
+            raise ValueError(f"录像版本 {start.get('version')} 不受支持 (当前 {RECORD_VERSION})")
+        self.seed = start["seed"]
+        self.config = start.get("config", {})
+        for e in events[1:]:
+            if e["t"] == "rng": self._rng.append(e)
+            elif e["t"] == "input": self._inputs.append(e)
+            elif e["t"] == "end": self.end = e
+
+    def _diverge(self, message):
+        if self.divergence is None: self.divergence = message
+        raise Divergence(self.divergence)
+
+    def check(self):
+        if self.divergence is not None: raise Divergence(self.divergence)
+
+    def on_draw(self, op, value):
+        self.check()
+        expected = self._rng.popleft() if self._rng else None
+        if expected is None or expected["op"] != op or expected["v"] != _plain(value):
+            self._diverge(f"随机抽取不一致: 录像 {expected and (expected['op'], expected['v'])}，"
+                          f"回放 {(op, _plain(value))}")
+
+    def next_input(self, prompt):
+        self.check()
+        expected = self._inputs.popleft() if self._inputs else None
+        if expected is None or expected["prompt"] != prompt:
+            self._diverge(f"真人输入提示不一致: 录像 {expected and expected['prompt']!r}，回放 {prompt!r}")
+        return expected["v"]
+
+    def on_llm_miss(self, key, background=False):
+        """在事件循环线程里调用，不在这里抛出：记下不一致，由对局线程在下一次核对时抛出。"""
+        if background:
+            self.llm_misses.append(key)
+        elif self.divergence is None:
+            self.divergence = f"LLM 请求不在录像中: {key}"
+
+    def finish(self, gm):
+        self.check()
+        if self._rng or self._inputs:
+            self._diverge(f"对局提前结束：录像中还有 {len(self._rng)} 次随机抽取、{len(self._inputs)} 次输入未回放")
+        if self.end is None: return  # 录制中断的录像没有结局可比
+        got = {"winner": gm.winner, "day_count": gm.day_count, "executions": _plain(list(gm.executions))}
+        expected = {k: self.end.get(k) for k in got}
+        if got != expected:
+            self._diverge(f"结局不一致: 录像 {expected}，回放 {got}")
+
+
+class _ReplayClient(QwenClient):
+    """回放用客户端：每次前台请求返回后立即核对，请求不在录像中就在对局线程里抛出 Divergence。"""
+
+    def __init__(self, replayer, **kwargs):
+        super().__init__(**kwargs)
+        self.replayer = replayer
+
+    def query(self, *args, **kwargs):
+        result = super().query(*args, **kwargs)
+        self.replayer.check()
+        return result
+
+    def query_many(self, *args, **kwargs):
+        results = super().query_many(*args, **kwargs)
+        self.replayer.check()
+        return results
+
+
+class _IOProxy(GameIO):
+    """包一层 GameIO，除 input / sleep 外原样转发。"""
+
+    def __init__(self, inner):
+        self.inner = inner
+
+    def output(self, text): self.inner.output(text)
+
+    def input(self, prompt): return self.inner.input(prompt)
+
+    def sleep(self, seconds): self.inner.sleep(seconds)
+
+    def update_ui(self, players): self.inner.update_ui(players)
+
+    def update_history(self, history): self.inner.update_history(history)
+
+    def begin_stream(self, prefix): self.inner.begin_stream(prefix)
+
+    def stream_text(self, text): self.inner.stream_text(text)
+
+    def end_stream(self): self.inner.end_stream()
+
+
+class RecordingIO(_IOProxy):
+    def __init__(self, inner, recorder):
+        super().__init__(inner)
+        self.recorder = recorder
+
+    def input(self, prompt):
+        value = self.inner.input(prompt)
+        self.recorder.on_input(prompt, value)
+        return value
+
+
+class ReplayIO(_IOProxy):
+    """回放：真人输入取自录像，不做任何停顿。"""
+
+    def __init__(self, inner, replayer):
+        super().__init__(inner)
+        self.replayer = replayer
+
+    def input(self, prompt):
+        self.inner.output(prompt)
+        value = self.replayer.next_input(prompt)
+        self.inner.output(f"> {value}")
+        return value
+
+    def sleep(self, seconds): pass
+
+
+def record_game(path, seed=None, io_handler=None, backend=None, on_ready=None):
+    """
+    录制一局。backend 默认按 config.LLM_BACKEND 创建；录制期间不使用响应缓存。
+    on_ready(gm) 在开局前调用 (如把自动驾驶绑定到对局上)。
+    """
+    seed = seed if seed is not None else random.randrange(2 ** 32)
+    recorder = GameRecorder(path, seed)
+    client = None
+    try:
+        client = QwenClient(cache=ResponseCache(mode="off"),
+                            backend=RecordBackend(inner=backend or create_backend(), sink=recorder.llm_sink))
+        gm = GameManager(io_handler=RecordingIO(io_handler or GameIO(), recorder), ai_client=client,
+                         rng=TracedRandom(seed, recorder.on_draw))
+        if on_ready: on_ready(gm)
+        gm.start_game_loop()
+        recorder.finish(gm)
+    finally:
+        # 后台请求 (预取、摘要、被取消的预测) 收尾后再关文件，回放时它们也都能找到记录
+        if client: client.wait_idle()
+        recorder.close()
+    return gm
+
+
+def replay_game(path, io_handler=None):
+    """按录像重跑一局：不发任何网络请求；与录像不一致时抛出 Divergence。"""
+    replayer = GameReplayer(path)
+    # 录像里的配置只在回放期间生效，结束 (包括不一致抛出) 后恢复
+    saved = {k: getattr(config, k) for k in replayer.config if hasattr(config, k)}
+    client = None
+    try:
+        for k, v in replayer.config.items(): setattr(config, k, v)
+        client = _ReplayClient(replayer, cache=ResponseCache(mode="off"),
+                               backend=ReplayBackend(path=path, on_miss=replayer.on_llm_miss))
+        gm = GameManager(io_handler=ReplayIO(io_handler or GameIO(), replayer), ai_client=client,
+                         rng=TracedRandom(replayer.seed, replayer.on_draw))
+        gm.checkpoint_path = None
+        gm.start_game_loop()
+        client.wait_idle()
+        replayer.finish(gm)
+    finally:
+        if client: client.wait_idle()
+        for k in replayer.config:
+            if k in saved:
+                setattr(config, k, saved[k])
+            else:
+                delattr(config, k)
+    if replayer.llm_misses:
+        print(f"[Warning] {len(replayer.llm_misses)} 次后台 LLM 请求 (预取/预测) 不在录像中")
+    return gm
@@ -0,0 +1,101 @@
+import sys
+from array import array
+
+import config
+from engine.player_manager import Player
+
+# 角色编号：按类型顺序排列 config.ROLES_DATA，编号即下标
+ROLE_TYPES = ("Townsfolk", "Outsider", "Minion", "Demon")
+ROLE_NAMES = tuple(name for t in ROLE_TYPES for name in config.ROLES_DATA[t])
+ROLE_IDS = {name: i for i, name in enumerate(ROLE_NAMES)}
+ROLE_TYPE_OF = tuple(ROLE_TYPES.index(t) for t in ROLE_TYPES for _ in config.ROLES_DATA[t])
+NO_ROLE = 255
+
+PHASES = ("SETUP", "GAME_OVER")
+WINNERS = (None, "善良", "邪恶")
+
+# 布尔状态的比特位，与 Player._flags 相同
+FLAG_MASKS = {name: getattr(Player, name).mask for name in Player.FLAGS}
+
+
+class GameState:
+    """
+    面向大规模模拟的紧凑对局状态：每个字段一个定长数组 (struct-of-arrays)，座位号 - 1 为下标。
+    只保存规则结算需要的东西，聊天记录、思考日志等 LLM 上下文不在这里。
+    """
+
+    __slots__ = ("day", "phase", "winner", "last_executed", "role", "perceived", "flags", "master", "bluffs")
+
+    def __init__(self, player_count):
+        self.day = 0
+        self.phase = 0  # PHASES 下标
+        self.winner = 0  # WINNERS 下标
+        self.last_executed = -1  # 座位下标，-1 为无
+        self.role = array("B", [NO_ROLE]) * player_count  # 真实身份
+        self.perceived = array("B", [NO_ROLE]) * player_count  # 自己以为的身份 (酒鬼不同)
+        self.flags = array("H", [0]) * player_count
+        self.master = array("b", [-1]) * player_count  # 管家的主人 (座位下标)
+        self.bluffs = array("B")  # 恶魔的不在场身份
+
+    def __len__(self):
+        return len(self.role)
+
+    @classmethod
+    def from_game(cls, gm):
+        """从 GameManager 的对象模型转换。"""
+        state = cls.from_players(gm.players)
+        state.day = gm.day_count
+        state.phase = PHASES.index(gm.phase) if gm.phase in PHASES else 0
+        state.winner = WINNERS.index(gm.winner) if gm.winner in WINNERS else 0
+        last = gm.last_executed_player
+        state.last_executed = last.seat_id - 1 if last else -1
+        state.bluffs = array("B", (ROLE_IDS[name] for name in gm.demon_bluffs))
+        return state
+
+    @classmethod
+    def from_players(cls, players):
+        state = cls(len(players))
+        for i, p in enumerate(players):
+            if p.true_role: state.role[i] = ROLE_IDS[p.true_role.name]
+            if p.perceived_role: state.perceived[i] = ROLE_IDS[p.perceived_role]
+            state.flags[i] = p._flags
+            if p.master_seat_id is not None: state.master[i] = p.master_seat_id - 1
+        return state
+
+    def copy(self):
+        other = GameState.__new__(GameState)
+        other.day, other.phase, other.winner, other.last_executed = \
+            self.day, self.phase, self.winner, self.last_executed
+        other.role, other.perceived, other.flags, other.master, other.bluffs = \
+            self.role[:], self.perceived[:], self.flags[:], self.master[:], self.bluffs[:]
+        return other
+
+    # ---------------- 访问 ----------------
+    def has(self, seat, flag):
+        return bool(self.flags[seat] & FLAG_MASKS[flag])
+
+    def set(self, seat, flag, value=True):
+        mask = FLAG_MASKS[flag]
+        self.flags[seat] = (self.flags[seat] | mask) if value else (self.flags[seat] & ~mask)
+
+    def seats(self, flag, value=True):
+        """flag 为 value 的座位下标。"""
+        mask = FLAG_MASKS[flag]
+        return [i for i, f in enumerate(self.flags) if bool(f & mask) == value]
+
+    def role_name(self, seat):
+        r = self.role[seat]
+        return ROLE_NAMES[r] if r != NO_ROLE else None
+
+    def role_type(self, seat):
+        r = self.role[seat]
+        return ROLE_TYPES[ROLE_TYPE_OF[r]] if r != NO_ROLE else None
+
+    def is_evil(self, seat):
+        r = self.role[seat]
+        return r != NO_ROLE and ROLE_TYPE_OF[r] >= 2
+
+    def nbytes(self):
+        """本对象及其数组实际占用的内存 (字节)。"""
+        return sys.getsizeof(self) + sum(sys.getsizeof(getattr(self, f)) for f in
+                                         ("role", "perceived", "flags", "master", "bluffs"))
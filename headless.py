@@ -0,0 +1,113 @@
+import random
+import re
+import time
+
+from engine.game_manager import GameManager, GameIO
+
+
+class Autopilot:
+    """
+    真人座位的自动驾驶：按输入提示的内容给出合法的回答 (私聊、发言、提名、投票、夜间目标)。
+    决策是简单的随机规则，同一个 seed 得到同样的回答序列。
+    """
+
+    SPEECHES = ["我昨晚没有得到什么有用的信息。", "我是好人，大家可以先听听其他人的。", "我觉得有人在说谎。"]
+    CHAT_MESSAGES = ["你是什么身份？", "我信你，我们一起找恶魔。", "你昨晚有信息吗？"]
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.gm = None
+        self._chat_turns = 0
+
+    def bind(self, gm):
+        self.gm = gm
+
+    def _me(self):
+        return next((p for p in self.gm.players if p.is_human), None) if self.gm else None
+
+    def _other_alive(self):
+        if not self.gm: return []
+        me = self._me()
+        return [p.seat_id for p in self.gm.players if p.is_alive and p is not me]
+
+    def __call__(self, prompt):
+        if "想找谁私聊" in prompt:
+            m = re.search(r"可用: \[([\d, ]*)\]", prompt)
+            me = self._me()
+            seats = [int(x) for x in m.group(1).split(",") if x.strip()] if m else []
+            seats = [s for s in seats if not me or s != me.seat_id]
+            self._chat_turns = 0
+            return str(self.rng.choice(seats)) if seats and self.rng.random() < 0.5 else "0"
+        if prompt.strip() == "我:":
+            self._chat_turns += 1
+            return self.rng.choice(self.CHAT_MESSAGES) if self._chat_turns == 1 else "0"
+        if "发言" in prompt:
+            return self.rng.choice(self.SPEECHES)
+        if "要提名吗" in prompt:
+            others = self._other_alive()
+            return str(self.rng.choice(others)) if others and self.rng.random() < 0.3 else ""
+        if "提名理由" in prompt:
+            return "他的发言有问题。"
+        if "自辩" in prompt:
+            return "我是好人，请不要处决我。"
+        if "投票给" in prompt:
+            return "y" if self.rng.random() < 0.5 else "n"
+        if prompt.strip() == ">":
+            # 夜间行动目标：给两个，单目标角色只取第一个
+            others = self._other_alive()
+            return " ".join(str(s) for s in self.rng.sample(others, min(2, len(others))))
+        return ""
+
+
+class ScriptedIO(GameIO):
+    """无界面 IO：输出记在内存里 (lines)，输入交给 responder(prompt)，sleep 一律跳过。"""
+
+    def __init__(self, responder=None, echo=False):
+        self.lines = []
+        self.responder = responder or Autopilot()
+        self.echo = echo
+        self._stream = None
+
+    def output(self, text: str):
+        self.lines.append(text)
+        if self.echo: print(text)
+
+    def input(self, prompt: str) -> str:
+        self.output(prompt)
+        answer = self.responder(prompt)
+        self.output(f"> {answer}")
+        return answer
+
+    def sleep(self, seconds: float): pass
+
+    def begin_stream(self, prefix: str): self._stream = [prefix]
+
+    def stream_text(self, text: str):
+        if self._stream is not None: self._stream.append(text)
+
+    def end_stream(self):
+        if self._stream is not None: self.output("".join(self._stream))
+        self._stream = None
+
+
+def run_headless_game(seed=None, ai_client=None, echo=False):
+    """
+    无人值守跑一局：真人座位由 Autopilot 接管，没有任何停顿。
+    返回本局结果 (胜方、天数、处决记录、耗时、LLM 用量、输出日志)。
+    """
+    autopilot = Autopilot(seed)
+    io = ScriptedIO(autopilot, echo=echo)
+    gm = GameManager(io_handler=io, ai_client=ai_client, rng=random.Random(seed))
+    gm.checkpoint_path = None  # 批量对局可能并行跑，不写存档
+    autopilot.bind(gm)
+    started = time.monotonic()
+    gm.start_game_loop()
+    return {
+        "seed": seed,
+        "winner": gm.winner,
+        "day_count": gm.day_count,
+        "executions": list(gm.executions),
+        "duration": time.monotonic() - started,
+        "llm": gm.ai_client.usage_totals if hasattr(gm.ai_client, "usage_totals") else None,
+        "lines": io.lines,
+    }
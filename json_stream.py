@@ -0,0 +1,134 @@
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+# 需要边生成边显示的字段 (公开发言 / 私聊回复)
+STREAM_FIELDS = ("speech", "reply")
+
+
+class JsonFieldExtractor:
+    """
+    增量 JSON 扫描器：逐段喂入模型输出，顶层对象里指定字段的字符串值一到就回调 on_field(field, text)，
+    不必等整个 JSON 生成完。只识别第一层的字符串字段；第一个 '{' 之前的内容 (如 ```json) 会被跳过。
+    """
+
+    def __init__(self, fields=STREAM_FIELDS, on_field=None):
+        self.fields = set(fields)
+        self.on_field = on_field
+        self.depth = 0
+        self.started = False
+        self.closed = False  # 顶层对象已经闭合
+        self.end_offset = None  # 闭合的 '}' 之后的位置 (相对于所有已喂入的文本)
+        self._pos = 0
+
+        self._in_str = False
+        self._esc = False
+        self._uni = None  # 正在读取的 \uXXXX 十六进制位
+        self._high_surrogate = None
+        self._is_key = False
+        self._expect_key = False
+        self._after_colon = False
+        self._key_buf = []
+        self._last_key = None
+        self._capture = None  # 当前正在输出的字段名
+        self._out = []
+
+    def feed(self, text):
+        for ch in text:
+            if self.closed: break
+            self._pos += 1
+            if not self.started:
+                if ch == '{':
+                    self.started = True
+                    self.depth = 1
+                    self._expect_key = True
+                continue
+            if self._in_str:
+                self._feed_string_char(ch)
+            else:
+                self._feed_structural_char(ch)
+        self._flush()
+        return self.closed
+
+    def _feed_string_char(self, ch):
+        if self._uni is not None:
+            self._uni += ch
+            if len(self._uni) == 4:
+                try:
+                    code = int(self._uni, 16)
+                except ValueError:
+                    code = 0xFFFD
+                self._uni = None
+                if 0xD800 <= code < 0xDC00:
+                    self._high_surrogate = code
+                    return
+                if 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+                    code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+                self._high_surrogate = None
+                self._emit(chr(code))
+            return
+        if self._esc:
+            self._esc = False
+            if ch == 'u':
+                self._uni = ""
+            else:
+                self._emit(_ESCAPES.get(ch, ch))
+            return
+        if ch == '\\':
+            self._esc = True
+        elif ch == '"':
+            self._in_str = False
+            if self._is_key:
+                self._last_key = "".join(self._key_buf)
+            self._capture = None
+        else:
+            self._emit(ch)
+
+    def _feed_structural_char(self, ch):
+        if ch == '"':
+            self._in_str = True
+            self._is_key = self.depth == 1 and self._expect_key
+            if self._is_key:
+                self._key_buf = []
+                self._expect_key = False
+            elif self.depth == 1 and self._after_colon and self._last_key in self.fields:
+                self._capture = self._last_key
+            self._after_colon = False
+        elif ch in '{[':
+            self.depth += 1
+            self._after_colon = False
+        elif ch in '}]':
+            self.depth -= 1
+            if self.depth == 0:
+                self.closed = True
+                self.end_offset = self._pos
+        elif ch == ':' and self.depth == 1:
+            self._after_colon = True
+        elif ch == ',' and self.depth == 1:
+            self._expect_key = True
+        elif not ch.isspace():
+            self._after_colon = False
+
+    def _emit(self, ch):
+        if self._is_key:
+            self._key_buf.append(ch)
+        elif self._capture:
+            if self._out and self._out[-1][0] == self._capture:
+                self._out[-1][1].append(ch)
+            else:
+                self._out.append((self._capture, [ch]))
+
+    def _flush(self):
+        out, self._out = self._out, []
+        if self.on_field:
+            for field, chars in out:
+                self.on_field(field, "".join(chars))
+
+
+def iter_field_text(chunks, field):
+    """迭代器接口：输入模型输出的分段文本，逐段产出指定字段的内容。"""
+    pending = []
+    extractor = JsonFieldExtractor(fields=(field,), on_field=lambda f, text: pending.append(text))
+    for chunk in chunks:
+        extractor.feed(chunk)
+        while pending:
+            yield pending.pop(0)
+        if extractor.closed: break
@@ -0,0 +1,227 @@
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import random
+import re
+
+import config
+from ai.llm_cache import make_cache_key
+
+# 已注册的后端: 名称 -> 类
+BACKENDS = {}
+
+# 当前请求是否为后台请求 (预取 / 投票预测)：结果不一定会被用上，由客户端在发请求的任务里设置
+background_call = contextvars.ContextVar("background_call", default=False)
+
+
+def register_backend(name):
+    """类装饰器：把后端注册到 BACKENDS，供 config.LLM_BACKEND 按名字选择。"""
+
+    def _wrap(cls):
+        cls.name = name
+        BACKENDS[name] = cls
+        return cls
+
+    return _wrap
+
+
+def create_backend(name=None):
+    name = name or config.LLM_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"未知的 LLM 后端: {name} (可选: {', '.join(BACKENDS)})")
+    return BACKENDS[name]()
+
+
+class LLMBackend:
+    """
+    LLM 传输层接口。stream() 是异步生成器，逐段产出模型输出的文本；
+    调用方提前结束迭代（对冲落败、超时）时应释放底层连接。
+    usage 不为 None 时，后端把 token 用量 (prompt_tokens / completion_tokens) 写进去。
+    """
+    name = ""
+
+    async def stream(self, model, messages, usage=None, **options):
+        raise NotImplementedError
+        yield
+
+
+def _transcript_key(model, messages):
+    # 录制与回放都不区分 json_mode，模型输出的原文本身与之无关
+    return make_cache_key(model, messages, True)
+
+
+def _chunks(text, size):
+    for i in range(0, len(text), size):
+        yield text[i: i + size]
+
+
+@register_backend("openai")
+class OpenAIBackend(LLMBackend):
+    """OpenAI 兼容接口 (默认指向 DashScope)。"""
+
+    def __init__(self):
+        from openai import AsyncOpenAI
+        self.client = AsyncOpenAI(
+            api_key=config.DASHSCOPE_API_KEY,
+            base_url=config.LLM_API_BASE,
+        )
+
+    async def stream(self, model, messages, usage=None, **options):
+        # 移除 enable_thinking，依靠 System Prompt 引导思考
+        completion = await self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            **options
+        )
+        try:
+            async for chunk in completion:
+                # 用量在最后一个 (choices 为空的) chunk 里；提前断流时拿不到
+                if usage is not None and getattr(chunk, "usage", None):
+                    usage["prompt_tokens"] = chunk.usage.prompt_tokens
+                    usage["completion_tokens"] = chunk.usage.completion_tokens
+                    # 命中服务端前缀缓存的 prompt token 数 (不支持的服务端不返回)
+                    details = getattr(chunk.usage, "prompt_tokens_details", None)
+                    cached = getattr(details, "cached_tokens", None) if details else None
+                    if cached is not None: usage["cached_tokens"] = cached
+                if not chunk.choices: continue
+                delta = chunk.choices[0].delta
+                if hasattr(delta, "content") and delta.content:
+                    yield delta.content
+        finally:
+            # 被取消（对冲输掉/超时）时及时关闭连接
+            await completion.close()
+
+
+@register_backend("record")
+class RecordBackend(LLMBackend):
+    """
+    包装真实后端，把每次输出追加写入 transcript 文件 (JSONL)，供 replay 后端回放。
+    sink 不为 None 时改为把记录交给 sink(record) (如整局录像)。
+    被取消 / 出错的请求也记下已收到的部分 (partial)，回放时优先使用完整的记录。
+    """
+
+    def __init__(self, inner=None, path=None, sink=None):
+        self.inner = inner or OpenAIBackend()
+        self.path = path or config.LLM_TRANSCRIPT_PATH
+        self.sink = sink
+
+    async def stream(self, model, messages, usage=None, **options):
+        inner = self.inner.stream(model, messages, usage=usage, **options)
+        parts = []
+        complete = False
+        try:
+            async for text in inner:
+                parts.append(text)
+                yield text
+            complete = True
+        except GeneratorExit:
+            # 调用方读到完整 JSON 后主动断流，录下到此为止的内容
+            complete = True
+            raise
+        finally:
+            await inner.aclose()
+            record = {"key": _transcript_key(model, messages), "text": "".join(parts)}
+            if not complete: record["partial"] = True
+            if self.sink is not None:
+                self.sink(record)
+            elif complete:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+@register_backend("replay")
+class ReplayBackend(LLMBackend):
+    """
+    按 transcript 文件回放。相同请求出现多次时按录制顺序依次返回。
+    文件中没有 key 的行 (如整局录像里的其他事件) 会被跳过；找不到请求时调用 on_miss(key, background) 后报错。
+    """
+
+    def __init__(self, path=None, on_miss=None):
+        self.path = path or config.LLM_TRANSCRIPT_PATH
+        self.on_miss = on_miss
+        self._records = {}  # key -> [(text, partial)...]
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip(): continue
+                    rec = json.loads(line)
+                    if "key" not in rec: continue
+                    self._records.setdefault(rec["key"], []).append((rec["text"], rec.get("partial", False)))
+
+    async def stream(self, model, messages, usage=None, **options):
+        key = _transcript_key(model, messages)
+        queue = self._records.get(key)
+        if not queue:
+            if self.on_miss: self.on_miss(key, background_call.get())
+            raise KeyError("transcript 中没有该请求的录制结果")
+        # 每条记录只用一次：比录制时多出来的同样请求会走上面的 on_miss，回放据此判为不一致
+        idx = next((i for i, (_, partial) in enumerate(queue) if not partial), 0)
+        text = queue.pop(idx)[0]
+        for part in _chunks(text, 16):
+            yield part
+
+
+@register_backend("stub")
+class StubBackend(LLMBackend):
+    """
+    离线确定性桩：根据 prompt 中要求返回的字段，生成符合模板格式的 JSON。
+    同样的消息总是得到同样的结果；latency 模拟网络延迟 (秒)。
+    用量按字符数估算，system 消息见过的视作命中前缀缓存。
+    """
+
+    SPEECHES = ["我觉得场上有人在隐藏信息。", "昨晚我没什么发现，先听听大家的。", "我是好人，别投我。",
+                "刚才那位的发言有点问题。", "我同意前面的看法。"]
+    REPLIES = ["你是什么身份？", "我信你，一起找恶魔。", "你的信息和我对不上。", "好的，待会儿听我的。"]
+
+    def __init__(self, latency=None, chunk_size=8):
+        self.latency = config.LLM_STUB_LATENCY if latency is None else latency
+        self.chunk_size = chunk_size
+        self._seen_prefixes = set()
+
+    def build_response(self, messages):
+        prompt = messages[-1]["content"] if messages else ""
+        seed = hashlib.sha256(json.dumps(messages, ensure_ascii=False).encode("utf-8")).digest()
+        rng = random.Random(seed)
+        seats = list(range(1, config.PLAYER_COUNT + 1))
+        own = next((m for m in (re.search(r"座位号：(\d+)", msg.get("content") or "") for msg in messages) if m), None)
+        others = [s for s in seats if not own or s != int(own.group(1))] or seats
+
+        resp = {"thought": "（桩）按规则随机决策。"}
+        if '"summary"' in prompt:
+            resp = {"summary": "（桩）" + "；".join(line[:20] for line in prompt.splitlines() if "号" in line)[:100]}
+        elif '"targets"' in prompt:
+            resp["targets"] = rng.sample(others, min(2, len(others)))
+        elif '"vote"' in prompt:
+            resp["vote"] = rng.random() < 0.5
+        elif '"speech"' in prompt:
+            resp["speech"] = rng.choice(self.SPEECHES)
+        elif '"reply"' in prompt:
+            resp["reply"] = rng.choice(self.REPLIES)
+            resp["terminate"] = rng.random() < 0.3
+        elif '"nominate_target"' in prompt:
+            resp["nominate_target"] = rng.choice([0] + others) if rng.random() < 0.5 else 0
+            resp["reason"] = "他的发言前后矛盾。"
+        elif '"fake_info"' in prompt:
+            resp = {"fake_info": f"{rng.choice(seats)}号 和 {rng.choice(seats)}号 之中有一个是坏人。"}
+        elif '"bluff_role"' in prompt:
+            resp["bluff_role"] = rng.choice(config.ROLES_DATA["Townsfolk"])
+            resp["first_chat_target"] = rng.choice(others)
+        return resp
+
+    async def stream(self, model, messages, usage=None, **options):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        text = json.dumps(self.build_response(messages), ensure_ascii=False)
+        if usage is not None:
+            # 粗略按字符数估算
+            usage["prompt_tokens"] = sum(len(m.get("content") or "") for m in messages)
+            usage["completion_tokens"] = len(text)
+            prefix = (messages[0].get("content") or "") if messages else ""
+            usage["cached_tokens"] = len(prefix) if prefix in self._seen_prefixes else 0
+            self._seen_prefixes.add(prefix)
+        for part in _chunks(text, self.chunk_size):
+            yield part
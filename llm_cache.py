@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import config
+
+# 缓存模式
+CACHE_READ_THROUGH = "read_through"  # 先查缓存，未命中再请求并写回
+CACHE_WRITE_ONLY = "write_only"  # 只写不读（用于预热/录制）
+CACHE_OFF = "off"
+CACHE_MODES = (CACHE_READ_THROUGH, CACHE_WRITE_ONLY, CACHE_OFF)
+
+
+def make_cache_key(model, messages, json_mode):
+    """按 (model, messages, json_mode) 生成内容寻址的缓存键。"""
+    payload = json.dumps([model, messages, bool(json_mode)], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    LLM 响应缓存：内存 LRU + 有容量上限的磁盘存储。
+    磁盘上每条记录一个文件，文件名即缓存键；超出上限时按最近访问时间淘汰。
+    """
+
+    def __init__(self, mode=None, cache_dir=None, max_entries=None, max_disk_bytes=None):
+        self.mode = mode or config.LLM_CACHE_MODE
+        if self.mode not in CACHE_MODES:
+            raise ValueError(f"未知的缓存模式: {self.mode}")
+        self.cache_dir = cache_dir if cache_dir is not None else config.LLM_CACHE_DIR
+        self.max_entries = max_entries or config.LLM_CACHE_MEMORY_ENTRIES
+        self.max_disk_bytes = max_disk_bytes or config.LLM_CACHE_DISK_MAX_BYTES
+
+        self._memory = OrderedDict()
+        self._disk_sizes = {}
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+        if self.enabled and self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._scan_disk()
+
+    @property
+    def enabled(self):
+        return self.mode != CACHE_OFF
+
+    @property
+    def readable(self):
+        return self.mode == CACHE_READ_THROUGH
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def _scan_disk(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"): continue
+            path = os.path.join(self.cache_dir, name)
+            st = os.stat(path)
+            entries.append((st.st_mtime, name[:-5], st.st_size))
+        # 按访问时间从旧到新排列，淘汰时从头开始
+        for _, key, size in sorted(entries):
+            self._disk_sizes[key] = size
+
+    def get(self, key):
+        """查缓存，未命中返回 None。"""
+        if not self.readable:
+            return None
+
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.stats["hits"] += 1
+            # 内存里存序列化后的文本，每次取出都是新对象，调用方改了也不影响缓存
+            return json.loads(self._memory[key])
+
+        if self.cache_dir and key in self._disk_sizes:
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    text = f.read()
+                value = json.loads(text)
+                os.utime(self._path(key))
+                self._disk_sizes[key] = self._disk_sizes.pop(key)
+                self._remember(key, text)
+                self.stats["hits"] += 1
+                return value
+            except (OSError, ValueError):
+                self._disk_sizes.pop(key, None)
+
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        text = json.dumps(value, ensure_ascii=False)
+        self._remember(key, text)
+        self.stats["writes"] += 1
+        if not self.cache_dir:
+            return
+
+        data = text.encode("utf-8")
+        tmp_path = self._path(key) + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f"[Warning] 写入 LLM 缓存失败: {e}")
+            return
+        self._disk_sizes.pop(key, None)
+        self._disk_sizes[key] = len(data)
+        self._evict_disk()
+
+    def _remember(self, key, text):
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        total = sum(self._disk_sizes.values())
+        while total > self.max_disk_bytes and self._disk_sizes:
+            key = next(iter(self._disk_sizes))
+            total -= self._disk_sizes.pop(key)
+            self.stats["evictions"] += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def summary(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        rate = self.stats["hits"] / lookups if lookups else 0.0
+        return (f"[Cache] 模式={self.mode} 命中={self.stats['hits']} 未命中={self.stats['misses']} "
+                f"命中率={rate:.0%} 写入={self.stats['writes']} 淘汰={self.stats['evictions']}")
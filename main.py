@@ -1,8 +1,70 @@
+import argparse
+import os
+
+import config
 from engine.game_manager import GameManager
 
 
 def main():
+    parser = argparse.ArgumentParser(description="AI Blood on the Clocktower")
+    parser.add_argument("--headless", action="store_true", help="无人值守：真人座位由自动驾驶接管，不等待任何输入")
+    parser.add_argument("--games", type=int, default=1, help="无人值守模式下连续跑的局数")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子 (第 i 局使用 seed + i)")
+    parser.add_argument("--turbo", action="store_true", help="跳过所有节奏停顿")
+    parser.add_argument("--players", type=int, default=None, help=f"人数 (5-20)，默认 {config.PLAYER_COUNT}")
+    parser.add_argument("--record", metavar="PATH", help="录制本局 (随机抽取、真人输入、LLM 输出) 到录像文件")
+    parser.add_argument("--replay", metavar="PATH", help="按录像重跑一局，不发网络请求")
+    parser.add_argument("--resume", metavar="PATH", nargs="?", const=config.CHECKPOINT_PATH,
+                        help=f"从存档继续上一局 (默认 {config.CHECKPOINT_PATH})")
+    args = parser.parse_args()
+
+    if args.turbo: config.TURBO = True
+    if args.players: config.PLAYER_COUNT = args.players
+
+    if args.replay:
+        from engine.game_record import replay_game, Divergence
+        try:
+            gm = replay_game(args.replay)
+            print(f"[*] 回放完成，与录像一致。胜方 {gm.winner}, {gm.day_count} 天")
+        except Divergence as e:
+            print(f"[Error] 回放在第一次不一致处停止: {e}")
+        return
+
+    if args.resume:
+        from engine.checkpoint import resume_game, CheckpointError
+        try:
+            resume_game(args.resume)
+        except (OSError, CheckpointError) as e:
+            print(f"[Error] 无法读取存档 {args.resume}: {e}")
+        except KeyboardInterrupt:
+            print("\n游戏被用户中断。")
+        return
+
+    if args.record:
+        from engine.game_record import record_game
+        io_handler, on_ready = None, None
+        if args.headless:
+            from engine.headless import Autopilot, ScriptedIO
+            config.TURBO = True
+            autopilot = Autopilot(args.seed)
+            io_handler, on_ready = ScriptedIO(autopilot), autopilot.bind
+        gm = record_game(args.record, seed=args.seed, io_handler=io_handler, on_ready=on_ready)
+        print(f"[*] 录像已保存到 {args.record}。胜方 {gm.winner}, {gm.day_count} 天")
+        return
+
+    if args.headless:
+        from engine.headless import run_headless_game
+        config.TURBO = True
+        for i in range(args.games):
+            seed = None if args.seed is None else args.seed + i
+            result = run_headless_game(seed=seed)
+            print(f"[*] 第 {i + 1} 局: 胜方 {result['winner']}, {result['day_count']} 天, "
+                  f"处决 {len(result['executions'])} 人, 耗时 {result['duration']:.1f}s")
+        return
+
     print("正在启动 AI Blood on the Clocktower (Single Player)...")
+    if config.CHECKPOINT_PATH and os.path.exists(config.CHECKPOINT_PATH):
+        print(f"[*] 发现未完成的对局存档 {config.CHECKPOINT_PATH}，可用 --resume 继续 (开始新局会覆盖它)")
 
     # 实例化游戏管理器
     gm = GameManager()
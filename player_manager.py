@@ -1,9 +1,48 @@
+import bisect
+
 from engine.roles.base_role import Role
 
 
+class _Flag:
+    """Player 的布尔状态，打包存放在 _flags 的一个比特里。"""
+    __slots__ = ("mask",)
+
+    def __init__(self, bit: int):
+        self.mask = 1 << bit
+
+    def __get__(self, obj, owner=None):
+        if obj is None: return self
+        return bool(obj._flags & self.mask)
+
+    def __set__(self, obj, value):
+        obj._flags = (obj._flags | self.mask) if value else (obj._flags & ~self.mask)
+
+
 class Player:
+    __slots__ = ("seat_id", "_flags", "true_role", "perceived_role", "bluff_role", "alignment",
+                 "personality", "ai_thought_log", "known_teammates", "demon_bluffs", "initial_strategy",
+                 "night_messages", "night_facts", "master_seat_id", "known_claims", "private_chat_history",
+                 "_seats")
+
+    # 布尔状态 (比特位与 GameState.flags 一致)
+    FLAGS = ("is_human", "is_alive", "is_drunk", "is_poisoned", "is_protected", "is_demon_target",
+             "pending_death", "has_voted_this_round", "has_voted", "has_nominated", "dead_vote_used")
+    is_human = _Flag(0)
+    is_alive = _Flag(1)
+    is_drunk = _Flag(2)
+    is_poisoned = _Flag(3)
+    is_protected = _Flag(4)
+    is_demon_target = _Flag(5)
+    pending_death = _Flag(6)
+    has_voted_this_round = _Flag(7)  # 本轮投票是否已举手
+    has_voted = _Flag(8)  # 死人票标记 (整局游戏)
+    has_nominated = _Flag(9)  # 每日是否已提名
+    dead_vote_used = _Flag(10)  # 真正记录死人票是否用过
+
     def __init__(self, seat_id: int, is_human: bool = False):
         self.seat_id = seat_id
+        self._seats = None  # 所在的 Seats (身份变化、死亡时通知它更新索引)
+        self._flags = 0
         self.is_human = is_human
 
         # 身份相关
@@ -21,32 +60,38 @@ class Player:
 
         # 状态与信息缓冲
         self.night_messages = []
-        self.pending_death = False
+        self.night_facts = []  # 整局累计的夜间信息 (只含未受干扰的)，结构化后给局势推理用
 
         # 特殊状态
         self.master_seat_id = None  # 管家的主人
-        self.has_voted_this_round = False  # 本轮投票是否已举手
 
         # 社交记忆
         self.known_claims = {}
         self.private_chat_history = {}
 
-        # 状态标记
+        # 状态标记 (其余布尔状态默认为 False)
         self.is_alive = True
-        self.is_drunk = False
-        self.is_poisoned = False
-        self.is_protected = False
-        self.is_demon_target = False
-
-        self.has_voted = False  # 死人票标记 (整局游戏)
-        self.has_nominated = False  # 每日是否已提名
-        self.dead_vote_used = False  # 真正记录死人票是否用过
 
     def assign_role(self, role: Role):
+        if self._seats is not None: self._seats._unindex(self)
         self.true_role = role
         self.alignment = role.alignment
         self.perceived_role = role.name
         self.bluff_role = role.name
+        if self._seats is not None: self._seats._index(self)
+
+    def set_perceived_role(self, name: str):
+        """眼中身份与真实身份不同 (酒鬼)。"""
+        if self._seats is not None: self._seats._unindex(self)
+        self.perceived_role = name
+        if self._seats is not None: self._seats._index(self)
+
+    def inherit_role(self, role: Role):
+        """继承新身份 (红唇女郎成为恶魔)：真实身份与眼中身份一起变，伪装身份不变。"""
+        if self._seats is not None: self._seats._unindex(self)
+        self.true_role = role
+        self.perceived_role = role.name
+        if self._seats is not None: self._seats._index(self)
 
     def add_thought(self, thought: str):
         self.ai_thought_log.append(f"Day {len(self.ai_thought_log)}: {thought}")
@@ -59,7 +104,11 @@ class Player:
 
     def kill(self):
         if self.is_alive:
+            if self._seats is not None: self._seats._unindex(self)
             self.is_alive = False
+            if self._seats is not None:
+                self._seats._index(self)
+                self._seats._unlink(self.seat_id)
             return True
         return False
 
@@ -78,4 +127,100 @@ class Player:
         if self.is_poisoned: state_mark += "[毒]"
         if self.is_protected: state_mark += "[盾]"
         if self.is_drunk: state_mark += "[酒]"
-        return f"{self.seat_id}号{human_tag} {role_show}{state_mark} ({status})"
\ No newline at end of file
+        return f"{self.seat_id}号{human_tag} {role_show}{state_mark} ({status})"
+
+
+def _insort_by_seat(players, p):
+    """按座位号把 p 插进已排序的列表 (bisect 的 key= 参数要 Python 3.10+)。入座顺序插入时只比较一次。"""
+    i = len(players)
+    while i and players[i - 1].seat_id > p.seat_id: i -= 1
+    players.insert(i, p)
+
+
+class Seats(list):
+    """
+    按座位顺序排列的玩家列表，附带增量维护的索引：座位号 -> 玩家、真实 / 眼中身份 -> 玩家、真人、
+    存活人数 / 存活邪恶人数 / 存活恶魔数、存活座位的环形顺序，以及存活玩家的双向链表座位环 (邻居查询 O(1))。
+    玩家的 kill / assign_role / set_perceived_role / inherit_role 会通知这里，各阶段的查询都不再扫描全部玩家。
+    """
+
+    def __init__(self, players=()):
+        super().__init__()
+        self.human = None
+        self.alive_count = 0
+        self.evil_alive_count = 0
+        self.demon_alive_count = 0
+        self.alive_seats = []  # 存活玩家的座位号 (升序，即环形顺序)
+        self._left = {}  # 存活座位环：座位号 -> 左侧 (座位号更小一侧) 最近的存活座位号
+        self._right = {}  # 座位号 -> 右侧最近的存活座位号
+        self._by_seat = {}
+        self._by_role = {}  # 真实身份名 -> [玩家...] (按座位排序)
+        self._by_perceived = {}  # 眼中身份名 -> [玩家...]
+        for p in players: self.append(p)
+
+    def append(self, player):
+        super().append(player)
+        player._seats = self
+        self._by_seat[player.seat_id] = player
+        if player.is_human: self.human = player
+        self._index(player)
+        if player.is_alive: self._link(player.seat_id)
+
+    # ---------------- 索引维护 ----------------
+    def _index(self, p):
+        if p.true_role: _insort_by_seat(self._by_role.setdefault(p.true_role.name, []), p)
+        if p.perceived_role: _insort_by_seat(self._by_perceived.setdefault(p.perceived_role, []), p)
+        if p.is_alive:
+            self.alive_count += 1
+            if p.alignment == "邪恶": self.evil_alive_count += 1
+            if p.true_role and p.true_role.role_type == "Demon": self.demon_alive_count += 1
+            bisect.insort(self.alive_seats, p.seat_id)
+
+    def _unindex(self, p):
+        if p.true_role: self._by_role[p.true_role.name].remove(p)
+        if p.perceived_role: self._by_perceived[p.perceived_role].remove(p)
+        if p.is_alive:
+            self.alive_count -= 1
+            if p.alignment == "邪恶": self.evil_alive_count -= 1
+            if p.true_role and p.true_role.role_type == "Demon": self.demon_alive_count -= 1
+            del self.alive_seats[bisect.bisect_left(self.alive_seats, p.seat_id)]
+
+    def _link(self, seat):
+        """把存活座位接进座位环 (入座时)，左右邻居取自 alive_seats。"""
+        seats = self.alive_seats
+        i = bisect.bisect_left(seats, seat)
+        left, right = seats[i - 1], seats[(i + 1) % len(seats)]
+        self._left[seat], self._right[seat] = left, right
+        self._right[left], self._left[right] = seat, seat
+
+    def _unlink(self, seat):
+        """玩家死亡：从座位环上摘下，左右邻居直接相连。"""
+        left, right = self._left.pop(seat), self._right.pop(seat)
+        if left != seat: self._right[left], self._left[right] = right, left
+
+    # ---------------- 查询 ----------------
+    def get(self, seat_id):
+        """按座位号取玩家，没有这个座位返回 None。"""
+        return self._by_seat.get(seat_id)
+
+    def index(self, player, *args):
+        if not args and self._by_seat.get(getattr(player, "seat_id", None)) is player:
+            return player.seat_id - 1
+        return super().index(player, *args)
+
+    def with_role(self, name):
+        """真实身份为 name 的玩家 (按座位顺序)。"""
+        return self._by_role.get(name, [])
+
+    def find_role(self, name, alive_only=False):
+        return next((p for p in self.with_role(name) if p.is_alive or not alive_only), None)
+
+    def perceiving(self, name):
+        """自以为是 name 的玩家 (按座位顺序，酒鬼按他以为的身份)。"""
+        return self._by_perceived.get(name, [])
+
+    def alive_neighbors(self, player):
+        """存活玩家环上 player 左右两侧最近的存活玩家 (只剩自己时都是自己)；player 已死返回 None。"""
+        seat = player.seat_id
+        if seat not in self._left: return None
+        return self._by_seat[self._left[seat]], self._by_seat[self._right[seat]]
\ No newline at end of file
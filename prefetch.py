@@ -0,0 +1,59 @@
+import itertools
+
+import config
+from ai.llm_cache import make_cache_key
+
+
+class Prefetcher:
+    """
+    真人输入期间的预取：提前把输入已经确定的 AI 请求发出去，按完整消息内容寻址。
+    之后真正发起同样的请求 (消息逐字节一致) 时直接取预取结果；对不上的在阶段结束时丢弃。
+    """
+
+    def __init__(self, ai_client):
+        self.ai_client = ai_client
+        self._futures = {}  # key -> (预取编号, Future)
+        self._ids = itertools.count(1)
+        self.stats = {"prefetched": 0, "hits": 0, "discarded": 0, "wasted_tokens": 0}
+
+    @staticmethod
+    def _key(messages, call_type, json_mode=True):
+        return call_type, make_cache_key(config.LLM_MODEL, messages, json_mode)
+
+    def prefetch(self, messages, call_type, tags=None, json_mode=True):
+        if not config.PREFETCH_ENABLED: return
+        key = self._key(messages, call_type, json_mode)
+        if key in self._futures: return
+        prefetch_id = next(self._ids)
+        tags = dict(tags or {}, prefetch=prefetch_id)
+        future = self.ai_client.submit(messages, json_mode=json_mode, call_type=call_type, tags=tags,
+                                       background=True)
+        self._futures[key] = (prefetch_id, future)
+        self.stats["prefetched"] += 1
+
+    def take(self, messages, call_type, json_mode=True):
+        """取出与这次请求完全一致的预取 Future；没有则返回 None。"""
+        entry = self._futures.pop(self._key(messages, call_type, json_mode), None)
+        if entry is None: return None
+        self.stats["hits"] += 1
+        return entry[1]
+
+    def discard(self):
+        """丢弃所有未被取用的预取 (输入已经变了)，并统计浪费的 token。"""
+        if not self._futures: return
+        wasted = {}
+        for prefetch_id, future in self._futures.values():
+            future.cancel()
+            wasted[prefetch_id] = future
+        self._futures = {}
+        self.stats["discarded"] += len(wasted)
+        # 已完成的请求，其用量已经记在 call_metrics 里
+        for m in self.ai_client.call_metrics:
+            if m.get("prefetch") in wasted:
+                self.stats["wasted_tokens"] += (m.get("prompt_tokens") or 0) + (m.get("completion_tokens") or 0)
+
+    def summary(self):
+        s = self.stats
+        rate = s["hits"] / s["prefetched"] if s["prefetched"] else 0.0
+        return (f"预取: {s['prefetched']} 次, 命中 {s['hits']} 次 ({rate:.0%}), 丢弃 {s['discarded']} 次, "
+                f"浪费 {s['wasted_tokens']} tokens")
@@ -0,0 +1,55 @@
+from string import Formatter
+
+
+class CompiledTemplate:
+    """
+    预编译的 prompt 模板：导入时把 str.format 风格的模板切成 字面量/占位符 片段并校验占位符，
+    渲染时只需把参数填进对应位置再拼接。static 中的字段在编译时就直接并入字面量。
+    """
+
+    def __init__(self, name, template, fields=(), static=None):
+        self.name = name
+        self.fields = tuple(fields)
+        static = static or {}
+
+        found = set()
+        parts = []
+        slots = []  # (parts 下标, 字段名)
+        literal_buf = []
+
+        def _flush():
+            if literal_buf:
+                parts.append("".join(literal_buf))
+                literal_buf.clear()
+
+        for literal, field, spec, conversion in Formatter().parse(template):
+            if literal:
+                literal_buf.append(literal)
+            if field is None: continue
+            if not field.isidentifier() or spec or conversion:
+                raise ValueError(f"模板 {name} 不支持的占位符: {{{field}}}")
+            found.add(field)
+            if field in static:
+                literal_buf.append(str(static[field]))
+            else:
+                _flush()
+                slots.append((len(parts), field))
+                parts.append("")
+        _flush()
+
+        expected = set(self.fields) | set(static)
+        if found != expected:
+            raise ValueError(f"模板 {name} 占位符不匹配: 多出 {sorted(found - expected)}，缺少 {sorted(expected - found)}")
+
+        self._parts = parts
+        self._slots = slots
+
+    def render(self, **kwargs):
+        """与 template.format(**kwargs) 结果相同；缺少字段时抛 KeyError，多余字段忽略。"""
+        parts = list(self._parts)
+        for idx, field in self._slots:
+            parts[idx] = str(kwargs[field])
+        return "".join(parts)
+
+    def __repr__(self):
+        return f"CompiledTemplate({self.name}, fields={self.fields})"
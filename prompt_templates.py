@@ -1,3 +1,5 @@
+from ai.prompt_compiler import CompiledTemplate
+
 # ==============================================================================
 # 角色专属攻略库 (深度扩充版)
 # ==============================================================================
@@ -263,21 +265,8 @@ STRATEGY_GUIDE = """
 # Prompt 模板
 # ==============================================================================
 
-SYSTEM_PROMPT = f"""
-你正在扮演桌面游戏《血染钟楼》中的一名玩家。
-当前板子：灾祸滋生 (Trouble Brewing)。
-座位号：{{seat_id}}。
-你眼中的身份：【{{true_role}}】。
-阵营：【{{alignment}}】。
-性格：{{personality}}
-
-=== 你的角色攻略 ===
-{{role_hint}}
-
-=== 规则与战术 ===
-{{TB_RULES_AND_ROLES}}
-{{STRATEGY_GUIDE}}
-
+# 输出要求 (所有布局共用)
+OUTPUT_CONTRACT = """
 === 思考模式与输出要求 ===
 你必须完全沉浸在角色中。
 请在输出 JSON 时，务必包含 "thought" 字段。
@@ -301,6 +290,45 @@ SYSTEM_PROMPT = f"""
 2. **严格 JSON 格式**。
 """
 
+SYSTEM_PROMPT = f"""
+你正在扮演桌面游戏《血染钟楼》中的一名玩家。
+当前板子：灾祸滋生 (Trouble Brewing)。
+座位号：{{seat_id}}。
+你眼中的身份：【{{true_role}}】。
+阵营：【{{alignment}}】。
+性格：{{personality}}
+
+=== 你的角色攻略 ===
+{{role_hint}}
+
+=== 规则与战术 ===
+{{TB_RULES_AND_ROLES}}
+{{STRATEGY_GUIDE}}
+{OUTPUT_CONTRACT}"""
+
+# 前缀缓存布局 (config.PROMPT_LAYOUT = "prefix_cache")：
+# system 消息只放规则、攻略、输出要求这些静态内容，对所有玩家和阶段逐字节一致，能命中服务端的前缀缓存；
+# 座位、身份、性格等放到每条 user 消息的开头。
+SYSTEM_PREFIX = f"""
+你正在扮演桌面游戏《血染钟楼》中的一名玩家。
+当前板子：灾祸滋生 (Trouble Brewing)。
+你的座位、身份、阵营和性格见每条消息开头的【你的身份】。
+
+=== 规则与战术 ===
+{TB_RULES_AND_ROLES}
+{STRATEGY_GUIDE}
+{OUTPUT_CONTRACT}"""
+
+PLAYER_CONTEXT_PROMPT = """=== 你的身份 ===
+座位号：{seat_id}。
+你眼中的身份：【{true_role}】。
+阵营：【{alignment}】。
+性格：{personality}
+
+=== 你的角色攻略 ===
+{role_hint}
+"""
+
 # 恶魔专用规划 (知道伪装)
 NIGHT_0_DEMON_PLANNING = """
 现在是第 0 天夜晚。你是【恶魔】。
@@ -397,7 +425,7 @@ NOMINATION_PROMPT = """
 
 返回 JSON：
 {{
-    "thought": "分析是否需要提名（现在的票型对我们有利吗？我要不要带节奏？）...",
+    "thought": "分析是否需要提名（现在的票型对我们有利吗？我要不要带节奏？）...（80字以内）",
     "nominate_target": 目标座位号(int) 或 0 (不提名),
     "reason": "提名理由（中文，要有说服力，比如‘他逻辑盘不通’、‘他不敢跳身份’）"
 }}
@@ -424,7 +452,7 @@ VOTE_PROMPT = """
 
 返回 JSON：
 {{
-    "thought": "分析票型（这票投下去会发生什么？会不会把队友卖了？会不会误伤好人？）...",
+    "thought": "分析票型（这票投下去会发生什么？会不会把队友卖了？会不会误伤好人？）...（80字以内）",
     "vote": true/false
 }}
 """
@@ -534,4 +562,70 @@ MISINFORMATION_PROMPT = """
 {{
     "fake_info": "你的假信息内容（直接给结论，不要加解释）"
 }}
-"""
\ No newline at end of file
+"""
+
+# 历史压缩：把已结束的一天的公开记录压成摘要 (不带任何玩家视角)
+HISTORY_SUMMARY_SYSTEM = """
+你是桌面游戏《血染钟楼》的记录员，负责把一天的公开记录整理成简短、客观的摘要。纯中文输出，严格 JSON 格式。
+"""
+
+HISTORY_SUMMARY_PROMPT = """
+以下是第 {day} 天的全部公开记录：
+{history}
+
+请压缩成摘要（{limit}字以内），必须保留：
+- 死亡/处决结果
+- 每个人对外宣称的身份和公布的信息（座位号写清楚）
+- 明确的指认、互保和矛盾
+不要加入你自己的推理。
+
+返回 JSON：
+{{
+    "summary": "摘要内容"
+}}
+"""
+
+# ==============================================================================
+# 预编译模板 (导入时校验占位符；规则与攻略这类静态长文本在编译时直接并入)
+# ==============================================================================
+SYSTEM_TPL = CompiledTemplate(
+    "SYSTEM_PROMPT", SYSTEM_PROMPT,
+    fields=("seat_id", "true_role", "alignment", "personality", "role_hint"),
+    static={"TB_RULES_AND_ROLES": TB_RULES_AND_ROLES, "STRATEGY_GUIDE": STRATEGY_GUIDE})
+PLAYER_CONTEXT_TPL = CompiledTemplate("PLAYER_CONTEXT_PROMPT", PLAYER_CONTEXT_PROMPT,
+                                      fields=("seat_id", "true_role", "alignment", "personality", "role_hint"))
+NIGHT_0_DEMON_TPL = CompiledTemplate("NIGHT_0_DEMON_PLANNING", NIGHT_0_DEMON_PLANNING, fields=("teammates", "bluffs"))
+NIGHT_0_MINION_TPL = CompiledTemplate("NIGHT_0_MINION_PLANNING", NIGHT_0_MINION_PLANNING,
+                                      fields=("teammates", "demon_seat"))
+NIGHT_0_GOOD_TPL = CompiledTemplate("NIGHT_0_GOOD_PLANNING", NIGHT_0_GOOD_PLANNING)
+PUBLIC_SPEECH_TPL = CompiledTemplate("PUBLIC_SPEECH_PROMPT", PUBLIC_SPEECH_PROMPT,
+                                     fields=("day", "round", "bluff", "history"))
+NOMINATION_TPL = CompiledTemplate("NOMINATION_PROMPT", NOMINATION_PROMPT, fields=("day", "nominated_players"))
+VOTE_TPL = CompiledTemplate("VOTE_PROMPT", VOTE_PROMPT,
+                            fields=("nominee", "reason", "current_votes", "threshold", "vote_power"))
+NIGHT_ACTION_TPL = CompiledTemplate("NIGHT_ACTION_PROMPT", NIGHT_ACTION_PROMPT,
+                                    fields=("day", "perceived_role", "status_desc", "ability_desc"))
+PRIVATE_CHAT_TPL = CompiledTemplate(
+    "PRIVATE_CHAT_PROMPT", PRIVATE_CHAT_PROMPT,
+    fields=("day", "chat_round", "target_id", "true_role", "my_bluff", "target_claim", "public_history", "history",
+            "last_msg"))
+MISINFORMATION_TPL = CompiledTemplate("MISINFORMATION_PROMPT", MISINFORMATION_PROMPT,
+                                      fields=("seat_id", "role", "true_info"))
+HISTORY_SUMMARY_TPL = CompiledTemplate("HISTORY_SUMMARY_PROMPT", HISTORY_SUMMARY_PROMPT,
+                                       fields=("day", "history", "limit"))
+
+# ==============================================================================
+# 各类调用的输出限制 (作为 max_tokens / stop 传给 LLM)
+# ==============================================================================
+# 客户端收到完整的顶层 JSON 后会主动断开流，这里的 max_tokens 只是兜底，
+# 防止 thought 无限展开。JSON 中会出现任意文本，所以不设 stop 序列。
+CALL_OPTIONS = {
+    "vote": {"max_tokens": 300},  # VOTE_PROMPT
+    "nominate": {"max_tokens": 400},  # NOMINATION_PROMPT
+    "night_action": {"max_tokens": 500},  # NIGHT_ACTION_PROMPT
+    "chat": {"max_tokens": 600},  # PRIVATE_CHAT_PROMPT
+    "speech": {"max_tokens": 600},  # PUBLIC_SPEECH_PROMPT
+    "misinformation": {"max_tokens": 200},  # MISINFORMATION_PROMPT
+    "planning": {"max_tokens": 800},  # NIGHT_0_*_PLANNING
+    "summary": {"max_tokens": 500},  # HISTORY_SUMMARY_PROMPT
+}
\ No newline at end of file
@@ -0,0 +1,175 @@
+from collections import deque
+
+import config
+from ai.prompt_templates import HISTORY_SUMMARY_SYSTEM, HISTORY_SUMMARY_TPL
+
+# 日志条目类型
+ENTRY_KINDS = ("announcement", "speech", "nomination", "vote")
+
+
+def estimate_tokens(text):
+    """粗略估算 token 数：中文约 1 字 1 token，其余字符约 4 个 1 token。"""
+    cjk = sum(1 for ch in text if ord(ch) > 0x2E7F)
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class LogEntry:
+    __slots__ = ("day", "kind", "seat", "text", "tokens")
+
+    def __init__(self, day, kind, text, seat=None):
+        if kind not in ENTRY_KINDS:
+            raise ValueError(f"未知的日志类型: {kind}")
+        self.day = day
+        self.kind = kind
+        self.seat = seat
+        self.text = text
+        self.tokens = estimate_tokens(text) + 1  # 含换行
+
+    def __repr__(self):
+        return f"LogEntry(day={self.day}, kind={self.kind}, seat={self.seat}, text={self.text!r})"
+
+
+class PublicHistory:
+    """
+    全场公开记录 (播报、公开发言、提名、投票结果) 的只追加日志，按天分组。
+    视图 (全文 / 某一天 / 最近 N 条)：追加只记一行，读取时才拼接，拼好的文本按版本号缓存，没有新追加就直接复用。
+    一天结束后 close_day() 在后台把当天记录压成摘要，下一天开始时 collect() 收下 (还没好就等)；
+    render() 给 prompt 用：已收下摘要的天数用摘要 (摘要失败时用原文)，当天用原文，总量超出预算时从最早的内容丢起。
+    摘要只在 collect() 这个固定时刻生效，prompt 文本不取决于后台请求什么时候返回。
+    """
+
+    def __init__(self, ai_client=None, tail_size=20):
+        self.ai_client = ai_client
+        self.entries = []
+        self.days = {}  # day -> [LogEntry...]
+        self.summaries = {}  # day -> 摘要文本
+        self._summary_tokens = {}  # day -> 摘要 token 数
+        self._pending = {}  # day -> 后台摘要请求 (concurrent.futures.Future)
+        self._tail = deque(maxlen=tail_size)
+        self._day_parts = {}  # day -> [当天各行文本...]
+        self._day_versions = {}  # day -> 当天追加次数
+        self._day_text = {}  # day -> (版本, 拼好的当天全文)
+        self._day_tokens = {}  # day -> 当天全文 token 数
+        self._full_parts = []  # 全文各行
+        self._full_text = (0, "")  # (版本, 拼好的全文)
+        self._full_tokens = 0
+        self._version = 0  # 每次追加 / 收到摘要 +1，render 结果按它缓存
+        self._render_cache = {}  # template -> (version, current_day, 文本, token 数)
+        self.stats = {"renders": 0, "full_tokens": 0, "rendered_tokens": 0, "summarized": 0, "summary_failed": 0}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def append(self, day, kind, text, seat=None):
+        entry = LogEntry(day, kind, text, seat)
+        self.entries.append(entry)
+        self.days.setdefault(day, []).append(entry)
+        self._tail.append(entry)
+        self._day_parts.setdefault(day, []).append(text)
+        self._day_versions[day] = self._day_versions.get(day, 0) + 1
+        self._day_tokens[day] = self._day_tokens.get(day, 0) + entry.tokens
+        self._full_parts.append(text)
+        self._full_tokens += entry.tokens
+        self._version += 1
+        return entry
+
+    # ---------------- 视图 ----------------
+    @property
+    def full_text(self):
+        if self._full_text[0] != self._version:
+            self._full_text = (self._version, "\n".join(self._full_parts))
+        return self._full_text[1]
+
+    def day_text(self, day):
+        version = self._day_versions.get(day)
+        if version is None: return ""
+        cached = self._day_text.get(day)
+        if cached is None or cached[0] != version:
+            cached = self._day_text[day] = (version, "\n".join(self._day_parts[day]))
+        return cached[1]
+
+    def tail(self, n=None):
+        """最近 n 条记录 (默认 tail_size 条)。"""
+        items = list(self._tail)
+        return items if n is None else items[-n:]
+
+    # ---------------- 摘要 ----------------
+    def close_day(self, day):
+        """当天结束：提交后台摘要请求，不等待结果。"""
+        if not config.HISTORY_SUMMARY_ENABLED or day not in self.days or self.ai_client is None: return
+        if day in self.summaries or day in self._pending: return
+        user_msg = HISTORY_SUMMARY_TPL.render(day=day, history=self.day_text(day), limit=config.HISTORY_SUMMARY_CHARS)
+        messages = [{"role": "system", "content": HISTORY_SUMMARY_SYSTEM}, {"role": "user", "content": user_msg}]
+        self._pending[day] = self.ai_client.submit(messages, json_mode=True, call_type="summary", tags={"day": day})
+
+    def set_summary(self, day, text):
+        """设置某天的摘要 (更新 token 计数，使已缓存的 render 结果失效)。"""
+        self.summaries[day] = text
+        self._summary_tokens[day] = estimate_tokens(text) + 1
+        self._version += 1
+
+    def collect(self, current_day):
+        """每天开始时调用：收下 current_day 之前各天的摘要请求，还没返回的就等它 (请求本身有时限)。"""
+        for day in sorted(self._pending):
+            if day >= current_day: continue
+            future = self._pending.pop(day)
+            try:
+                resp = future.result()
+            except Exception as e:
+                print(f"[Warning] 第 {day} 天历史摘要失败: {e}")
+                resp = {}
+            summary = resp.get("summary") if isinstance(resp, dict) else None
+            if isinstance(summary, str) and summary.strip():
+                self.set_summary(day, f"[第 {day} 天摘要] {summary.strip()}")
+                self.stats["summarized"] += 1
+            else:
+                # 摘要失败就一直用原文
+                self.stats["summary_failed"] += 1
+
+    def render(self, template, current_day):
+        """
+        生成 prompt 里的历史文本：current_day 之前有摘要的天数用摘要，其余用原文，按 template 的预算截断。
+        返回 (文本, 相比全文节省的 token 数)。
+        """
+        cached = self._render_cache.get(template)
+        if cached and cached[0] == self._version and cached[1] == current_day:
+            text, tokens = cached[2], cached[3]
+        else:
+            text, tokens = self._render(template, current_day)
+            self._render_cache[template] = (self._version, current_day, text, tokens)
+        saved = max(0, self._full_tokens - tokens)
+        self.stats["renders"] += 1
+        self.stats["full_tokens"] += self._full_tokens
+        self.stats["rendered_tokens"] += tokens
+        return text, saved
+
+    def _render(self, template, current_day):
+        # 从新到旧收集，预算用完就停
+        budget = config.HISTORY_TOKEN_BUDGET.get(template) or float("inf")
+        blocks, total, truncated = [], 0, False
+        for day in sorted(self.days, reverse=True):
+            summary = self.summaries.get(day) if day < current_day else None
+            if summary:
+                cost = self._summary_tokens[day]
+                if blocks and total + cost > budget: truncated = True; break
+                blocks.append(summary)
+                total += cost
+                continue
+            if total + self._day_tokens[day] <= budget:
+                blocks.append(self.day_text(day))
+                total += self._day_tokens[day]
+                continue
+            for entry in reversed(self.days[day]):
+                if blocks and total + entry.tokens > budget: truncated = True; break
+                blocks.append(entry.text)
+                total += entry.tokens
+            if truncated: break
+        if truncated: blocks.append("（更早的记录已省略）")
+        return "\n".join(reversed(blocks)), total
+
+    def summary(self):
+        s = self.stats
+        saved = s["full_tokens"] - s["rendered_tokens"]
+        ratio = saved / s["full_tokens"] if s["full_tokens"] else 0.0
+        return (f"历史压缩: 摘要 {s['summarized']} 天 (失败 {s['summary_failed']}), 渲染 {s['renders']} 次, "
+                f"全文 {s['full_tokens']} -> {s['rendered_tokens']} tokens (节省 {ratio:.0%})")
@@ -3,6 +3,7 @@ import sys
 import math
 import time
 import os
+import config
 from engine.game_manager import GameIO
 from engine.player_manager import Player
 
@@ -14,6 +15,7 @@ INPUT_BG_COLOR = (50, 50, 50)
 PLAYER_RADIUS = 40
 SEAT_CENTER = (350, 360)
 SEAT_RADIUS = 200
+SEAT_RADIUS_MAX = 280  # 人多时座位圈最大半径 (不压到右侧日志区)
 
 
 class PyGameAdapter(GameIO):
@@ -35,8 +37,13 @@ class PyGameAdapter(GameIO):
         self.input_buffer = ""
         self.composition = ""
         self.players = []
+        self.history = None  # 公开记录 (engine.public_history.PublicHistory)
         self.running = True
 
+        # 流式输出中的那一条日志 (原始文本) 及其在 logs 中的起始行
+        self._stream_raw = None
+        self._stream_start = 0
+
         input_height = 120
         padding = 20
         gap = 15
@@ -56,6 +63,10 @@ class PyGameAdapter(GameIO):
         self.players = players
         self.render()
 
+    def update_history(self, history):
+        self.history = history
+        self.render()
+
     def _wrap_text(self, text, max_width, font):
         lines = []
         current_line = ""
@@ -81,6 +92,33 @@ class PyGameAdapter(GameIO):
         self.render()
         self._pump_events()
 
+    def begin_stream(self, prefix: str):
+        self._stream_raw = prefix
+        self._stream_start = len(self.logs)
+        self._update_stream()
+
+    def stream_text(self, text: str):
+        if self._stream_raw is None: return
+        self._stream_raw += text
+        self._update_stream()
+
+    def end_stream(self):
+        self._stream_raw = None
+
+    def _update_stream(self):
+        # 每来一段就重新折行，替换掉这条日志之前显示的行
+        wrapped = []
+        max_w = self.log_area.width - 20
+        for line in self._stream_raw.split('\n'):
+            wrapped.extend(self._wrap_text(line, max_w, self.font))
+        self.logs[self._stream_start:] = wrapped
+        if len(self.logs) > 200:
+            drop = len(self.logs) - 200
+            self.logs = self.logs[drop:]
+            self._stream_start = max(0, self._stream_start - drop)
+        self.render()
+        self._pump_events()
+
     def input(self, prompt: str) -> str:
         self.output(prompt)
         self.input_buffer = ""
@@ -122,6 +160,9 @@ class PyGameAdapter(GameIO):
         return res
 
     def sleep(self, seconds: float):
+        if config.TURBO:
+            self._pump_events()
+            return
         end = time.time() + seconds
         while time.time() < end and self.running:
             self._pump_events()
@@ -135,6 +176,7 @@ class PyGameAdapter(GameIO):
         if not self.running: return
         self.screen.fill(BG_COLOR)
         self._draw_seats()
+        self._draw_recent_history()
         self._draw_logs()
         self._draw_input()
         pygame.display.flip()
@@ -143,14 +185,17 @@ class PyGameAdapter(GameIO):
         if not self.players: return
         count = len(self.players);
         angle_step = 360 / count
+        # 座位多时先把圈放大，再缩小座位，相邻座位不重叠
+        ring = min(SEAT_RADIUS_MAX, max(SEAT_RADIUS, count * 14))
+        radius = min(PLAYER_RADIUS, int(ring * math.sin(math.pi / count)) - 4) if count > 1 else PLAYER_RADIUS
         for i, p in enumerate(self.players):
             angle = -90 + (i * angle_step);
             rad = math.radians(angle)
-            x = SEAT_CENTER[0] + SEAT_RADIUS * math.cos(rad)
-            y = SEAT_CENTER[1] + SEAT_RADIUS * math.sin(rad)
+            x = SEAT_CENTER[0] + ring * math.cos(rad)
+            y = SEAT_CENTER[1] + ring * math.sin(rad)
 
             color = (100, 255, 100) if p.is_human else ((200, 200, 200) if p.is_alive else (50, 50, 50))
-            pygame.draw.circle(self.screen, color, (int(x), int(y)), PLAYER_RADIUS)
+            pygame.draw.circle(self.screen, color, (int(x), int(y)), radius)
 
             id_surf = self.ui_font.render(f"{p.seat_id}", True, (0, 0, 0))
             id_rect = id_surf.get_rect(center=(int(x), int(y)))
@@ -163,11 +208,24 @@ class PyGameAdapter(GameIO):
 
             if status_text:
                 st_surf = self.font.render(status_text, True, (255, 50, 50))
-                self.screen.blit(st_surf, (int(x) - 20, int(y) + PLAYER_RADIUS + 5))
+                self.screen.blit(st_surf, (int(x) - 20, int(y) + radius + 5))
 
             if p.is_human and p.perceived_role:
                 role_surf = self.font.render(p.perceived_role, True, (255, 255, 0))
-                self.screen.blit(role_surf, (int(x) - 30, int(y) - PLAYER_RADIUS - 25))
+                self.screen.blit(role_surf, (int(x) - 30, int(y) - radius - 25))
+
+    def _draw_recent_history(self):
+        """座位圈中间显示最近几条公开记录。"""
+        if not self.history: return
+        max_w = SEAT_RADIUS + 60
+        entries = self.history.tail(6)
+        y = SEAT_CENTER[1] - len(entries) * 12
+        for entry in entries:
+            text = entry.text
+            while text and self.font.size(text)[0] > max_w: text = text[:-2] + "…"
+            surf = self.font.render(text, True, (150, 150, 150))
+            self.screen.blit(surf, surf.get_rect(center=(SEAT_CENTER[0], y)))
+            y += 24
 
     def _draw_logs(self):
         x = self.log_area.left + 5;
@@ -1,74 +1,389 @@
-from openai import OpenAI
+from collections import deque
+import asyncio
+import queue
+import threading
+import time
 import config
+from ai.llm_cache import ResponseCache, make_cache_key
+from ai.llm_backends import create_backend, background_call
+from ai.json_stream import JsonFieldExtractor, STREAM_FIELDS
+from ai.prompt_templates import CALL_OPTIONS
+from ai.tracing import get_tracer, LLM_FIELDS
 import json
 import sys
 
 
-class QwenClient:
+class _SharedLoop:
+    """后台常驻的事件循环线程，同步客户端通过它复用异步传输层。"""
+
     def __init__(self):
-        print(f"[*] 初始化 QwenClient (Model: {config.LLM_MODEL})...")
-        self.client = OpenAI(
-            api_key=config.DASHSCOPE_API_KEY,
-            base_url=config.LLM_API_BASE,
-        )
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                t = threading.Thread(target=self._loop.run_forever, name="llm-loop", daemon=True)
+                t.start()
+            return self._loop
+
+    def submit(self, coro):
+        """把协程提交到共享循环，返回 concurrent.futures.Future。"""
+        return asyncio.run_coroutine_threadsafe(coro, self.get())
+
+    def run(self, coro):
+        """在共享循环上执行协程，并阻塞等待结果。"""
+        return self.submit(coro).result()
+
+
+_shared_loop = _SharedLoop()
+
+# 进程间共享的在途请求上限 (如锦标赛各 worker 共用的 multiprocessing.Semaphore)，None 表示不限
+_request_limiter = None
+
+
+def set_request_limiter(limiter):
+    global _request_limiter
+    _request_limiter = limiter
+
+
+def _parse_json(text):
+    """尝试从文本中清洗并解析 JSON"""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        try:
+            start = text.find("```json")
+            if start != -1:
+                end = text.find("```", start + 7)
+                if end != -1:
+                    json_str = text[start + 7: end].strip()
+                    return json.loads(json_str)
+
+            start = text.find("{")
+            end = text.rfind("}")
+            if start != -1 and end != -1:
+                json_str = text[start: end + 1].strip()
+                return json.loads(json_str)
+
+        except Exception:
+            pass
+
+        print(f"[Warning] JSON 解析失败，返回原始文本片段。\n{text[:50]}...")
+        return {}
+
+
+class _Call:
+    """单次 query 的上下文：请求参数、流式回调与本次调用的指标。"""
+
+    def __init__(self, messages, json_mode, call_type, on_field, queued_at):
+        self.messages = messages
+        self.json_mode = json_mode
+        self.options = CALL_OPTIONS.get(call_type) or {}
+        self.started = time.monotonic()
+        self.metrics = {"template": call_type, "hedged": False, "winner": None, "timed_out": False, "cache": None,
+                        "early_stop": False, "ttft": None, "parse_ok": False if json_mode else None,
+                        "queue_wait": self.started - queued_at if queued_at else 0.0,
+                        "prompt_chars": sum(len(m.get("content") or "") for m in messages),
+                        "prompt_bytes": sum(len((m.get("content") or "").encode("utf-8")) for m in messages)}
+        # 流式字段只转发给最先吐出内容的那个请求，避免对冲时重复显示
+        self._on_field = on_field
+        self._stream_owner = None
+
+    def field_callback(self, name):
+        if not self._on_field: return None
+
+        def _cb(field, text):
+            if self._stream_owner is None: self._stream_owner = name
+            if self._stream_owner == name: self._on_field(field, text)
+
+        return _cb
+
+
+class AsyncQwenClient:
+    def __init__(self, max_concurrency=None, cache=None, backend=None):
+        # 传输层后端 (openai / record / replay / stub)，默认按 config.LLM_BACKEND 选择
+        self.backend = backend if backend is not None else create_backend()
         self.model = config.LLM_MODEL
+        self.max_concurrency = max_concurrency or config.LLM_MAX_CONCURRENCY
 
-    def query(self, messages, json_mode=True):
-        """
-        发送请求给 LLM。
-        """
+        # 首 token 延迟样本，用来估算对冲阈值
+        self._ttft_samples = deque(maxlen=200)
+        # 每次调用的指标 (是否超时、是否发起对冲、哪个请求胜出、首 token 延迟、token 数...)
+        self.call_metrics = deque(maxlen=1000)
+        # 正在进行的 query 数 (含后台提交的)
+        self.in_flight = 0
+        # 累计用量 (不受 call_metrics 长度限制)
+        self.usage_totals = {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+        # 响应缓存 (默认按 config.LLM_CACHE_MODE 创建，off 时不读不写)
+        self.cache = cache if cache is not None else ResponseCache()
+
+    def _hedge_delay(self):
+        """对冲阈值：取首 token 延迟的指定分位数，样本不足时用默认值。"""
+        samples = sorted(self._ttft_samples)
+        if len(samples) < config.LLM_HEDGE_MIN_SAMPLES:
+            return config.LLM_HEDGE_DEFAULT_DELAY
+        idx = min(len(samples) - 1, int(config.LLM_HEDGE_PERCENTILE * len(samples)))
+        return samples[idx]
+
+    async def _attempt(self, call, name, first_token, usage):
+        """单个流式请求。收到首 token 时置位 first_token，返回解析结果；usage 由后端填入 token 用量。"""
+        # 对冲请求是否发出取决于时序，和预取一样算后台请求 (只影响本任务)
+        if name == "hedge": background_call.set(True)
+        limiter = _request_limiter
+        if limiter is not None:
+            # 跨进程的信号量不能 await，轮询获取，被取消时不会占着名额
+            while not limiter.acquire(False):
+                await asyncio.sleep(0.01)
         try:
-            # 移除 enable_thinking，依靠 System Prompt 引导思考
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                stream=True
-            )
+            return await self._stream_attempt(call, name, first_token, usage)
+        finally:
+            if limiter is not None: limiter.release()
 
-            full_content = []
+    async def _stream_attempt(self, call, name, first_token, usage):
+        full_content = []
+        attempt_started = time.monotonic()
+        # json 模式下跟踪括号层级：顶层对象一闭合就不再读后面的内容
+        extractor = JsonFieldExtractor(on_field=call.field_callback(name)) if call.json_mode else None
+        stream = self.backend.stream(self.model, call.messages, usage=usage, **call.options)
+        try:
+            async for text in stream:
+                if not first_token.is_set():
+                    now = time.monotonic()
+                    self._ttft_samples.append(now - attempt_started)
+                    if call.metrics["ttft"] is None: call.metrics["ttft"] = now - call.started
+                    first_token.set()
+                full_content.append(text)
+                if extractor and extractor.feed(text):
+                    call.metrics["early_stop"] = True
+                    break
+            if call.metrics["early_stop"]:
+                # 用量 (含前缀缓存命中数) 在流的最后一块里，JSON 闭合后再给一小段时间把它读到
+                await self._drain(stream)
+        finally:
+            # 提前结束 / 被取消（对冲输掉、超时）时关闭流，由后端释放连接
+            await stream.aclose()
+
+        response_text = "".join(full_content)
+        if extractor and extractor.closed:
+            response_text = response_text[:extractor.end_offset]
+        response_text = response_text.strip()
+        usage.setdefault("completion_chars", len(response_text))
+        if call.json_mode:
+            return _parse_json(response_text)
+        return response_text
 
-            # print("\n" + "=" * 20 + " AI 生成中 " + "=" * 20)
+    @staticmethod
+    async def _drain(stream):
+        async def _consume():
+            async for _ in stream: pass
 
-            for chunk in completion:
-                delta = chunk.choices[0].delta
-                if hasattr(delta, "content") and delta.content:
-                    full_content.append(delta.content)
-                    # print(delta.content, end="", flush=True) # 调试时可开启
+        try:
+            await asyncio.wait_for(_consume(), timeout=config.LLM_USAGE_GRACE)
+        except asyncio.TimeoutError:
+            pass
 
-            # print("\n" + "=" * 50)
+    async def _race(self, call):
+        """主请求 + 可选对冲请求，第一个完整有效的结果胜出，其余取消。"""
+        attempts = {}
 
-            response_text = "".join(full_content).strip()
+        def _start(name, first_token):
+            usage = {}
+            task = asyncio.create_task(self._attempt(call, name, first_token, usage))
+            attempts[task] = (name, usage)
+            return task
 
-            if json_mode:
-                return self._parse_json(response_text)
-            return response_text
+        first_token = asyncio.Event()
+        primary = _start("primary", first_token)
+        pending = {primary}
+        waiter = None
 
+        try:
+            if config.LLM_HEDGE_ENABLED:
+                waiter = asyncio.create_task(first_token.wait())
+                await asyncio.wait({primary, waiter}, timeout=self._hedge_delay(),
+                                   return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+                if not first_token.is_set() and not primary.done():
+                    pending.add(_start("hedge", asyncio.Event()))
+                    call.metrics["hedged"] = True
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        print(f"\n[Error] LLM 调用失败: {task.exception()}")
+                        continue
+                    result = task.result()
+                    if result or not call.json_mode:
+                        name, usage = attempts[task]
+                        call.metrics["winner"] = name
+                        call.metrics.update(usage)
+                        return result
+            return {}
+        finally:
+            # 被外部取消 (超时 / 预测请求作废) 时，等待首 token 的任务也要一并取消
+            if waiter: waiter.cancel()
+            for task in pending:
+                task.cancel()
+
+    async def query(self, messages, json_mode=True, deadline=None, on_field=None, call_type=None, tags=None,
+                    parent_span=None, queued_at=None, background=False):
+        """
+        发送请求给 LLM（异步）。失败或超过 deadline（秒）时返回空字典，不向上抛出。
+        on_field(field, text)：speech/reply 字段的内容边生成边回调。
+        call_type：调用类型 (vote/nominate/...)，据此从 CALL_OPTIONS 取 max_tokens 等输出限制。
+        tags / parent_span：追踪用的附加字段 (如 seat) 和所属的阶段 span。
+        background：预取 / 投票预测这类结果不一定会被用上的请求，传给后端 (回放时据此区分)。
+        """
+        deadline = deadline or config.LLM_DEADLINE
+        # 每个 query 跑在自己的任务里，这里设置只影响本次请求
+        background_call.set(background)
+        call = _Call(messages, json_mode, call_type, on_field, queued_at)
+        metrics = call.metrics
+        tracer = get_tracer()
+        span = tracer.start_span("llm", parent_span, kind="llm", **(tags or {}))
+        key = make_cache_key(self.model, messages, json_mode) if self.cache.enabled else None
+        result = {}
+        self.in_flight += 1
+        try:
+            if self.cache.readable:
+                cached = self.cache.get(key)
+                metrics["cache"] = "miss" if cached is None else "hit"
+                if cached is not None:
+                    if on_field and isinstance(cached, dict):
+                        for field in STREAM_FIELDS:
+                            if isinstance(cached.get(field), str): on_field(field, cached[field])
+                    result = cached
+                    return result
+
+            result = await asyncio.wait_for(self._race(call), timeout=deadline)
+            # 只缓存成功的结果，失败的 {} 下次还要重试
+            if key and result:
+                self.cache.put(key, result)
+            return result
+        except asyncio.TimeoutError:
+            metrics["timed_out"] = True
+            print(f"\n[Error] LLM 调用超时 ({deadline}s)")
+            return {}
         except Exception as e:
             print(f"\n[Error] LLM 调用失败: {e}")
             # 返回空字典防止崩溃
             return {}
+        finally:
+            self.in_flight -= 1
+            metrics["latency"] = time.monotonic() - call.started
+            # 只有 json 调用才有解析成败，纯文本调用保持 None
+            if json_mode: metrics["parse_ok"] = bool(result)
+            if tags: metrics.update(tags)
+            self.call_metrics.append(metrics)
+            self.usage_totals["calls"] += 1
+            for k in ("prompt_tokens", "cached_tokens", "completion_tokens"):
+                self.usage_totals[k] += metrics.get(k) or 0
+            tracer.finish_span(span, **{k: metrics.get(k) for k in LLM_FIELDS if k in metrics})
 
-    def _parse_json(self, text):
-        """尝试从文本中清洗并解析 JSON"""
-        try:
-            return json.loads(text)
-        except json.JSONDecodeError:
-            try:
-                start = text.find("```json")
-                if start != -1:
-                    end = text.find("```", start + 7)
-                    if end != -1:
-                        json_str = text[start + 7: end].strip()
-                        return json.loads(json_str)
-
-                start = text.find("{")
-                end = text.rfind("}")
-                if start != -1 and end != -1:
-                    json_str = text[start: end + 1].strip()
-                    return json.loads(json_str)
+    async def query_many(self, messages_list, json_mode=True, max_concurrency=None, deadline=None, call_type=None,
+                         tags_list=None, parent_span=None):
+        """
+        并发发送一批互不依赖的请求，结果按输入顺序返回。
+        单个请求失败只影响它自己的位置（返回 {}）。tags_list 与 messages_list 一一对应。
+        """
+        sem = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+        queued_at = time.monotonic()
+        tags_list = tags_list or [None] * len(messages_list)
+
+        async def _run(messages, tags):
+            async with sem:
+                return await self.query(messages, json_mode=json_mode, deadline=deadline, call_type=call_type,
+                                        tags=tags, parent_span=parent_span, queued_at=queued_at)
+
+        return list(await asyncio.gather(*[_run(m, t) for m, t in zip(messages_list, tags_list)]))
+
+
+class QwenClient:
+    def __init__(self, cache=None, backend=None):
+        # 同步接口与异步接口共用同一个传输层（跑在后台事件循环上）
+        self.async_client = AsyncQwenClient(cache=cache, backend=backend)
+        print(f"[*] 初始化 QwenClient (Model: {config.LLM_MODEL}, Backend: {self.async_client.backend.name})...")
+        self.model = config.LLM_MODEL
+        # submit 出去还没结束的请求：协程开始执行前 in_flight 还没计上，wait_idle 要靠它
+        self._submitted = set()
+        self._submitted_lock = threading.Lock()
+
+    def query(self, messages, json_mode=True, deadline=None, on_field=None, call_type=None, tags=None):
+        """
+        发送请求给 LLM。deadline 为本次调用的总时限（秒），默认 config.LLM_DEADLINE。
+        on_field(field, text) 在调用方线程里执行，用于逐段显示 speech/reply。
+        当前线程所在的阶段 span 会作为这次调用的父 span。
+        """
+        kwargs = dict(json_mode=json_mode, deadline=deadline, call_type=call_type, tags=tags,
+                      parent_span=get_tracer().current_span(), queued_at=time.monotonic())
+        if on_field is None:
+            return _shared_loop.run(self.async_client.query(messages, **kwargs))
+
+        # 流式片段经队列转回调用方线程，保证 UI 只在主线程里刷新
+        pieces = queue.SimpleQueue()
+        future = _shared_loop.submit(
+            self.async_client.query(messages, on_field=lambda f, t: pieces.put((f, t)), **kwargs))
+        future.add_done_callback(lambda _: pieces.put(None))
+        while True:
+            item = pieces.get()
+            if item is None: break
+            on_field(*item)
+        return future.result()
+
+    def submit(self, messages, json_mode=True, deadline=None, call_type=None, tags=None, background=False):
+        """
+        后台发送请求，不阻塞，返回 concurrent.futures.Future（结果与 query 相同）。
+        background=True 表示结果不一定会被用上 (预取 / 投票预测)。
+        """
+        future = _shared_loop.submit(
+            self.async_client.query(messages, json_mode=json_mode, deadline=deadline, call_type=call_type, tags=tags,
+                                    parent_span=get_tracer().current_span(), queued_at=time.monotonic(),
+                                    background=background))
+        with self._submitted_lock:
+            self._submitted.add(future)
+        future.add_done_callback(self._discard_submitted)
+        return future
+
+    def _discard_submitted(self, future):
+        with self._submitted_lock:
+            self._submitted.discard(future)
+
+    def query_many(self, messages_list, json_mode=True, max_concurrency=None, deadline=None, call_type=None,
+                   tags_list=None):
+        """
+        并发发送多条请求，按输入顺序返回解析结果。
+        """
+        return _shared_loop.run(
+            self.async_client.query_many(messages_list, json_mode=json_mode, max_concurrency=max_concurrency,
+                                         deadline=deadline, call_type=call_type, tags_list=tags_list,
+                                         parent_span=get_tracer().current_span()))
+
+    @property
+    def call_metrics(self):
+        return self.async_client.call_metrics
+
+    @property
+    def cache(self):
+        return self.async_client.cache
+
+    def wait_idle(self, timeout=None):
+        """等待所有在途请求 (包括后台提交、已取消正在收尾的) 结束；超时返回 False。"""
+        deadline = time.monotonic() + (timeout if timeout is not None else config.LLM_DEADLINE)
+        while self.async_client.in_flight or self._submitted:
+            if time.monotonic() > deadline: return False
+            time.sleep(0.01)
+        return True
 
-            except Exception:
-                pass
+    @property
+    def usage_totals(self):
+        return dict(self.async_client.usage_totals)
 
-            print(f"[Warning] JSON 解析失败，返回原始文本片段。\n{text[:50]}...")
-            return {}
\ No newline at end of file
+    def usage_summary(self):
+        """累计 token 用量与前缀缓存命中率。"""
+        totals = self.usage_totals
+        ratio = totals["cached_tokens"] / totals["prompt_tokens"] if totals["prompt_tokens"] else 0.0
+        return (f"prompt {totals['prompt_tokens']} tokens (缓存命中 {totals['cached_tokens']}, {ratio:.0%}), "
+                f"completion {totals['completion_tokens']} tokens")
\ No newline at end of file
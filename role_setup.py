@@ -0,0 +1,82 @@
+import config
+
+# 不在场身份的个数
+BLUFF_COUNT = 3
+# 支持的人数 (暗流涌动官方配置表的范围)
+MIN_PLAYERS, MAX_PLAYERS = 5, 20
+
+
+def standard_distribution(player_count):
+    """
+    暗流涌动的标准配置表：5、6 人局为 3 村民 + 0 / 1 外来者；7 人起每 3 人一档，
+    每档多 2 个村民和 1 个爪牙，档内每多 1 人多 1 个外来者，到 15 人 (9/2/3/1) 为止。
+    16 人以上官方用旅行者补位，这里没有旅行者：多出的座位先补村民，村民不够再补外来者。
+    """
+    if not MIN_PLAYERS <= player_count <= MAX_PLAYERS:
+        raise ValueError(f"只支持 {MIN_PLAYERS}-{MAX_PLAYERS} 人局，当前为 {player_count} 人")
+    if player_count <= 6:
+        townsfolk, outsiders, minions = 3, player_count - 5, 1
+    else:
+        tier, extra = divmod(min(player_count, 15) - 7, 3)
+        townsfolk, outsiders, minions = 5 + 2 * tier, extra, 1 + tier
+    spare = max(0, player_count - 15)
+    added = min(spare, len(config.ROLES_DATA["Townsfolk"]) - townsfolk)
+    townsfolk, outsiders = townsfolk + added, outsiders + spare - added
+    return {"Townsfolk": townsfolk, "Outsider": outsiders, "Minion": minions, "Demon": 1}
+
+
+def setup_distribution(player_count=None):
+    """本局的配置：config.SETUP_DISTRIBUTION 手动指定时用它，否则按人数查标准表。"""
+    return config.SETUP_DISTRIBUTION or standard_distribution(player_count or config.PLAYER_COUNT)
+
+
+def baron_shift(player_count=None):
+    """男爵让外来者增加的人数：官方规则为 2；5、6 人局只有 3 个村民，保持原来的 1。"""
+    return 1 if (player_count or config.PLAYER_COUNT) <= 6 else 2
+
+
+def draw_setup(rng, player_count=None):
+    """
+    按发牌规则抽一局配置，不做任何输出。随机抽取的种类和顺序与逐步发牌完全相同，同一个 rng 状态得到同一局。
+    返回 (按座位顺序的 [(身份名, 类型)...], 是否触发男爵调整, 酒鬼眼中身份或 None, 不在场身份列表)。
+    """
+    # 1. 初始抽取
+    pool = []
+    for r_type, count in setup_distribution(player_count).items():
+        for name in rng.sample(config.ROLES_DATA[r_type], count):
+            pool.append((name, r_type))
+
+    # 2. 男爵：每次 -1 村民，+1 外来者 (外来者已经全部在场时停止)
+    baron = any(name == "男爵" for name, _ in pool)
+    if baron:
+        for _ in range(baron_shift(player_count)):
+            townsfolk_indices = [i for i, (_, t) in enumerate(pool) if t == "Townsfolk"]
+            current_outsiders = [name for name, t in pool if t == "Outsider"]
+            available = [n for n in config.ROLES_DATA["Outsider"] if n not in current_outsiders]
+            if not townsfolk_indices or not available: break
+            pool.pop(rng.choice(townsfolk_indices))
+            pool.append((rng.choice(available), "Outsider"))
+
+    # 3. 洗牌后从末尾依次发给 1 号、2 号……
+    rng.shuffle(pool)
+    seats = pool[::-1]
+    assigned = [name for name, _ in seats]
+
+    # 4. 酒鬼以为自己是一个没发出去的村民
+    drunk_perceived = None
+    if "酒鬼" in assigned:
+        unused = [r for r in config.ROLES_DATA["Townsfolk"] if r not in assigned]
+        drunk_perceived = rng.choice(unused) if unused else "士兵"  # 兜底
+
+    # 5. 恶魔的不在场身份：没发出去的好人身份 (不含酒鬼和酒鬼以为的身份)
+    candidates = bluff_candidates(assigned, drunk_perceived)
+    bluffs = rng.sample(candidates, BLUFF_COUNT) if len(candidates) >= BLUFF_COUNT else candidates
+    return seats, baron, drunk_perceived, bluffs
+
+
+def bluff_candidates(assigned, drunk_perceived=None):
+    good = config.ROLES_DATA["Townsfolk"] + config.ROLES_DATA["Outsider"]
+    candidates = [r for r in good if r not in assigned and r != "酒鬼"]
+    if drunk_perceived in candidates:
+        candidates.remove(drunk_perceived)
+    return candidates
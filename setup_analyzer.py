@@ -0,0 +1,308 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:  # 可选依赖：没有时抽样退回逐局调用 draw_setup
+    np = None
+
+import config
+
+# 组合数不超过这个值时做精确枚举
+EXACT_LIMIT = 10000
+
+_COUNTERS = ("roles", "drunk_perceived", "bluffs", "chef", "evil", "outsiders")
+_RATES = ("baron", "drunk", "bluff_short", "bluff_overlap")
+
+
+def _apparent_evil(name, r_type):
+    """厨师眼中的阵营：间谍看起来是好人，隐士看起来是邪恶。"""
+    if name == "间谍": return False
+    if name == "隐士": return True
+    return r_type in ("Minion", "Demon")
+
+
+def chef_number(seats):
+    app = [_apparent_evil(name, t) for name, t in seats]
+    return sum(1 for i in range(len(app)) if app[i] and app[(i + 1) % len(app)])
+
+
+@lru_cache(maxsize=None)
+def ring_pairs(n, evil):
+    """n 个座位随机排列、其中 evil 个 (看起来) 邪恶时，相邻邪恶对数的精确分布 {对数: 概率}。"""
+    dist = {}
+    total = math.comb(n, evil)
+    for chosen in itertools.combinations(range(n), evil):
+        s = set(chosen)
+        pairs = sum(1 for i in s if (i + 1) % n in s)
+        dist[pairs] = dist.get(pairs, 0) + 1 / total
+    return dist
+
+
+class _Stats:
+    """按权重累计的配置统计 (抽样时权重为 1，精确枚举时为概率)。"""
+
+    def __init__(self):
+        self.weight = 0.0
+        self.counters = {k: {} for k in _COUNTERS}
+        self.rates = dict.fromkeys(_RATES, 0.0)
+
+    def _count(self, key, value, w):
+        c = self.counters[key]
+        c[value] = c.get(value, 0) + w
+
+    def add(self, roles, baron, drunk_perceived, bluff_probs, chef_probs, w=1.0):
+        names = [name for name, _ in roles]
+        self.weight += w
+        for name in names: self._count("roles", name, w)
+        self._count("evil", sum(1 for _, t in roles if t in ("Minion", "Demon")), w)
+        self._count("outsiders", sum(1 for _, t in roles if t == "Outsider"), w)
+        if baron: self.rates["baron"] += w
+        if drunk_perceived:
+            self.rates["drunk"] += w
+            self._count("drunk_perceived", drunk_perceived, w)
+        for name, p in bluff_probs.items(): self._count("bluffs", name, w * p)
+        if len(bluff_probs) < 3: self.rates["bluff_short"] += w
+        # 不在场身份与场上身份 / 酒鬼眼中身份重叠 (规则上不应出现)
+        if any(b in names or b == drunk_perceived for b in bluff_probs): self.rates["bluff_overlap"] += w
+        for pairs, p in chef_probs.items(): self._count("chef", pairs, w * p)
+
+    def add_counts(self, key, counts):
+        """批量计入：counts 为 {取值: 权重}。"""
+        for value, w in counts.items():
+            if w: self._count(key, value, w)
+
+    def merge(self, other):
+        self.weight += other.weight
+        for key, c in other.counters.items():
+            for value, w in c.items(): self._count(key, value, w)
+        for key, w in other.rates.items(): self.rates[key] += w
+
+    def report(self):
+        total = self.weight or 1.0
+        out = {f"{k}_rate": v / total for k, v in self.rates.items()}
+        for key, c in self.counters.items():
+            out[key] = {str(v): w / total for v, w in sorted(c.items(), key=lambda kv: (-kv[1], str(kv[0])))}
+        return out
+
+
+# ---------------- 精确枚举 ----------------
+def exact_space_size():
+    from engine.role_setup import setup_distribution
+    return math.prod(math.comb(len(config.ROLES_DATA[t]), n) for t, n in setup_distribution().items())
+
+
+def _baron_branches(pool, shift):
+    """
+    男爵调整的所有分支：(调整后的身份, 条件概率)。与 draw_setup 一样每次先均匀去掉一个村民，
+    再均匀补一个不在场的外来者，共 shift 次 (没有村民或外来者都已在场时停止)。
+    """
+    townsfolk = [i for i, (_, t) in enumerate(pool) if t == "Townsfolk"]
+    current = [name for name, t in pool if t == "Outsider"]
+    available = [n for n in config.ROLES_DATA["Outsider"] if n not in current]
+    if not shift or not townsfolk or not available:
+        yield pool, 1.0
+        return
+    p = 1 / (len(townsfolk) * len(available))
+    for i in townsfolk:
+        rest = pool[:i] + pool[i + 1:]
+        for name in available:
+            for roles, q in _baron_branches(rest + [(name, "Outsider")], shift - 1):
+                yield roles, p * q
+
+
+def exact_stats():
+    """枚举所有初始抽取、男爵分支、酒鬼眼中身份，按概率加权；不在场身份和座位排列按解析分布计入。"""
+    from engine.role_setup import BLUFF_COUNT, baron_shift, bluff_candidates, setup_distribution
+    picks = [list(itertools.combinations([(name, t) for name in config.ROLES_DATA[t]], n))
+             for t, n in setup_distribution().items()]
+    shift = baron_shift()
+    base = 1 / exact_space_size()
+    stats = _Stats()
+    for pick in itertools.product(*picks):
+        pool = [role for group in pick for role in group]
+        baron = any(name == "男爵" for name, _ in pool)
+        for roles, p_branch in (_baron_branches(pool, shift) if baron else [(pool, 1.0)]):
+            names = [name for name, _ in roles]
+            drunk_options = [(None, 1.0)]
+            if "酒鬼" in names:
+                unused = [r for r in config.ROLES_DATA["Townsfolk"] if r not in names]
+                drunk_options = [(r, 1 / len(unused)) for r in unused] if unused else [("士兵", 1.0)]
+            evil = sum(1 for name, t in roles if _apparent_evil(name, t))
+            chef = ring_pairs(len(roles), evil)
+            for drunk, p_drunk in drunk_options:
+                candidates = bluff_candidates(names, drunk)
+                p_bluff = min(1.0, BLUFF_COUNT / len(candidates)) if candidates else 0.0
+                stats.add(roles, baron, drunk, {c: p_bluff for c in candidates}, chef, base * p_branch * p_drunk)
+    return stats
+
+
+# ---------------- 蒙特卡洛 ----------------
+def _sample_chunk(seed, count, player_count):
+    """worker：抽 count 局 (人数显式传入，spawn 出来的进程看不到主进程改过的 config)。有 numpy 时整块向量化抽取。"""
+    if np is not None: return _sample_chunk_np(seed, count, player_count)
+    from engine.role_setup import draw_setup
+    rng = random.Random(seed)
+    stats = _Stats()
+    for _ in range(count):
+        seats, baron, drunk, bluffs = draw_setup(rng, player_count)
+        stats.add(seats, baron, drunk, dict.fromkeys(bluffs, 1.0), {chef_number(seats): 1.0})
+    return stats
+
+
+def _pick(rng, mask, k=1):
+    """每行在 mask 为真的列里均匀抽 k 个 (不放回)，返回 [行数, k] 的列号；不够 k 个时多出来的列号无效。"""
+    keys = np.where(mask, rng.random(mask.shape), -1.0)
+    return np.argsort(-keys, axis=1, kind="stable")[:, :k]
+
+
+def _sample_chunk_np(seed, count, player_count):
+    """
+    与 draw_setup 同样的发牌规则，按身份在场矩阵 [局数, 身份数] 一次抽 count 局。
+    随机数流与 draw_setup 不同 (同一个种子不会抽出同样的局)，分布相同，由精确枚举对照核验。
+    """
+    from engine.role_setup import BLUFF_COUNT, baron_shift, setup_distribution
+    rng = np.random.default_rng(seed)
+    roles = [(name, t) for t in config.ROLES_DATA for name in config.ROLES_DATA[t]]
+    names = [name for name, _ in roles]
+    types = np.array([t for _, t in roles])
+    col = {name: i for i, name in enumerate(names)}
+    is_town, is_out = types == "Townsfolk", types == "Outsider"
+    rows = np.arange(count)
+
+    # 1. 初始抽取：每种类型各自不放回抽 n 个
+    in_play = np.zeros((count, len(roles)), dtype=bool)
+    for r_type, n in setup_distribution(player_count).items():
+        cols = np.flatnonzero(types == r_type)
+        chosen = np.argsort(rng.random((count, len(cols))), axis=1)[:, :n]
+        in_play[rows[:, None], cols[chosen]] = True
+
+    # 2. 男爵：每次 -1 村民，+1 不在场的外来者 (没有可换的就停)
+    baron = in_play[:, col["男爵"]].copy()
+    for _ in range(baron_shift(player_count)):
+        town_mask = in_play & is_town
+        out_mask = ~in_play & is_out
+        active = baron & town_mask.any(axis=1) & out_mask.any(axis=1)
+        if not active.any(): break
+        drop = _pick(rng, town_mask[active])[:, 0]
+        add = _pick(rng, out_mask[active])[:, 0]
+        idx = np.flatnonzero(active)
+        in_play[idx, drop] = False
+        in_play[idx, add] = True
+
+    # 3. 座位排列只影响厨师数：看起来邪恶的人数随机落在环上，数相邻对
+    seats = int(in_play[0].sum())
+    apparent = np.array([_apparent_evil(name, t) for name, t in roles])
+    evil_seen = (in_play & apparent).sum(axis=1)
+    ring = np.arange(seats)[None, :] < evil_seen[:, None]
+    ring = np.take_along_axis(ring, np.argsort(rng.random((count, seats)), axis=1), axis=1)
+    chef = (ring & np.roll(ring, -1, axis=1)).sum(axis=1)
+
+    # 4. 酒鬼以为自己是一个没发出去的村民 (没有就兜底成士兵)
+    drunk = in_play[:, col["酒鬼"]]
+    unused = ~in_play & is_town
+    perceived = np.full(count, -1)
+    has_unused = drunk & unused.any(axis=1)
+    perceived[has_unused] = _pick(rng, unused[has_unused])[:, 0]
+    perceived[drunk & ~has_unused] = col["士兵"]
+
+    # 5. 不在场身份：没发出去的好人身份，去掉酒鬼和酒鬼以为的身份，抽 BLUFF_COUNT 个
+    candidates = ~in_play & (is_town | is_out)
+    candidates[:, col["酒鬼"]] = False
+    candidates[drunk, perceived[drunk]] = False
+    n_candidates = candidates.sum(axis=1)
+    picked = _pick(rng, candidates, BLUFF_COUNT)
+    valid = np.arange(BLUFF_COUNT)[None, :] < n_candidates[:, None]
+    bluffs = np.zeros_like(in_play)
+    bluffs[np.repeat(rows, BLUFF_COUNT)[valid.ravel()], picked[valid]] = True
+    overlap = (bluffs & in_play).any(axis=1)
+    overlap[drunk] |= bluffs[drunk, perceived[drunk]]
+
+    stats = _Stats()
+    stats.weight = float(count)
+    stats.add_counts("roles", dict(zip(names, in_play.sum(axis=0).tolist())))
+    evil_types = (types == "Minion") | (types == "Demon")
+    stats.add_counts("evil", dict(enumerate(np.bincount((in_play & evil_types).sum(axis=1)).tolist())))
+    stats.add_counts("outsiders", dict(enumerate(np.bincount((in_play & is_out).sum(axis=1)).tolist())))
+    stats.add_counts("drunk_perceived", dict(zip(names, np.bincount(perceived[drunk], minlength=len(names)).tolist())))
+    stats.add_counts("bluffs", dict(zip(names, bluffs.sum(axis=0).tolist())))
+    stats.add_counts("chef", dict(enumerate(np.bincount(chef).tolist())))
+    stats.rates.update(baron=float(baron.sum()), drunk=float(drunk.sum()),
+                       bluff_short=float((n_candidates < BLUFF_COUNT).sum()), bluff_overlap=float(overlap.sum()))
+    return stats
+
+
+def sample_stats(samples, workers=None, seed=0, chunk=50000):
+    """把 samples 局抽样分块发到进程池，合并统计。"""
+    workers = workers or os.cpu_count() or 1
+    sizes = [min(chunk, samples - i) for i in range(0, samples, chunk)]
+    stats = _Stats()
+    if workers == 1:
+        for i, n in enumerate(sizes): stats.merge(_sample_chunk(seed * 1000003 + i, n, config.PLAYER_COUNT))
+        return stats
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for part in pool.map(_sample_chunk, [seed * 1000003 + i for i in range(len(sizes))], sizes,
+                             [config.PLAYER_COUNT] * len(sizes)):
+            stats.merge(part)
+    return stats
+
+
+def max_deviation(a, b):
+    """两份报告中所有概率的最大绝对差。"""
+    worst = 0.0
+    for key, value in a.items():
+        if isinstance(value, dict):
+            for k in set(value) | set(b.get(key, {})):
+                worst = max(worst, abs(value.get(k, 0.0) - b.get(key, {}).get(k, 0.0)))
+        else:
+            worst = max(worst, abs(value - b.get(key, 0.0)))
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description="发牌配置分析：身份频率、男爵 / 酒鬼出现率、不在场身份、厨师数分布")
+    parser.add_argument("--samples", type=int, default=0, help="蒙特卡洛抽样局数 (0 则只做精确枚举)")
+    parser.add_argument("--workers", type=int, default=None, help="抽样进程数，默认 CPU 核数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--players", type=int, default=None, help="人数 (5-20)，默认 config.PLAYER_COUNT")
+    parser.add_argument("--out", default=None, help="结果 JSON 写到这里，默认输出到标准输出")
+    args = parser.parse_args()
+    if args.players: config.PLAYER_COUNT = args.players
+    from engine.role_setup import setup_distribution
+
+    result = {"players": config.PLAYER_COUNT, "distribution": setup_distribution(),
+              "exact_space": exact_space_size()}
+    if result["exact_space"] <= EXACT_LIMIT:
+        started = time.perf_counter()
+        result["exact"] = exact_stats().report()
+        result["exact_seconds"] = time.perf_counter() - started
+    elif not args.samples:
+        args.samples = 1000000
+        print(f"[*] 组合数 {result['exact_space']} 超过精确枚举上限，改为抽样 {args.samples} 局")
+    if args.samples:
+        started = time.perf_counter()
+        result["sampled"] = sample_stats(args.samples, args.workers, args.seed).report()
+        elapsed = time.perf_counter() - started
+        result["samples"] = args.samples
+        result["setups_per_sec"] = args.samples / elapsed if elapsed else None
+        if "exact" in result:
+            result["max_deviation"] = max_deviation(result["exact"], result["sampled"])
+
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"[*] 结果已写入 {args.out}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
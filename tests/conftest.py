@@ -0,0 +1,18 @@
+import importlib.util
+import os
+import sys
+import types
+
+# 源码平铺在仓库根目录，代码里按 engine.xxx / ai.xxx / ui.xxx 导入：
+# 没有安装成包时，把这几个包名都指向根目录，测试可以直接运行
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+if "engine" not in sys.modules and importlib.util.find_spec("engine") is None:
+    for _name in ("engine", "engine.roles", "ai", "ui"):
+        _pkg = types.ModuleType(_name)
+        _pkg.__path__ = [ROOT]
+        sys.modules[_name] = _pkg
+        _parent, _, _child = _name.rpartition(".")
+        if _parent: setattr(sys.modules[_parent], _child, _pkg)
@@ -0,0 +1,36 @@
+import pytest
+
+import config
+from engine.player_manager import Player, Seats
+from engine.roles.base_role import Role
+
+np = pytest.importorskip("numpy")
+
+from engine.batch_rules import BatchRules  # noqa: E402
+from engine.game_state import GameState  # noqa: E402
+
+
+@pytest.mark.parametrize("players", [5, 8, 13])
+def test_batch_matches_scalar_rules(monkeypatch, players):
+    from benchmark import check_batch_rules
+    monkeypatch.setattr(config, "PLAYER_COUNT", players)
+    monkeypatch.setattr(config, "LLM_CACHE_MODE", "off")
+    result = check_batch_rules(samples=150, seed=players, batch_size=300)
+    assert result["mismatches"] == 0
+
+
+def test_hand_built_table():
+    roles = [("小恶魔", "Demon"), ("投毒者", "Minion"), ("厨师", "Townsfolk"), ("共情者", "Townsfolk"),
+             ("隐士", "Outsider")]
+    players = Seats(Player(i + 1) for i in range(len(roles)))
+    for p, role in zip(players, roles): p.assign_role(Role(*role))
+    batch = BatchRules.from_states([GameState.from_players(players)])
+    # 隐士看起来是邪恶：1-2、5-1 两对
+    assert batch.chef().tolist() == [2]
+    # 4 号共情者两侧是 3 号厨师和 5 号隐士
+    assert batch.empath(np.array([3])).tolist() == [1]
+    # 以 3 号为共情者：邻居是 2 号爪牙和 4 号；4 号死后右邻跳到 5 号隐士
+    assert batch.empath(np.array([2])).tolist() == [1]
+    players[3].kill()
+    batch = BatchRules.from_states([GameState.from_players(players)])
+    assert batch.empath(np.array([2])).tolist() == [2]
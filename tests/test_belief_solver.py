@@ -0,0 +1,51 @@
+import pytest
+
+from engine.belief_solver import BeliefState, parse_claim
+
+# 5 人小局：3 村民、1 爪牙、1 恶魔；男爵在场时多一个外来者名额，隐士可能落在剩下的好人座位上
+TINY = {"Townsfolk": 3, "Outsider": 0, "Minion": 1, "Demon": 1}
+
+
+def _belief(role="占卜师"):
+    b = BeliefState(1, 5, role, distribution=TINY)
+    assert not b.sampled
+    return b
+
+
+def test_prior_is_uniform_over_other_seats():
+    demon, evil = _belief().posterior(1)
+    assert demon == pytest.approx({s: 0.25 for s in (2, 3, 4, 5)})
+    assert evil == pytest.approx({s: 0.5 for s in (2, 3, 4, 5)})
+
+
+def test_fortune_teller_no():
+    b = _belief()
+    b.observe(("fortune", 1, 2, 3, False))
+    demon, evil = b.posterior(1)
+    assert demon == pytest.approx({4: 0.5, 5: 0.5})
+    # 恶魔在 4 / 5；男爵世界里隐士落在 2 / 3 会让占卜师看到"是"，这些世界被排除 (总权重 23，手算)
+    assert evil[2] == pytest.approx(7.75 / 23)
+    assert evil[4] == pytest.approx(15.25 / 23)
+
+
+def test_night_death_and_scarlet_woman_inheritance():
+    b = _belief()
+    b.observe_all([("fortune", 1, 2, 3, False), ("night_death", 1, 4)])
+    assert b.posterior(1)[0] == pytest.approx({5: 1.0})
+    # 处决了 5 号但游戏继续：只剩红唇女郎 (存活的 2 / 3 号) 继承的世界
+    b.observe(("execution", 2, 5, True))
+    demon, _ = b.posterior(2)
+    assert demon == pytest.approx({2: 0.5, 3: 0.5})
+    assert all(w.minions[w.heir] == "红唇女郎" for w in b.worlds)
+
+
+def test_contradictory_fact_is_ignored():
+    b = _belief()
+    b.observe(("chef", 0, 4))  # 看起来邪恶的最多 3 人 (含隐士)，最多 2 对
+    assert b.ignored == 1 and len(b.worlds) > 0
+
+
+def test_parse_claim():
+    assert parse_claim("大家好，我是【共情者】，昨晚得到 1") == "共情者"
+    assert parse_claim("我的身份是 厨师") == "厨师"
+    assert parse_claim("我觉得 3 号有问题") is None
@@ -0,0 +1,84 @@
+import pickle
+import random
+
+import pytest
+
+import config
+from engine import checkpoint
+from engine.checkpoint import CheckpointError
+from engine.game_manager import GameManager
+from engine.headless import Autopilot, ScriptedIO
+from engine.roles.base_role import Role
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    monkeypatch.setattr(config, "LLM_BACKEND", "stub")
+    monkeypatch.setattr(config, "LLM_CACHE_MODE", "off")
+    monkeypatch.setattr(config, "TURBO", True)
+
+
+def _play(seed, resume=None):
+    """跑一局 (或从 resume 存下的状态接着跑)，记下每个阶段边界的存档和自动驾驶的随机状态。"""
+    autopilot = Autopilot(seed)
+    gm = GameManager(io_handler=ScriptedIO(autopilot), rng=random.Random(seed))
+    gm.checkpoint_path = None
+    autopilot.bind(gm)
+    saved = []
+    gm._checkpoint = lambda step: saved.append((checkpoint.capture(gm, step), autopilot.rng.getstate()))
+    if resume is None:
+        gm.start_game_loop()
+    else:
+        blob, autopilot_state = resume
+        autopilot.rng.setstate(autopilot_state)
+        gm.start_game_loop(checkpoint.restore(gm, pickle.loads(blob)))
+    return (gm.winner, gm.day_count, list(gm.executions)), saved
+
+
+def test_resume_from_any_boundary_reaches_same_outcome(offline):
+    outcome, saved = _play(3)
+    assert len(saved) >= 3
+    for resume in (saved[1], saved[len(saved) // 2]):
+        assert _play(3, resume)[0] == outcome
+
+
+def test_file_round_trip(offline, tmp_path):
+    _, saved = _play(5)
+    path = str(tmp_path / "game.botc")
+    writer = checkpoint.CheckpointWriter(path)
+    writer.save(saved[1][0])
+    writer.close()
+    assert checkpoint.load(path) == pickle.loads(saved[1][0])
+
+
+def test_corruption_is_rejected():
+    data = checkpoint._frame(pickle.dumps({"next_step": "night"}))
+    assert checkpoint.decode(data) == {"next_step": "night"}
+    flipped = bytearray(data)
+    flipped[-1] ^= 0xFF
+    with pytest.raises(CheckpointError, match="校验"):
+        checkpoint.decode(bytes(flipped))
+    with pytest.raises(CheckpointError):
+        checkpoint.decode(data[:-3])
+    with pytest.raises(CheckpointError):
+        checkpoint.decode(b"XXXX" + data[4:])
+
+
+def test_unpickler_rejects_custom_classes():
+    # CRC 正确但负载里带了自定义类 (或任意可调用对象)，读取时也要拒绝
+    for payload in ({"role": Role("小恶魔", "Demon")}, {"call": print}):
+        data = checkpoint._frame(pickle.dumps(payload))
+        with pytest.raises(CheckpointError, match="不允许的类型"):
+            checkpoint.decode(data)
+
+
+def test_resume_game_restores_config(offline, tmp_path, monkeypatch):
+    _, saved = _play(5)
+    path = str(tmp_path / "game.botc")
+    with open(path, "wb") as f:
+        f.write(checkpoint._frame(saved[1][0]))
+    monkeypatch.setattr(config, "PLAYER_COUNT", 12)
+    monkeypatch.setattr(config, "HUMAN_SEAT_ID", 9)
+    gm = checkpoint.resume_game(path, io_handler=ScriptedIO())
+    assert gm.phase == "GAME_OVER" and len(gm.players) != 12
+    assert (config.PLAYER_COUNT, config.HUMAN_SEAT_ID) == (12, 9)
@@ -0,0 +1,53 @@
+import pytest
+
+import config
+from engine import game_manager
+from engine.game_record import Divergence, record_game, replay_game
+from engine.headless import Autopilot, ScriptedIO
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    monkeypatch.setattr(config, "LLM_BACKEND", "stub")
+    monkeypatch.setattr(config, "TURBO", True)
+    monkeypatch.setattr(config, "CHECKPOINT_PATH", None)
+
+
+def _record(tmp_path, seed):
+    path = str(tmp_path / f"game{seed}.jsonl")
+    autopilot = Autopilot(seed)
+    gm = record_game(path, seed=seed, io_handler=ScriptedIO(autopilot), on_ready=autopilot.bind)
+    return path, gm
+
+
+def _outcome(gm):
+    return gm.winner, gm.day_count, list(gm.executions), [e.text for e in gm.public_history.entries]
+
+
+@pytest.mark.parametrize("seed", [0, 3])
+def test_replay_reproduces_recorded_game(offline, tmp_path, seed):
+    path, recorded = _record(tmp_path, seed)
+    replayed = replay_game(path, io_handler=ScriptedIO())
+    assert _outcome(replayed) == _outcome(recorded)
+
+
+def test_changed_foreground_prompt_diverges(offline, tmp_path, monkeypatch):
+    path, _ = _record(tmp_path, 2)
+    # 发言 / 提名 / 投票的 prompt 都多一句话：请求不在录像中
+    monkeypatch.setattr(game_manager.GameManager, "_belief_note", lambda self, player: "\n(改过的 prompt)")
+    with pytest.raises(Divergence, match="LLM 请求不在录像中"):
+        replay_game(path, io_handler=ScriptedIO())
+
+
+def test_extra_foreground_call_diverges(offline, tmp_path, monkeypatch):
+    path, _ = _record(tmp_path, 2)
+    original = game_manager.GameManager._ai_query
+
+    def twice(self, messages, call_type=None, tags=None):
+        original(self, messages, call_type, tags)
+        return original(self, messages, call_type, tags)
+
+    # 同样的请求多发一次：录像里的那条已经用掉了
+    monkeypatch.setattr(game_manager.GameManager, "_ai_query", twice)
+    with pytest.raises(Divergence, match="LLM 请求不在录像中"):
+        replay_game(path, io_handler=ScriptedIO())
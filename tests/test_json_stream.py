@@ -0,0 +1,44 @@
+import json
+
+from ai.json_stream import JsonFieldExtractor, iter_field_text
+
+
+def _stream(text, size, fields=("speech",)):
+    got = []
+    extractor = JsonFieldExtractor(fields=fields, on_field=lambda f, t: got.append((f, t)))
+    for i in range(0, len(text), size):
+        if extractor.feed(text[i:i + size]): break
+    return extractor, got
+
+
+def _joined(got, field):
+    return "".join(t for f, t in got if f == field)
+
+
+def test_field_text_is_same_for_any_chunking():
+    payload = {"thought": "先别暴露", "speech": "我是\"厨师\"，昨晚 0 对\n\\ 😀 é", "vote": True}
+    text = "```json\n" + json.dumps(payload, ensure_ascii=True) + "\n```"
+    for size in (1, 2, 3, 7, len(text)):
+        extractor, got = _stream(text, size)
+        assert _joined(got, "speech") == payload["speech"]
+        assert extractor.closed
+        assert json.loads(text[text.index("{"):extractor.end_offset]) == payload
+
+
+def test_only_top_level_string_fields_are_streamed():
+    text = '{"meta": {"speech": "内层"}, "list": ["speech"], "speech": "外层", "reply": "不要"}'
+    _, got = _stream(text, 4)
+    assert got and all(f == "speech" for f, _ in got)
+    assert _joined(got, "speech") == "外层"
+
+
+def test_stops_at_closing_brace():
+    text = '{"speech": "完"} 之后的内容 {"speech": "不该出现"}'
+    extractor, got = _stream(text, 5)
+    assert extractor.closed and text[:extractor.end_offset].endswith("}")
+    assert _joined(got, "speech") == "完"
+
+
+def test_iter_field_text():
+    chunks = ['{"reply": "你', '好', '，', '再见"', ', "terminate": true}']
+    assert "".join(iter_field_text(chunks, "reply")) == "你好，再见"
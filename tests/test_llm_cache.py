@@ -0,0 +1,29 @@
+from ai.llm_cache import ResponseCache, make_cache_key
+
+MESSAGES = [{"role": "system", "content": "你好"}, {"role": "user", "content": "hi"}]
+
+
+def test_key_is_stable_across_runs():
+    # 键写在磁盘缓存的文件名里，换进程 / 换机器都必须一样
+    assert make_cache_key("qwen-plus", MESSAGES, True) == \
+        "bfecefd05a943209bc38c51c2c1e10d7f5dbf6341ab4db70ece6c1558da20411"
+
+
+def test_key_ignores_dict_order_but_not_content():
+    reordered = [{"content": m["content"], "role": m["role"]} for m in MESSAGES]
+    key = make_cache_key("qwen-plus", MESSAGES, True)
+    assert make_cache_key("qwen-plus", reordered, True) == key
+    assert make_cache_key("qwen-plus", MESSAGES, False) != key
+    assert make_cache_key("qwen-max", MESSAGES, True) != key
+    changed = MESSAGES[:1] + [{"role": "user", "content": "hi!"}]
+    assert make_cache_key("qwen-plus", changed, True) != key
+
+
+def test_disk_cache_round_trip(tmp_path):
+    key = make_cache_key("qwen-plus", MESSAGES, True)
+    cache = ResponseCache(mode="read_through", cache_dir=str(tmp_path))
+    cache.put(key, {"speech": "我是好人"})
+    # 新实例从磁盘读到同一个键
+    reopened = ResponseCache(mode="read_through", cache_dir=str(tmp_path))
+    assert reopened.get(key) == {"speech": "我是好人"}
+    assert reopened.get(make_cache_key("qwen-plus", MESSAGES, False)) is None
@@ -0,0 +1,58 @@
+from string import Formatter
+
+import pytest
+
+from ai import prompt_templates
+from ai.prompt_compiler import CompiledTemplate
+
+TEMPLATES = [v for v in vars(prompt_templates).values() if isinstance(v, CompiledTemplate)]
+
+
+def _values(tpl):
+    # 参数里也带花括号和换行：渲染时只能原样填入，不能再被当成占位符
+    return {field: f"{{{field}}} 值{i}\n}}{{" if i % 2 else i for i, field in enumerate(tpl.fields)}
+
+
+@pytest.mark.parametrize("tpl", TEMPLATES, ids=lambda t: t.name)
+def test_render_matches_str_format(tpl):
+    source = getattr(prompt_templates, tpl.name)
+    kwargs = _values(tpl)
+    # static 字段 (规则、攻略) 在编译时已并入，str.format 这边从模块里取同名常量
+    for _, field, _, _ in Formatter().parse(source):
+        if field is not None and field not in kwargs:
+            kwargs[field] = getattr(prompt_templates, field)
+    assert tpl.render(**kwargs) == source.format(**kwargs)
+
+
+def test_all_templates_collected():
+    assert len(TEMPLATES) >= 12
+    assert any("{{" in getattr(prompt_templates, t.name) for t in TEMPLATES)
+
+
+@pytest.mark.parametrize("source", [
+    '返回 JSON: {{"vote": true}}',
+    "{{{a}}}",
+    "{a}{{}}{b}",
+    "}}{{",
+    "{a}",
+    "",
+])
+def test_brace_escapes(source):
+    fields = sorted({f for _, f, _, _ in Formatter().parse(source) if f})
+    tpl = CompiledTemplate("T", source, fields=fields)
+    kwargs = {f: f"<{f}>" for f in fields}
+    assert tpl.render(**kwargs) == source.format(**kwargs)
+
+
+def test_static_fields_are_inlined():
+    tpl = CompiledTemplate("T", "{rules}\n{{x}}: {x}", fields=("x",), static={"rules": "{不是占位符}"})
+    assert tpl.render(x=1) == "{不是占位符}\n{x}: 1"
+
+
+def test_placeholder_mismatch_is_rejected():
+    with pytest.raises(ValueError, match="占位符不匹配"):
+        CompiledTemplate("T", "{a} {b}", fields=("a",))
+    with pytest.raises(ValueError, match="不支持的占位符"):
+        CompiledTemplate("T", "{a:>3}", fields=("a",))
+    with pytest.raises(KeyError):
+        CompiledTemplate("T", "{a}", fields=("a",)).render()
@@ -0,0 +1,89 @@
+from concurrent.futures import Future
+
+import pytest
+
+import config
+from engine.public_history import PublicHistory, estimate_tokens
+
+
+class FakeClient:
+    """submit 返回调用方手动完成的 Future。"""
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, messages, **kwargs):
+        future = Future()
+        self.futures.append(future)
+        return future
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    monkeypatch.setattr(config, "HISTORY_SUMMARY_ENABLED", True)
+    monkeypatch.setattr(config, "HISTORY_TOKEN_BUDGET", {"speech": 1000, "tiny": 30})
+
+
+def test_views_follow_appends():
+    h = PublicHistory()
+    h.append(1, "announcement", "第 1 天开始")
+    h.append(1, "speech", "1号: 我是厨师", seat=1)
+    h.append(2, "vote", "3号 被处决")
+    assert h.day_text(1) == "第 1 天开始\n1号: 我是厨师"
+    assert h.full_text == "第 1 天开始\n1号: 我是厨师\n3号 被处决"
+    assert h.full_text is h.full_text  # 没有新追加时复用拼好的文本
+    h.append(1, "speech", "2号: 我也是", seat=2)
+    assert h.day_text(1).endswith("2号: 我也是")
+    assert h.day_text(3) == ""
+    assert [e.text for e in h.tail(2)] == ["3号 被处决", "2号: 我也是"]
+    with pytest.raises(ValueError):
+        h.append(1, "whisper", "?")
+
+
+def test_render_drops_oldest_over_budget(budget):
+    h = PublicHistory()
+    for i in range(10):
+        h.append(1, "speech", f"{i}号: 发言内容第{i}条", seat=i)
+    text, saved = h.render("speech", 1)
+    assert text == h.full_text and saved == 0
+    text, saved = h.render("tiny", 1)
+    assert text.startswith("（更早的记录已省略）") and text.endswith("9号: 发言内容第9条")
+    assert "0号" not in text and saved > 0
+    assert sum(estimate_tokens(line) + 1 for line in text.splitlines()[1:]) <= 30
+
+
+def test_summary_applies_only_after_collect(budget):
+    client = FakeClient()
+    h = PublicHistory(ai_client=client)
+    h.append(1, "speech", "1号: 第一天的原文", seat=1)
+    h.close_day(1)
+    h.append(2, "speech", "2号: 第二天", seat=2)
+    client.futures[0].set_result({"summary": "一号跳了厨师"})
+    # 摘要已经返回，但要到 collect 这个固定时刻才生效
+    assert "第一天的原文" in h.render("speech", 2)[0]
+    h.collect(2)
+    text, _ = h.render("speech", 2)
+    assert text == "[第 1 天摘要] 一号跳了厨师\n2号: 第二天"
+    assert h.stats["summarized"] == 1
+
+
+def test_failed_summary_keeps_raw_text(budget):
+    client = FakeClient()
+    h = PublicHistory(ai_client=client)
+    h.append(1, "speech", "1号: 原文", seat=1)
+    h.close_day(1)
+    client.futures[0].set_exception(RuntimeError("timeout"))
+    h.collect(2)
+    assert h.render("speech", 2)[0] == "1号: 原文"
+    assert h.stats["summary_failed"] == 1
+
+
+def test_set_summary_invalidates_render(budget):
+    h = PublicHistory()
+    h.append(1, "speech", "1号: 第一天的原文", seat=1)
+    h.append(2, "speech", "2号: 第二天", seat=2)
+    assert "第一天的原文" in h.render("speech", 2)[0]
+    h.set_summary(1, "[第 1 天摘要] 存档里的摘要")
+    text, _ = h.render("speech", 2)
+    assert text == "[第 1 天摘要] 存档里的摘要\n2号: 第二天"
+    assert h.render("tiny", 2)[0] == text  # 摘要的 token 数也计入了预算
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import config
+from ai.llm_backends import StubBackend
+from ai.llm_cache import ResponseCache
+from ai.qwen_client import QwenClient
+
+
+class ScriptedBackend(StubBackend):
+    """
+    按调用顺序取延迟的桩：delays[i] 是第 i 个请求收到首个片段前的等待时间，
+    prompt 里带 "失败" 的请求直接抛错。记下开始、完成和被取消的请求。
+    """
+
+    def __init__(self, delays):
+        super().__init__(latency=0)
+        self.delays = list(delays)
+        self.started, self.finished, self.cancelled = [], [], []
+        self._lock = threading.Lock()
+
+    async def stream(self, model, messages, usage=None, **options):
+        prompt = messages[-1]["content"]
+        with self._lock:
+            index = len(self.started)
+            self.started.append(prompt)
+        try:
+            await asyncio.sleep(self.delays[index] if index < len(self.delays) else 0)
+            if "失败" in prompt: raise RuntimeError("连接被重置")
+            async for part in super().stream(model, messages, usage=usage, **options):
+                yield part
+        except asyncio.CancelledError:
+            self.cancelled.append(index)
+            raise
+        self.finished.append(index)
+
+
+def _messages(text):
+    return [{"role": "system", "content": "测试"}, {"role": "user", "content": f'{text}\n返回 JSON: {{"speech": "..."}}'}]
+
+
+def _client(backend):
+    return QwenClient(cache=ResponseCache(mode="off"), backend=backend)
+
+
+def test_query_many_keeps_input_order():
+    backend = ScriptedBackend([0.15, 0.1, 0.05, 0])
+    client = _client(backend)
+    prompts = [_messages(f"第{i}条") for i in range(4)]
+    results = client.query_many(prompts, max_concurrency=4)
+    # 后发的先完成，结果仍按输入顺序
+    assert backend.finished == [3, 2, 1, 0]
+    assert results == [backend.build_response(m) for m in prompts]
+
+
+def test_query_many_failure_is_isolated():
+    backend = ScriptedBackend([0.05, 0, 0.05])
+    client = _client(backend)
+    results = client.query_many([_messages("第0条"), _messages("失败"), _messages("第2条")])
+    assert results[1] == {}
+    assert results[0].get("speech") and results[2].get("speech")
+    assert backend.cancelled == []
+
+
+def test_submit_and_wait_idle():
+    backend = ScriptedBackend([0.1, 0.1])
+    client = _client(backend)
+    futures = [client.submit(_messages(f"后台{i}"), call_type="speech") for i in range(2)]
+    assert not any(f.done() for f in futures)
+    assert client.wait_idle(timeout=5)
+    assert all(f.done() for f in futures)
+    assert [f.result() for f in futures] == [backend.build_response(_messages(f"后台{i}")) for i in range(2)]
+    assert client.async_client.in_flight == 0
+
+
+def test_deadline_returns_fallback():
+    client = _client(ScriptedBackend([5]))
+    started = time.monotonic()
+    assert client.query(_messages("太慢了"), deadline=0.1) == {}
+    assert time.monotonic() - started < 1
+    assert client.call_metrics[-1]["timed_out"]
+    assert client.wait_idle(timeout=1)
+
+
+def test_hedge_wins_and_cancels_primary(monkeypatch):
+    monkeypatch.setattr(config, "LLM_HEDGE_ENABLED", True)
+    monkeypatch.setattr(config, "LLM_HEDGE_DEFAULT_DELAY", 0.05)
+    # 主请求卡住，过了对冲阈值再发的请求很快返回
+    backend = ScriptedBackend([5, 0])
+    client = _client(backend)
+    result = client.query(_messages("对冲"), deadline=2)
+    assert result == backend.build_response(_messages("对冲"))
+    metrics = client.call_metrics[-1]
+    assert metrics["hedged"] and metrics["winner"] == "hedge" and not metrics["timed_out"]
+    assert client.wait_idle(timeout=1)
+    assert backend.cancelled == [0] and backend.finished == [1]
+
+
+def test_no_hedge_when_primary_is_fast(monkeypatch):
+    monkeypatch.setattr(config, "LLM_HEDGE_ENABLED", True)
+    monkeypatch.setattr(config, "LLM_HEDGE_DEFAULT_DELAY", 0.5)
+    backend = ScriptedBackend([0])
+    client = _client(backend)
+    assert client.query(_messages("很快")).get("speech")
+    assert not client.call_metrics[-1]["hedged"] and client.call_metrics[-1]["winner"] == "primary"
+    assert len(backend.started) == 1
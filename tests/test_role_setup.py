@@ -0,0 +1,54 @@
+import random
+from collections import Counter
+
+import pytest
+
+import config
+from engine import role_setup
+from engine.role_setup import MAX_PLAYERS, MIN_PLAYERS, draw_setup, standard_distribution
+
+# (村民, 外来者, 爪牙, 恶魔)：5-15 人为官方配置表；16 人起多出的座位先补村民 (共 13 个)，再补外来者
+TABLE = {
+    5: (3, 0, 1, 1), 6: (3, 1, 1, 1),
+    7: (5, 0, 1, 1), 8: (5, 1, 1, 1), 9: (5, 2, 1, 1),
+    10: (7, 0, 2, 1), 11: (7, 1, 2, 1), 12: (7, 2, 2, 1),
+    13: (9, 0, 3, 1), 14: (9, 1, 3, 1), 15: (9, 2, 3, 1),
+    16: (10, 2, 3, 1), 17: (11, 2, 3, 1), 18: (12, 2, 3, 1), 19: (13, 2, 3, 1), 20: (13, 3, 3, 1),
+}
+
+
+@pytest.fixture(autouse=True)
+def standard(monkeypatch):
+    monkeypatch.setattr(config, "SETUP_DISTRIBUTION", None)
+
+
+def test_standard_distribution_table():
+    assert sorted(TABLE) == list(range(MIN_PLAYERS, MAX_PLAYERS + 1))
+    for n, (townsfolk, outsiders, minions, demons) in TABLE.items():
+        assert standard_distribution(n) == {"Townsfolk": townsfolk, "Outsider": outsiders, "Minion": minions,
+                                            "Demon": demons}, n
+
+
+@pytest.mark.parametrize("n", [MIN_PLAYERS - 1, MAX_PLAYERS + 1])
+def test_unsupported_player_count(n):
+    with pytest.raises(ValueError):
+        standard_distribution(n)
+
+
+@pytest.mark.parametrize("n", range(MIN_PLAYERS, MAX_PLAYERS + 1))
+def test_baron_keeps_seat_count(n):
+    rng = random.Random(n)
+    base = standard_distribution(n)
+    outsider_limit = len(config.ROLES_DATA["Outsider"])
+    barons = 0
+    for _ in range(200):
+        seats, baron, _, _ = draw_setup(rng, n)
+        types = Counter(t for _, t in seats)
+        assert len(seats) == n
+        assert len({name for name, _ in seats}) == n  # 不会发出重复的身份
+        assert types["Minion"] == base["Minion"] and types["Demon"] == 1
+        shift = min(role_setup.baron_shift(n), outsider_limit - base["Outsider"]) if baron else 0
+        assert types["Outsider"] == base["Outsider"] + shift
+        assert types["Townsfolk"] == base["Townsfolk"] - shift
+        barons += baron
+    assert barons > 0
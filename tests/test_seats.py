@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from engine.player_manager import Player, Seats
+from engine.role_setup import MAX_PLAYERS, MIN_PLAYERS, draw_setup
+from engine.roles.base_role import Role
+
+
+def _deal(n, seed):
+    rng = random.Random(seed)
+    seats_roles, _, drunk_perceived, _ = draw_setup(rng, n)
+    players = Seats(Player(i + 1, is_human=(i == 0)) for i in range(n))
+    for p, (name, r_type) in zip(players, seats_roles):
+        p.assign_role(Role(name, r_type))
+        if name == "酒鬼": p.set_perceived_role(drunk_perceived)
+    return players, rng
+
+
+def _check(players):
+    """所有增量索引都和逐个扫描的结果一致。"""
+    alive = [p for p in players if p.is_alive]
+    assert players.alive_seats == [p.seat_id for p in alive]
+    assert players.alive_count == len(alive)
+    assert players.evil_alive_count == sum(p.alignment == "邪恶" for p in alive)
+    assert players.demon_alive_count == sum(p.true_role.role_type == "Demon" for p in alive)
+    for p in players:
+        assert players.get(p.seat_id) is p
+        assert players.index(p) == p.seat_id - 1
+        assert players.with_role(p.true_role.name) == [q for q in players if q.true_role.name == p.true_role.name]
+        assert players.perceiving(p.perceived_role) == [q for q in players if q.perceived_role == p.perceived_role]
+        neighbors = players.alive_neighbors(p)
+        if not p.is_alive:
+            assert neighbors is None
+            continue
+        i = alive.index(p)
+        assert neighbors == (alive[i - 1], alive[(i + 1) % len(alive)])
+    assert players.human is players[0]
+
+
+@pytest.mark.parametrize("n", range(MIN_PLAYERS, MAX_PLAYERS + 1))
+def test_indexes_and_ring_stay_consistent(n):
+    for seed in range(3):
+        players, rng = _deal(n, seed)
+        _check(players)
+        order = list(players)
+        rng.shuffle(order)
+        for p in order:
+            # 中途有人继承身份 (红唇女郎变恶魔)，有人重复被杀
+            if rng.random() < 0.2: p.inherit_role(Role("小恶魔", "Demon"))
+            assert p.kill()
+            assert not p.kill()
+            _check(players)
+        assert players.alive_seats == [] and players.alive_count == 0
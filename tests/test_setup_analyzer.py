@@ -0,0 +1,21 @@
+import pytest
+
+import config
+import setup_analyzer
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize("players", [5, 6])
+def test_vectorized_sampler_matches_exact_enumeration(monkeypatch, players):
+    monkeypatch.setattr(config, "SETUP_DISTRIBUTION", None)
+    monkeypatch.setattr(config, "PLAYER_COUNT", players)
+    assert setup_analyzer.exact_space_size() <= setup_analyzer.EXACT_LIMIT
+    exact = setup_analyzer.exact_stats().report()
+    sampled = setup_analyzer.sample_stats(200000, workers=1, seed=1).report()
+    # 20 万局时单个频率的标准差不到 0.0012，0.006 约为 5 倍
+    for key in ("roles", "chef"):
+        assert set(sampled[key]) <= set(exact[key])
+        for value, p in exact[key].items():
+            assert sampled[key].get(value, 0.0) == pytest.approx(p, abs=0.006), (key, value)
+    assert setup_analyzer.max_deviation(exact, sampled) < 0.006
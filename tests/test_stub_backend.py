@@ -0,0 +1,64 @@
+import pytest
+
+import config
+from ai import qwen_client
+from ai.llm_backends import StubBackend
+from ai.prompt_templates import CALL_OPTIONS, MISINFORMATION_TPL
+from engine.headless import run_headless_game
+
+# 各类调用的解析代码 (game_manager) 要读的字段及类型
+REQUIRED = {
+    "vote": {"vote": bool},
+    "nominate": {"nominate_target": int, "reason": str},
+    "night_action": {"targets": list},
+    "chat": {"reply": str, "terminate": bool},
+    "speech": {"speech": str},
+    "misinformation": {"fake_info": str},
+    "planning": {"bluff_role": str, "first_chat_target": int},
+    "summary": {"summary": str},
+}
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    monkeypatch.setattr(config, "LLM_BACKEND", "stub")
+    monkeypatch.setattr(config, "LLM_CACHE_MODE", "off")
+    monkeypatch.setattr(config, "TURBO", True)
+
+
+def _check(call_type, resp):
+    assert isinstance(resp, dict) and resp, call_type
+    for field, kind in REQUIRED[call_type].items():
+        assert isinstance(resp.get(field), kind), (call_type, field, resp)
+    seats = range(1, config.PLAYER_COUNT + 1)
+    if call_type == "nominate": assert resp["nominate_target"] in (0, *seats)
+    if call_type == "night_action": assert resp["targets"] and set(resp["targets"]) <= set(seats)
+    if call_type == "planning": assert resp["first_chat_target"] in seats
+
+
+def test_every_call_type_is_covered():
+    assert set(REQUIRED) == set(CALL_OPTIONS)
+
+
+def test_game_prompts_get_parseable_responses(offline, monkeypatch):
+    seen = {}
+    original = qwen_client.AsyncQwenClient.query
+
+    async def query(self, messages, *args, call_type=None, **kwargs):
+        resp = await original(self, messages, *args, call_type=call_type, **kwargs)
+        seen.setdefault(call_type, []).append(resp)
+        return resp
+
+    monkeypatch.setattr(qwen_client.AsyncQwenClient, "query", query)
+    for seed in range(3):
+        run_headless_game(seed)
+    # 对局里很少轮到中毒 / 醉酒的人拿信息，假信息单独测
+    assert set(seen) >= set(REQUIRED) - {"misinformation"}
+    for call_type, responses in seen.items():
+        for resp in responses:
+            _check(call_type, resp)
+
+
+def test_misinformation_prompt():
+    prompt = MISINFORMATION_TPL.render(seat_id=3, role="共情者", true_info="你的邻居中有 1 个邪恶玩家")
+    _check("misinformation", StubBackend(latency=0).build_response([{"role": "user", "content": prompt}]))
@@ -0,0 +1,36 @@
+import pytest
+
+import config
+from engine import game_manager
+from engine.headless import run_headless_game
+
+SEEDS = range(6)
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    monkeypatch.setattr(config, "LLM_BACKEND", "stub")
+    monkeypatch.setattr(config, "LLM_CACHE_MODE", "off")
+    monkeypatch.setattr(config, "TURBO", True)
+
+
+def _play(monkeypatch, seed, speculation):
+    monkeypatch.setattr(config, "VOTE_SPECULATION", speculation)
+    result = run_headless_game(seed)
+    tallies = [line for line in result["lines"] if "总票数" in line or line.startswith("--> ")]
+    return result["winner"], result["executions"], tallies
+
+
+def test_speculation_matches_sequential_voting(offline, monkeypatch):
+    requeried = []
+    original_close = game_manager.VoteSpeculator.close
+
+    def close(self):
+        requeried.append(self.requeried)
+        original_close(self)
+
+    monkeypatch.setattr(game_manager.VoteSpeculator, "close", close)
+    for seed in SEEDS:
+        assert _play(monkeypatch, seed, True) == _play(monkeypatch, seed, False), seed
+    # 至少有一轮投票里，前面的人实际举手改变了后面的人看到的票数，走了补问的路径
+    assert any(requeried)
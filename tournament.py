@@ -0,0 +1,183 @@
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import config
+
+# 共享的开局标记 (下标为局号)：worker 开始跑某一局时置 1，进程池崩溃后据此找出当时正在跑的对局。
+# 不带锁，worker 被强杀时不会把锁带走
+_started = None
+
+
+def _init_worker(limiter, base_seed, started=None):
+    """worker 初始化：共享在途请求上限，按进程号错开随机种子，关掉节奏停顿。"""
+    global _started
+    from ai.qwen_client import set_request_limiter
+    set_request_limiter(limiter)
+    _started = started
+    random.seed(base_seed * 1000003 + os.getpid())
+    config.TURBO = True
+
+
+def _play_one(game_id, seed, overrides):
+    """在 worker 里跑一局。config 覆盖只在本局生效；任何异常都折成一条 error 结果，不影响其他对局。"""
+    from engine.headless import run_headless_game
+    saved = {k: getattr(config, k) for k in overrides if hasattr(config, k)}
+    if _started is not None: _started[game_id] = 1
+    started = time.monotonic()
+    try:
+        for k, v in overrides.items(): setattr(config, k, v)
+        # 对局里的调试输出很多，worker 里全部丢掉
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = run_headless_game(seed=seed)
+        result.pop("lines", None)
+        result["error"] = None
+    except Exception:
+        result = {"seed": seed, "error": traceback.format_exc(), "duration": time.monotonic() - started}
+    finally:
+        for k in overrides:
+            if k in saved:
+                setattr(config, k, saved[k])
+            else:
+                delattr(config, k)
+    result.update(game_id=game_id, overrides=overrides, pid=os.getpid())
+    return result
+
+
+def run_tournament(games, variants=None, workers=None, seed=0, max_in_flight=None, max_tasks_per_child=None):
+    """
+    把 games 局自博弈分发到进程池，逐局产出结果 (谁先跑完先产出)。
+    variants 为 config 覆盖字典的列表，第 i 局使用 variants[i % len(variants)]；
+    max_in_flight 限制所有 worker 合计同时在途的 LLM 请求数。
+    worker 进程本身崩了 (段错误 / 被杀) 会让整个进程池失效：这时重建进程池，还没开始的对局重新提交；
+    崩溃时正在跑的对局各自单独重跑一次，再崩就记为错误，不连累其他对局。
+    max_tasks_per_child 需要 Python 3.11+，更低版本忽略。
+    """
+    variants = variants or [{}]
+    workers = workers or os.cpu_count() or 1
+    pool_kwargs = {}
+    if max_tasks_per_child and sys.version_info >= (3, 11):
+        pool_kwargs["max_tasks_per_child"] = max_tasks_per_child
+    elif max_tasks_per_child:
+        print("[Warning] max_tasks_per_child 需要 Python 3.11+，已忽略")
+    # max_tasks_per_child 不支持 fork 启动方式
+    ctx = multiprocessing.get_context("spawn") if pool_kwargs else multiprocessing.get_context()
+    limiter = ctx.BoundedSemaphore(max_in_flight) if max_in_flight else None
+    started = ctx.Array("b", games, lock=False)
+
+    def _run_pool(jobs, max_workers):
+        """在一个新进程池里跑 jobs，逐局产出 (job, 结果)；进程池崩溃时结果为 None。"""
+        for job in jobs: started[job[0]] = 0
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx, initializer=_init_worker,
+                                 initargs=(limiter, seed, started), **pool_kwargs) as pool:
+            futures = {pool.submit(_play_one, *job): job for job in jobs}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result()
+                except BrokenProcessPool:
+                    yield futures[future], None
+
+    jobs = [(i, seed + i, variants[i % len(variants)]) for i in range(games)]
+    while jobs:
+        broken = []
+        for job, result in _run_pool(jobs, workers):
+            if result is None:
+                broken.append(job)
+            else:
+                yield result
+        suspects = [job for job in broken if started[job[0]]]
+        jobs = [job for job in broken if not started[job[0]]]
+        if broken and not suspects:
+            # 没有对局开始就崩了 (如 worker 初始化失败)，重试也没用
+            for game_id, game_seed, overrides in jobs:
+                yield {"game_id": game_id, "seed": game_seed, "overrides": overrides, "error": "进程池启动失败"}
+            break
+        if broken:
+            print(f"[Warning] worker 进程崩溃，{len(suspects)} 局单独重跑，{len(jobs)} 局重新提交")
+        for job in suspects:
+            for (game_id, game_seed, overrides), result in _run_pool([job], 1):
+                yield result or {"game_id": game_id, "seed": game_seed, "overrides": overrides,
+                                 "error": "worker 崩溃 (单独重跑仍然崩溃)"}
+
+
+def summarize(results):
+    """按覆盖配置分组统计胜率、平均天数和 LLM 用量。"""
+    groups = {}
+    for r in results:
+        g = groups.setdefault(json.dumps(r.get("overrides") or {}, ensure_ascii=False, sort_keys=True),
+                              {"games": 0, "errors": 0, "wins": {}, "days": 0, "executions": 0, "tokens": 0})
+        g["games"] += 1
+        if r.get("error"):
+            g["errors"] += 1
+            continue
+        g["wins"][r["winner"] or "平局"] = g["wins"].get(r["winner"] or "平局", 0) + 1
+        g["days"] += r["day_count"]
+        g["executions"] += len(r["executions"])
+        llm = r.get("llm") or {}
+        g["tokens"] += (llm.get("prompt_tokens") or 0) + (llm.get("completion_tokens") or 0)
+
+    lines = []
+    for key, g in groups.items():
+        ok = max(1, g["games"] - g["errors"])
+        rates = ", ".join(f"{k} {v / ok:.0%}" for k, v in sorted(g["wins"].items())) or "-"
+        lines.append(f"{key}: {g['games']} 局 (失败 {g['errors']}) | 胜率 {rates} | 平均 {g['days'] / ok:.1f} 天, "
+                     f"处决 {g['executions'] / ok:.1f} 人, {g['tokens'] / ok:.0f} tokens/局")
+    return "\n".join(lines)
+
+
+def _parse_override(text):
+    key, _, value = text.partition("=")
+    try:
+        return key, json.loads(value)
+    except json.JSONDecodeError:
+        return key, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="自博弈锦标赛：多进程批量跑无人值守对局")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认 CPU 核数")
+    parser.add_argument("--seed", type=int, default=0, help="第 i 局使用 seed + i")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="所有进程合计的在途 LLM 请求上限")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="所有对局共用的 config 覆盖，VALUE 按 JSON 解析，如 PUBLIC_CHAT_ROUNDS=1")
+    parser.add_argument("--variants", default=None,
+                        help="JSON 文件：config 覆盖字典的列表，对局轮流使用 (与 --set 合并)")
+    parser.add_argument("--out", default="tournament_results.jsonl", help="逐局结果写到这里 (JSONL)")
+    parser.add_argument("--isolate", action="store_true", help="每个进程只跑一局 (隔离内存泄漏，需要 Python 3.11+)")
+    args = parser.parse_args()
+
+    common = dict(_parse_override(s) for s in args.set)
+    variants = [{}]
+    if args.variants:
+        with open(args.variants, "r", encoding="utf-8") as f:
+            variants = json.load(f)
+    variants = [dict(common, **v) for v in variants]
+
+    results = []
+    started = time.monotonic()
+    with open(args.out, "a", encoding="utf-8") as out:
+        for r in run_tournament(args.games, variants, args.workers, args.seed, args.max_in_flight,
+                                1 if args.isolate else None):
+            results.append(r)
+            out.write(json.dumps(r, ensure_ascii=False) + "\n")
+            out.flush()
+            status = f"[Error] {r['error'].strip().splitlines()[-1]}" if r.get("error") else \
+                f"胜方 {r['winner']}, {r['day_count']} 天"
+            print(f"[*] ({len(results)}/{args.games}) 第 {r['game_id']} 局 seed={r['seed']}: {status}")
+
+    print(f"\n[*] 共 {len(results)} 局，用时 {time.monotonic() - started:.1f}s")
+    print(summarize(results))
+
+
+if __name__ == "__main__":
+    main()
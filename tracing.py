@@ -0,0 +1,212 @@
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+import config
+
+# 直方图分桶 (秒)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0)
+
+# LLM span 需要导出的字段
+LLM_FIELDS = ("template", "seat", "queue_wait", "ttft", "latency", "prompt_tokens", "completion_tokens",
+              "cached_tokens", "prompt_chars", "prompt_bytes", "completion_chars", "parse_ok", "hedged", "winner", "cache",
+              "early_stop", "timed_out")
+
+
+class Span:
+    def __init__(self, name, span_id, parent=None, kind="phase", **attrs):
+        self.name = name
+        self.span_id = span_id
+        self.kind = kind
+        self.parent_id = parent.span_id if parent else None
+        # 阶段归属：阶段 span 以自己的名字为 phase，其余继承最近的外层阶段
+        self.phase = name if kind == "phase" else (parent.phase if parent else None)
+        self.day = attrs.pop("day", parent.day if parent else None)
+        self.attrs = attrs
+        self.start = time.time()
+        self._t0 = time.monotonic()
+        self.duration = None
+
+    def to_dict(self):
+        d = {"name": self.name, "kind": self.kind, "span_id": self.span_id, "parent_id": self.parent_id,
+             "phase": self.phase, "day": self.day, "start": round(self.start, 6),
+             "duration": round(self.duration, 6) if self.duration is not None else None}
+        d.update(self.attrs)
+        return d
+
+
+class Tracer:
+    """
+    轻量级调用追踪：阶段 span 套 LLM span。结束的 span 逐行追加到 JSONL 文件，
+    并累积成直方图/计数器，可导出为 Prometheus 文本格式。
+    阶段 span 的栈按线程保存；LLM 调用在后台事件循环里执行，所以由调用方显式传入父 span。
+    """
+
+    def __init__(self, enabled=None, jsonl_path=None):
+        self.enabled = config.TRACE_ENABLED if enabled is None else enabled
+        # jsonl_path="" 表示不写文件
+        self.jsonl_path = config.TRACE_JSONL_PATH if jsonl_path is None else jsonl_path
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._histograms = {}  # (metric, labels) -> [各桶计数..., sum, count]
+        self._counters = {}  # (metric, labels) -> value
+        self._listeners = []  # 每个结束的 span 都回调一次 (如基准测试的统计)
+
+    def current_span(self):
+        stack = getattr(self._local, "stack", None)
+        return stack[-1] if stack else None
+
+    def start_span(self, name, parent=None, kind="phase", **attrs):
+        if not self.enabled: return None
+        return Span(name, next(self._ids), parent, kind, **attrs)
+
+    def finish_span(self, span, **attrs):
+        if span is None: return
+        span.duration = time.monotonic() - span._t0
+        span.attrs.update(attrs)
+        with self._lock:
+            self._export(span)
+            self._observe(span)
+            for listener in self._listeners: listener(span)
+
+    def subscribe(self, listener):
+        """注册 listener(span)，在 span 结束时 (持锁) 调用。"""
+        self._listeners.append(listener)
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """阶段 span：with tracer.span("run_voting_phase", day=2): ..."""
+        if not self.enabled:
+            yield None
+            return
+        span = self.start_span(name, self.current_span(), "phase", **attrs)
+        if not hasattr(self._local, "stack"): self._local.stack = []
+        self._local.stack.append(span)
+        try:
+            yield span
+        finally:
+            self._local.stack.pop()
+            self.finish_span(span)
+
+    @contextmanager
+    def attach(self, span):
+        """在工作线程里沿用调用方的阶段 span：期间发起的调用都挂在它下面，退出时不结束它。"""
+        if span is None:
+            yield None
+            return
+        if not hasattr(self._local, "stack"): self._local.stack = []
+        self._local.stack.append(span)
+        try:
+            yield span
+        finally:
+            self._local.stack.pop()
+
+    def _export(self, span):
+        if not self.jsonl_path: return
+        try:
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(span.to_dict(), ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"[Warning] 写入追踪日志失败: {e}")
+
+    def _observe(self, span):
+        if span.kind == "phase":
+            self._hist("botc_phase_duration_seconds", {"phase": span.name}, span.duration)
+            if span.attrs.get("history_tokens_saved"):
+                self._count("botc_history_tokens_saved_total", {"phase": span.name}, span.attrs["history_tokens_saved"])
+            for field in ("speculated", "speculation_used", "speculation_requeried"):
+                if span.attrs.get(field): self._count(f"botc_vote_{field}_total", {}, span.attrs[field])
+            return
+
+        a = span.attrs
+        labels = {"phase": span.phase or "", "template": a.get("template") or ""}
+        self._hist("botc_llm_latency_seconds", labels, span.duration)
+        if a.get("ttft") is not None: self._hist("botc_llm_ttft_seconds", labels, a["ttft"])
+        if a.get("queue_wait") is not None: self._hist("botc_llm_queue_wait_seconds", labels, a["queue_wait"])
+        ok = a.get("parse_ok")
+        self._count("botc_llm_calls_total", labels if ok is None else dict(labels, parse_ok=str(bool(ok)).lower()))
+        for field in ("prompt_tokens", "completion_tokens", "cached_tokens", "prompt_chars"):
+            if a.get(field): self._count(f"botc_llm_{field}_total", labels, a[field])
+
+    def _hist(self, metric, labels, value):
+        key = (metric, tuple(sorted(labels.items())))
+        h = self._histograms.setdefault(key, [0] * (len(LATENCY_BUCKETS) + 2))
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound: h[i] += 1
+        h[-2] += value
+        h[-1] += 1
+
+    def _count(self, metric, labels, value=1):
+        key = (metric, tuple(sorted(labels.items())))
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def prometheus_snapshot(self):
+        """当前累积指标的 Prometheus 文本格式快照。"""
+
+        def _fmt(labels, extra=()):
+            items = list(labels) + list(extra)
+            return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}" if items else ""
+
+        lines = []
+        with self._lock:
+            typed = set()
+            for (metric, labels), h in sorted(self._histograms.items()):
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} histogram")
+                    typed.add(metric)
+                for bound, n in zip(LATENCY_BUCKETS, h):
+                    lines.append(f"{metric}_bucket{_fmt(labels, [('le', bound)])} {n}")
+                lines.append(f"{metric}_bucket{_fmt(labels, [('le', '+Inf')])} {h[-1]}")
+                lines.append(f"{metric}_sum{_fmt(labels)} {h[-2]:.6f}")
+                lines.append(f"{metric}_count{_fmt(labels)} {h[-1]}")
+            for (metric, labels), v in sorted(self._counters.items()):
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} counter")
+                    typed.add(metric)
+                lines.append(f"{metric}{_fmt(labels)} {v}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=None):
+        path = path or config.TRACE_PROM_PATH
+        if not self.enabled or not path: return
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_snapshot())
+        os.replace(tmp_path, path)
+
+
+_tracer = None
+
+
+def get_tracer():
+    """进程内共享的 Tracer (按 config 懒创建)。"""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
+
+
+def set_tracer(tracer):
+    """替换进程内共享的 Tracer (基准测试等场景)。"""
+    global _tracer
+    _tracer = tracer
+
+
+def traced_phase(method):
+    """GameManager 阶段方法的装饰器：整个方法包在一个以方法名命名的阶段 span 里。"""
+
+    @wraps(method)
+    def _wrapper(self, *args, **kwargs):
+        with get_tracer().span(method.__name__, day=self.day_count) as span:
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                # run_day_phase 会在方法内推进天数，以结束时为准
+                if span: span.day = self.day_count
+
+    return _wrapper